@@ -55,6 +55,7 @@ from os.path import (
     basename,  # Returns filename from a path.
     )
 import mda_models as mdam
+import mda_ensemble as mdae
 import mda_views as mdav
 
 
@@ -137,17 +138,90 @@ class DefaultAction(ProgramAction):
     to the stdout.
     """
 
-    def __init__(self, prog, exitf, data_file, delimiter):
+    def __init__(self, prog, exitf, data_file, delimiter, overlay=False):
         super().__init__(exitf)
         self._program_name = prog
-        self._data_file = data_file
         self._delimiter = delimiter
 
+        # If overlay is set data files are displayed overlaid in a single
+        # plot instead of as an ensemble.
+        self._overlay = overlay
+
+        # Data file argument may hold several files. These are taken to be
+        # repeated measurements of the same quantity and are displayed as
+        # their mean with the standard deviation band.
+        if data_file is None:
+            self._data_files = list()
+        elif isinstance(data_file, (list, tuple)):
+            self._data_files = list(data_file)
+        else:
+            self._data_files = [data_file]
+
         # Define all models.
         self.data_model = None
 
         # Initialize views.
-        self._mainscreen = mdav.TkiAppMainWindow(controller=self)
+        self._mainscreen = mdav.TkiAppMainWindow(
+            controller=self,
+            overlay=overlay
+            )
+
+    @property
+    def delimiter(self):
+        """Field delimiter of the data files.
+        """
+
+        return self._delimiter
+
+    def _read_collection(self, data_files):
+        """Reads data files one at a time and returns GraphCollection
+        object holding them or None if none of the files could be red.
+        """
+
+        collection = mdam.GraphCollection()
+
+        for data_file in data_files:
+            print(
+                '{0}: Reading file \'{1}\'.\n\n'
+                .format(self._program_name, data_file)
+                )
+            data_reader = mdam.CSVDataReader()
+            data = data_reader.read_data(data_file, self._delimiter)
+            data_reader.print_error_report()
+            print('\n')
+
+            if data is not None:
+                collection.add(mdam.Graph(
+                    data,
+                    data_reader.headers,
+                    basename(data_file)
+                    ))
+
+        if not len(collection):
+            return None
+
+        return collection
+
+    def _read_ensemble(self, data_files):
+        """Reads repeated measurements one file at a time and returns
+        EnsembleGraph object holding their statistics or None if none of the
+        files could be red.
+        """
+
+        ensemble = mdae.EnsembleAggregator()
+
+        for data_file in data_files:
+            print(
+                '{0}: Reading file \'{1}\'.\n\n'
+                .format(self._program_name, data_file)
+                )
+            ensemble.add_file(data_file, self._delimiter).print_error_report()
+            print('\n')
+
+        if ensemble.grid is None:
+            return None
+
+        return ensemble.to_graph()
 
     def execute(self):
         """TODO: Put method docstring HERE.
@@ -155,45 +229,42 @@ class DefaultAction(ProgramAction):
 
         # Do some basic sanity checks first. Check if user has supplied a
         # data file, ...
-        if self._data_file is None:
+        if not self._data_files:
             print(
                 '{0}: Missing data file argument.'
                 .format(self._program_name)
                 )
             self._exit_app()
 
-        # ... then check if given file exist at all.
-        if not isfile(self._data_file):
-            print(
-                '{0}: File \'{1}\' does not exist or is directory.'
-                .format(self._program_name, self._data_file)
-                )
-
-            self._exit_app()
-
-        print(
-            '{0}: Reading file \'{1}\'.\n\n'
-            .format(self._program_name, self._data_file)
-            )
-        data_reader = mdam.CSVDataReader()
-        data = data_reader.read_data(self._data_file, self._delimiter)
-        headers = data_reader.headers
-        data_reader.print_error_report()
-        print('\n')
-
-        if data is not None:
+        # ... then check if given files exist at all.
+        for data_file in self._data_files:
+            if not isfile(data_file):
+                print(
+                    '{0}: File \'{1}\' does not exist or is directory.'
+                    .format(self._program_name, data_file)
+                    )
+
+                self._exit_app()
+
+        # Single file is loaded by the GUI on a worker thread, so the main
+        # window shows up right away.
+        data_model = None
+        if self._overlay:
+            data_model = self._read_collection(self._data_files)
+        elif len(self._data_files) > 1:
+            data_model = self._read_ensemble(self._data_files)
+
+        if data_model is not None or len(self._data_files) == 1:
             # Print some info to the command line.
             print('{0}: Starting GUI ...'.format(self._program_name))
 
             # Initialize all models.
-            self.data_model = mdam.Graph(
-                data,
-                headers,
-                basename(self._data_file)
-                )
+            self.data_model = data_model
 
             # We have all neccessary files. Start the GUI.
             self._mainscreen.title(self._program_name)
+            if data_model is None:
+                self._mainscreen.open_file(self._data_files[0])
             self._mainscreen.update()  # Update screen.
             self._mainscreen.mainloop()
 
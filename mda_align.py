@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Alignment of curves by FFT cross-correlation.
+
+Relative shift between a reference curve and any number of other curves is
+estimated from the peak of their cross-correlation, computed for all curves
+in a single batched FFT, and refined to sub-sample precision by fitting a
+parabola through the peak and its two neighbours.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+import numpy as np
+import mda_models as mdam
+import mda_resample as mdar
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+def _fft_size(sample_count):
+    """Utility routine that returns the smallest power of two large enough to
+    hold linear (non-circular) correlation of two signals of given size.
+    """
+
+    return 1 << int(2 * sample_count - 1).bit_length()
+
+
+def _prepare(curves):
+    """Utility routine that turns curves into signals suitable for
+    correlation.
+
+    Curves are differentiated, so constant baselines (e.g. film background)
+    and the finite extent of the scan don't bias the correlation peak
+    towards zero lag, and the edges, which carry the position information,
+    dominate. Missing (NaN) samples are replaced with zeros, so they don't
+    contribute to the correlation.
+    """
+
+    curves = np.atleast_2d(np.asarray(curves, dtype=float))
+
+    return np.nan_to_num(np.gradient(curves, axis=1), nan=0.0)
+
+
+# =============================================================================
+# Shift estimation
+# =============================================================================
+
+def estimate_shifts(reference, curves, step=1.0, max_shift=None):
+    """Estimate shifts of curves relative to the reference curve.
+
+    All curves must be sampled on the same uniform grid as the reference.
+    Positive shift means curve is displaced towards larger abscissa values,
+    i.e. curve(x) ~ reference(x - shift).
+
+    Input:
+        reference:  1D numpy array storing the reference curve.
+
+        curves:     1D numpy array storing a single curve or 2D numpy array
+                    storing one curve per row.
+
+        step:       Sampling step of the grid. Shifts are returned in the
+                    same units.
+
+        max_shift:  If given, only shifts not larger than this (in units of
+                    step) are searched.
+
+    Result:
+        Scalar or 1D numpy array holding one shift per curve.
+    """
+
+    single = np.ndim(curves) == 1
+    reference = _prepare(reference)[0]
+    curves = _prepare(curves)
+
+    if curves.shape[1] != reference.size:
+        raise ValueError(
+            'Curves must have the same number of samples as reference.'
+            )
+
+    sample_count = reference.size
+    fft_size = _fft_size(sample_count)
+
+    spectrum = np.fft.rfft(curves, n=fft_size, axis=1) \
+        * np.conj(np.fft.rfft(reference, n=fft_size))
+    correlation = np.fft.irfft(spectrum, n=fft_size, axis=1)
+
+    # Reorder lags from -(N - 1) to N - 1.
+    correlation = np.concatenate(
+        (
+            correlation[:, fft_size - sample_count + 1:],
+            correlation[:, :sample_count]
+            ),
+        axis=1
+        )
+    lags = np.arange(-sample_count + 1, sample_count)
+
+    if max_shift is not None:
+        allowed = np.abs(lags) <= max_shift / step
+        correlation = np.where(allowed, correlation, -np.inf)
+
+    peak = np.argmax(correlation, axis=1)
+
+    # Sub-sample refinement by parabola through the peak and its
+    # neighbours. Peaks at the ends of the lag range are not refined.
+    rows = np.arange(curves.shape[0])
+    inner = np.clip(peak, 1, correlation.shape[1] - 2)
+    before = correlation[rows, inner - 1]
+    at = correlation[rows, inner]
+    after = correlation[rows, inner + 1]
+    curvature = before - 2.0 * at + after
+
+    with np.errstate(invalid='ignore'):
+        refinement = np.where(
+            (peak == inner) & (curvature < 0.0) & np.isfinite(curvature),
+            0.5 * (before - after) / np.where(curvature < 0.0, curvature, -1),
+            0.0
+            )
+
+    shifts = (lags[peak] + refinement) * step
+
+    if single:
+        return float(shifts[0])
+
+    return shifts
+
+
+def apply_shifts(x_values, curves, shifts):
+    """Resample curves so that given shifts are removed, i.e. the result is
+    curve(x + shift) evaluated on the original grid. Samples falling
+    outside the grid are set to NaN.
+
+    Input:
+        x_values:   1D numpy array storing strictly increasing abscissa.
+
+        curves:     1D numpy array storing a single curve or 2D numpy array
+                    storing one curve per row.
+
+        shifts:     Scalar or 1D array holding one shift per curve.
+
+    Result:
+        Numpy array of the same shape as curves.
+    """
+
+    single = np.ndim(curves) == 1
+    x_values = np.asarray(x_values, dtype=float)
+    curves = np.atleast_2d(np.asarray(curves, dtype=float))
+    shifts = np.broadcast_to(
+        np.asarray(shifts, dtype=float),
+        (curves.shape[0],)
+        )
+
+    query = x_values + shifts[:, np.newaxis]
+    rows = np.arange(curves.shape[0])[:, np.newaxis]
+    upper = np.clip(np.searchsorted(x_values, query), 1, x_values.size - 1)
+    lower = upper - 1
+    weight = (query - x_values[lower]) / (x_values[upper] - x_values[lower])
+    result = curves[rows, lower] * (1.0 - weight) \
+        + curves[rows, upper] * weight
+    result = np.where(
+        (query < x_values[0]) | (query > x_values[-1]),
+        np.nan,
+        result
+        )
+
+    if single:
+        return result[0]
+
+    return result
+
+
+# =============================================================================
+# Graph alignment
+# =============================================================================
+
+def graph_shifts(reference, graphs, max_shift=None):
+    """Estimate shifts of Graph objects relative to the reference Graph.
+
+    Reference is resampled onto a uniform grid spanning its own range with
+    its median sampling step, unless it is uniformly sampled already, and
+    all graphs are resampled onto that grid before correlation.
+
+    Result:
+        1D numpy array holding one shift per graph, in units of abscissa.
+    """
+
+    if reference.is_uniform():
+        grid = np.asarray(reference.x, dtype=float)
+        reference_y = reference.y
+    else:
+        step = np.median(np.abs(np.diff(reference.x)))
+        grid = np.arange(reference.x.min(), reference.x.max() + step, step)
+        reference_y = mdar.resample_graphs([reference], grid)[0]
+
+    step = grid[1] - grid[0]
+    curves = mdar.resample_graphs(graphs, grid, antialias=False)
+
+    return estimate_shifts(reference_y, curves, step, max_shift)
+
+
+def align_graphs(reference, graphs, max_shift=None):
+    """Align Graph objects to the reference Graph.
+
+    Shifts are removed by moving the abscissa of each graph, so the data
+    itself is not interpolated.
+
+    Result:
+        Tuple of format (shifts, aligned), where shifts is 1D numpy array
+        holding estimated shift per graph and aligned is list of new Graph
+        objects.
+    """
+
+    shifts = graph_shifts(reference, graphs, max_shift)
+
+    aligned = list()
+    for graph, shift in zip(graphs, shifts):
+        data = np.array(graph.data, dtype=float, copy=True)
+        if data.ndim == 2 and data.shape[1] > 1:
+            data[:, 0] -= shift
+        aligned.append(mdam.Graph(data, graph.headers, graph.title))
+
+    return shifts, aligned
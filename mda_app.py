@@ -258,7 +258,8 @@ class CommandLineApp(object):
                 prog=self._parser.prog,
                 exitf=self._parser.exit,
                 data_file=arguments.data_file,
-                delimiter=delimiter)
+                delimiter=delimiter,
+                overlay=arguments.overlay)
 
     def run(self):
         """This method executes action code.
@@ -309,12 +310,19 @@ There is NO WARRANTY, to the extent permitted by law.'
         type=str,
         help='field delimiter. Default value is \",\"',
         group='general options')
+    program.add_argument(
+        '-o', '--overlay',
+        action='store_true',
+        help='display data files overlaid in a single plot instead of\
+ their mean',
+        group='general options')
     program.add_argument(
         'data_file',
         metavar='DATA_FILE',
         type=str,
-        nargs='?',
-        help='a CSV file containing graph data')
+        nargs='*',
+        help='a CSV file containing graph data. If several files are given\
+ they are taken as repeated measurements and their mean is displayed')
 
     program.parse_args()
     program.run()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""Film dosimetry calibration: conversion of gray values to dose.
+
+Calibration model (rational or polynomial) is fitted once to the measured
+calibration points and tabulated on a dense uniform lookup table. Arrays
+(including memory mapped ones) are then converted to dose by vectorized
+linear interpolation in the table, processing large arrays in chunks.
+Fitted calibrations can be cached on disk and reused across sessions.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] S. Devic et al., Precise radiochromic film dosimetry using a
+#     flat-bed document scanner, Med. Phys. 32 (7), 2005.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from os import makedirs
+from os.path import expanduser, isfile, join
+import hashlib
+import numpy as np
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+CALIBRATION_MODELS = ('rational', 'polynomial')
+
+# Default number of lookup table entries.
+LUT_SIZE = 65536
+
+# Default number of array elements converted at once.
+CHUNK_SIZE = 1 << 20
+
+# Directory where fitted calibrations are cached.
+CACHE_DIR = join(expanduser('~'), '.cache', 'mda', 'calibrations')
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+def _rational_candidates(x_values, y_values, poles):
+    """Utility routine that fits dose = a + b / (x - c) for each of the
+    given poles c by linear least squares and returns parameters and sums of
+    squared residuals for all of them.
+    """
+
+    inverse = 1.0 / (x_values[np.newaxis, :] - poles[:, np.newaxis])
+    count = x_values.size
+    sum_u = inverse.sum(axis=1)
+    sum_uu = (inverse * inverse).sum(axis=1)
+    sum_y = y_values.sum()
+    sum_uy = inverse @ y_values
+
+    determinant = count * sum_uu - sum_u * sum_u
+    determinant = np.where(determinant != 0.0, determinant, np.nan)
+    offset = (sum_uu * sum_y - sum_u * sum_uy) / determinant
+    scale = (count * sum_uy - sum_u * sum_y) / determinant
+
+    residual = y_values[np.newaxis, :] - offset[:, np.newaxis] \
+        - scale[:, np.newaxis] * inverse
+    error = np.where(
+        np.isnan(determinant),
+        np.inf,
+        (residual * residual).sum(axis=1)
+        )
+
+    return offset, scale, error
+
+
+def _fit_rational(x_values, y_values, refinements=4):
+    """Utility routine that fits rational model dose = a + b / (x - c).
+
+    Model is linear in a and b, so for a fixed pole c they follow from
+    linear least squares. Pole is searched for outside the range of the
+    calibration points on a logarithmic grid, and then refined on
+    successively finer grids around the best candidate.
+    """
+
+    low, high = x_values.min(), x_values.max()
+    span = high - low if high > low else 1.0
+    distance = span * np.logspace(-3.0, 3.0, 241)
+    poles = np.r_[low - distance, high + distance]
+
+    for iteration in range(refinements + 1):
+        offset, scale, error = _rational_candidates(
+            x_values,
+            y_values,
+            poles
+            )
+        best = int(np.argmin(error))
+
+        if iteration == refinements:
+            break
+
+        # Refine between neighbours of the best candidate on the same side
+        # of the data range.
+        side = poles < low if poles[best] < low else poles > high
+        same = np.flatnonzero(side)
+        position = int(np.searchsorted(same, best))
+        left = poles[same[max(position - 1, 0)]]
+        right = poles[same[min(position + 1, same.size - 1)]]
+        poles = np.linspace(min(left, right), max(left, right), 101)
+        poles = poles[(poles < low) | (poles > high)]
+
+    return np.array([offset[best], scale[best], poles[best]])
+
+
+def load_points(file_name, delimiter=','):
+    """Read calibration points (gray value, dose) from the CSV file.
+
+    Result:
+        Tuple of format (gray_values, doses) of 1D numpy arrays.
+    """
+
+    reader = mdam.CSVDataReader()
+    data = reader.read_data(file_name, delimiter)
+
+    if data is None:
+        raise ValueError(
+            'Could not read calibration points from \'{0}\': {1}'
+            .format(file_name, reader.last_error)
+            )
+
+    data = data[~np.any(data == mdam.MIN_FLOAT, axis=1)]
+
+    return data[:, 0], data[:, 1]
+
+
+# =============================================================================
+# Model classes
+# =============================================================================
+
+class Calibration():
+    """Fitted gray value to dose calibration.
+
+    Use Calibration.fit() to fit a calibration to the calibration points, or
+    Calibration.load() to restore a saved one. Conversion of gray values
+    uses a dense lookup table spanning the range of calibration points.
+    Gray values outside that range are converted to NaN, unless clip is set
+    in which case they are clamped to the range.
+    """
+
+    def __init__(self, model, parameters, low, high, lut_size=LUT_SIZE):
+        if model not in CALIBRATION_MODELS:
+            raise ValueError(
+                'Calibration model must be one of "rational", "polynomial"'
+                )
+
+        if not high > low:
+            raise ValueError('Calibration range must not be empty.')
+
+        self._model = model
+        self._parameters = np.asarray(parameters, dtype=float)
+        self._low = float(low)
+        self._high = float(high)
+        self._step = (self._high - self._low) / (lut_size - 1)
+        self._lut = self.evaluate(
+            np.linspace(self._low, self._high, lut_size)
+            )
+
+    @classmethod
+    def fit(cls, gray_values, doses, model='rational', degree=3,
+            lut_size=LUT_SIZE):
+        """Fit calibration model to the calibration points.
+
+        Input:
+            gray_values:    1D array of gray values of calibration points.
+
+            doses:          1D array of doses of calibration points.
+
+            model:          Calibration model. Can have one of the
+                            following values:
+                                'rational' (dose = a + b / (x - c)),
+                                'polynomial'.
+
+            degree:         Degree of the polynomial model.
+
+            lut_size:       Number of lookup table entries.
+
+        Result:
+            Calibration object.
+        """
+
+        gray_values = np.asarray(gray_values, dtype=float)
+        doses = np.asarray(doses, dtype=float)
+
+        if gray_values.shape != doses.shape or gray_values.ndim != 1:
+            raise ValueError(
+                'Gray values and doses must be 1D arrays of the same size.'
+                )
+
+        if model == 'rational':
+            if gray_values.size < 3:
+                raise ValueError(
+                    'Rational model requires at least three points.'
+                    )
+            parameters = _fit_rational(gray_values, doses)
+
+        elif model == 'polynomial':
+            if gray_values.size <= degree:
+                raise ValueError(
+                    'Polynomial model requires more points than its degree.'
+                    )
+            parameters = np.polyfit(gray_values, doses, degree)
+
+        else:
+            raise ValueError(
+                'Calibration model must be one of "rational", "polynomial"'
+                )
+
+        return cls(
+            model,
+            parameters,
+            gray_values.min(),
+            gray_values.max(),
+            lut_size
+            )
+
+    @classmethod
+    def load(cls, file_name):
+        """Restore calibration saved by save().
+        """
+
+        with np.load(file_name) as archive:
+            calibration = cls.__new__(cls)
+            calibration._model = str(archive['model'])
+            calibration._parameters = archive['parameters']
+            calibration._low = float(archive['low'])
+            calibration._high = float(archive['high'])
+            calibration._lut = archive['lut']
+            calibration._step = (calibration._high - calibration._low) \
+                / (calibration._lut.size - 1)
+
+        return calibration
+
+    def save(self, file_name):
+        """Save calibration (parameters and lookup table) to a NumPy archive.
+        """
+
+        np.savez(
+            file_name,
+            model=np.array(self._model),
+            parameters=self._parameters,
+            low=self._low,
+            high=self._high,
+            lut=self._lut
+            )
+
+    @property
+    def model(self):
+        """Calibration model.
+        """
+
+        return self._model
+
+    @property
+    def parameters(self):
+        """Fitted model parameters. For the rational model these are (a, b,
+        c), and for the polynomial model polynomial coefficients, highest
+        power first.
+        """
+
+        return self._parameters
+
+    @property
+    def range(self):
+        """Range of gray values covered by the calibration.
+        """
+
+        return (self._low, self._high)
+
+    def evaluate(self, gray_values):
+        """Evaluate fitted model directly, without the lookup table.
+        """
+
+        gray_values = np.asarray(gray_values, dtype=float)
+
+        if self._model == 'rational':
+            offset, scale, pole = self._parameters
+            return offset + scale / (gray_values - pole)
+
+        return np.polyval(self._parameters, gray_values)
+
+    def apply(self, gray_values, out=None, clip=False, chunk_size=CHUNK_SIZE):
+        """Convert gray values to dose.
+
+        Input:
+            gray_values:    Array of any shape, including numpy memmap.
+
+            out:            Optional float array of the same shape where
+                            result is stored (e.g. writable memmap).
+
+            clip:           If True gray values outside the calibration
+                            range are clamped to it, othervise they are
+                            converted to NaN. NaN gray values are always
+                            converted to NaN.
+
+            chunk_size:     Number of elements converted at once. Limits
+                            memory used for temporaries when converting
+                            large (memory mapped) arrays.
+
+        Result:
+            Float array of dose values of the same shape as gray_values.
+        """
+
+        gray_values = np.asarray(gray_values)
+        if out is None:
+            out = np.empty(gray_values.shape, dtype=float)
+        elif out.shape != gray_values.shape:
+            raise ValueError('Output array must have the same shape as input.')
+
+        source = gray_values.reshape(-1)
+        target = out.reshape(-1)
+        if not np.shares_memory(target, out):
+            raise ValueError('Output array must be contiguous.')
+
+        last = self._lut.size - 1
+        for start in range(0, source.size, chunk_size):
+            stop = min(start + chunk_size, source.size)
+            position = (source[start:stop] - self._low) / self._step
+
+            # NaN gray values (e.g. masked pixels) are converted to NaN
+            # regardless of clip.
+            missing = ~np.isfinite(position)
+            outside = (position < 0.0) | (position > last)
+            position = np.clip(np.where(missing, 0.0, position), 0.0, last)
+            index = np.minimum(position.astype(np.intp), last - 1)
+            fraction = position - index
+
+            dose = self._lut[index] \
+                + fraction * (self._lut[index + 1] - self._lut[index])
+            if not clip:
+                dose[outside] = np.nan
+            dose[missing] = np.nan
+
+            target[start:stop] = dose
+
+        return out
+
+    def apply_graph(self, graph, **kwargs):
+        """Return new Graph object with ordinate values of the given graph
+        converted to dose. Key-word arguments are passed to apply().
+        """
+
+        data = np.column_stack((graph.x, self.apply(graph.y, **kwargs)))
+
+        return mdam.Graph(
+            data,
+            (graph.headers[0], 'Dose_(Gy)'),
+            graph.title
+            )
+
+
+def cached_fit(
+        gray_values,
+        doses,
+        model='rational',
+        degree=3,
+        lut_size=LUT_SIZE,
+        cache_dir=CACHE_DIR
+        ):
+    """Fit calibration or restore it from the cache.
+
+    Cache entries are keyed by the calibration points and fit settings, so
+    the same calibration is fitted only once. If cache directory can not be
+    written the calibration is fitted and returned without caching.
+
+    Arguments are the same as for Calibration.fit(), with cache_dir being
+    the directory holding cached calibrations.
+    """
+
+    gray_values = np.ascontiguousarray(gray_values, dtype=float)
+    doses = np.ascontiguousarray(doses, dtype=float)
+
+    digest = hashlib.sha1()
+    digest.update(gray_values.tobytes())
+    digest.update(doses.tobytes())
+    digest.update('{0}:{1}:{2}'.format(model, degree, lut_size).encode())
+    file_name = join(cache_dir, digest.hexdigest() + '.npz')
+
+    if isfile(file_name):
+        try:
+            return Calibration.load(file_name)
+        except (OSError, ValueError, KeyError):
+            pass  # Corrupt cache entry, fit again.
+
+    calibration = Calibration.fit(gray_values, doses, model, degree, lut_size)
+
+    try:
+        makedirs(cache_dir, exist_ok=True)
+        calibration.save(file_name)
+    except OSError:
+        pass  # Caching is optional.
+
+    return calibration
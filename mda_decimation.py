@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""Display decimation of long data series.
+
+A plot can not show more detail than there are pixel columns in the axes, so
+drawing millions of samples only costs time. Series are reduced to the
+minimum and the maximum sample of each pixel column of the visible range.
+The resulting line looks the same as the full resolution one, with peaks
+and edges preserved, while having at most two vertices per pixel column.
+
+For interactive zoom and pan a min/max pyramid of the series is built once,
+so each view change only has to look up the extremes of the visible blocks
+at the coarsest level that still has a block per pixel column.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] S. Steinarsson, Downsampling Time Series for Visual Representation,
+#     MSc thesis, University of Iceland, 2013.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+import numpy as np
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Width (in pixels) assumed when the actual canvas width is unknown.
+DEFAULT_WIDTH = 1000
+
+# Number of samples in a block of the finest pyramid level. Each coarser
+# level has blocks twice as long as the previous one.
+PYRAMID_BASE = 8
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+def is_increasing(x_values):
+    """Returns True if abscissa values are sorted in non-decreasing order,
+    which is required for decimation of the visible range.
+    """
+
+    return bool(np.all(x_values[1:] >= x_values[:-1]))
+
+
+def visible_range(x_values, low, high):
+    """Returns tuple of format (start, stop) of indices of samples that fall
+    in the [low, high] range, extended by one sample on each side so lines
+    run to the edges of the axes.
+
+    Input:
+        x_values:   1D numpy array of abscissa values sorted in
+                    non-decreasing order.
+
+        low, high:  Limits of the visible range. If None, data limits are
+                    used.
+    """
+
+    start = 0
+    stop = x_values.size
+    if low is not None:
+        start = max(int(np.searchsorted(x_values, low, side='left')) - 1, 0)
+    if high is not None:
+        stop = min(
+            int(np.searchsorted(x_values, high, side='right')) + 1,
+            x_values.size
+            )
+
+    return start, max(stop, start)
+
+
+def _first_hits(hits, starts, stops):
+    """Utility routine that returns index of the first True element of hits
+    in each [start, stop) segment. Segments without hits yield the segment
+    start.
+    """
+
+    positions = np.flatnonzero(hits)
+    if positions.size == 0:
+        return starts.copy()
+
+    first = positions[np.minimum(
+        np.searchsorted(positions, starts),
+        positions.size - 1
+        )]
+
+    return np.where(first < stops, first, starts)
+
+
+def nearest_index(x_values, x_value):
+    """Returns index of the sample nearest to the given abscissa value.
+    Abscissa values must be sorted in non-decreasing order, so the sample
+    is found by binary search in O(log N).
+    """
+
+    index = int(np.searchsorted(x_values, x_value))
+    if index == 0:
+        return 0
+    if index == x_values.size:
+        return x_values.size - 1
+
+    if x_values[index] - x_value < x_value - x_values[index - 1]:
+        return index
+
+    return index - 1
+
+
+def value_at(x_values, y_values, x_value):
+    """Returns ordinate value linearly interpolated at the given abscissa
+    value, or NaN if the value is outside the data range. Abscissa values
+    must be sorted in non-decreasing order. Bracketing samples are found by
+    binary search in O(log N).
+    """
+
+    if x_values.size == 0 or x_value < x_values[0] \
+            or x_value > x_values[-1]:
+        return np.nan
+
+    if x_values.size == 1:
+        return float(y_values[0])
+
+    upper = int(np.clip(np.searchsorted(x_values, x_value), 1,
+                        x_values.size - 1))
+    lower = upper - 1
+    span = x_values[upper] - x_values[lower]
+    if span == 0.0:
+        return float(y_values[upper])
+
+    weight = (x_value - x_values[lower]) / span
+
+    return float(
+        y_values[lower] + weight * (y_values[upper] - y_values[lower])
+        )
+
+
+# =============================================================================
+# Decimation
+# =============================================================================
+
+def minmax_indices(x_values, y_values, low=None, high=None,
+                   width=DEFAULT_WIDTH):
+    """Selects samples to draw for the visible range of a series.
+
+    Visible range is split into width equally wide columns, and for each
+    column the samples with minimum and maximum ordinate are kept, in their
+    original order. If the visible range has no more than two samples per
+    column all of them are kept. Samples bracketing the visible range are
+    always kept.
+
+    Input:
+        x_values:   1D numpy array of abscissa values sorted in
+                    non-decreasing order.
+
+        y_values:   1D numpy array of ordinate values.
+
+        low, high:  Limits of the visible range. If None, data limits are
+                    used.
+
+        width:      Number of pixel columns the range is drawn on.
+
+    Result:
+        1D numpy array of sorted sample indices.
+    """
+
+    if x_values.shape != y_values.shape or x_values.ndim != 1:
+        raise ValueError(
+            'Abscissa and ordinate must be 1D arrays of the same size.'
+            )
+
+    width = max(int(width), 1)
+    start, stop = visible_range(x_values, low, high)
+
+    if stop - start <= 2 * width + 2:
+        return np.arange(start, stop)
+
+    # Keep the bracketing samples as they are and bin the inner ones.
+    inner_x = x_values[start + 1:stop - 1]
+    inner_y = y_values[start + 1:stop - 1]
+    low = inner_x[0] if low is None else low
+    high = inner_x[-1] if high is None else high
+    span = (high - low) if high > low else 1.0
+
+    columns = ((inner_x - low) * (width / span)).astype(np.int64)
+    np.clip(columns, 0, width - 1, out=columns)
+
+    # Abscissa is sorted, so columns are too and every column is one
+    # contiguous segment.
+    bounds = np.flatnonzero(np.diff(columns)) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [columns.size]))
+    counts = stops - starts
+
+    # NaN values are ignored by fmin/fmax and never match the extremes.
+    minima = np.fmin.reduceat(inner_y, starts)
+    maxima = np.fmax.reduceat(inner_y, starts)
+    argmin = _first_hits(inner_y == np.repeat(minima, counts), starts, stops)
+    argmax = _first_hits(inner_y == np.repeat(maxima, counts), starts, stops)
+
+    indices = np.concatenate((
+        [start],
+        np.sort(np.column_stack((argmin, argmax)), axis=1).ravel()
+        + (start + 1),
+        [stop - 1]
+        ))
+
+    # Drop duplicates of flat columns (minimum and maximum are the same
+    # sample).
+    keep = np.ones(indices.size, dtype=bool)
+    keep[1:] = indices[1:] != indices[:-1]
+
+    return indices[keep]
+
+
+def decimate(x_values, y_values, low=None, high=None, width=DEFAULT_WIDTH):
+    """Returns decimated series for display of the visible range (see
+    minmax_indices()).
+
+    Input:
+        See minmax_indices().
+
+    Result:
+        Tuple of format (x, y) of decimated 1D numpy arrays.
+    """
+
+    x_values = np.asarray(x_values)
+    y_values = np.asarray(y_values)
+    indices = minmax_indices(x_values, y_values, low, high, width)
+
+    return x_values[indices], y_values[indices]
+
+
+# =============================================================================
+# Level of detail pyramid
+# =============================================================================
+
+class MinMaxPyramid():
+    """Min/max level of detail pyramid of a series.
+
+    Each level splits the series into blocks of equal length and keeps
+    indices of the minimum and the maximum sample of each block. Blocks of
+    the finest level are PYRAMID_BASE samples long and every next level is
+    reduced from the previous one by merging pairs of blocks.
+
+    Indices of the samples are kept instead of their values, so the drawn
+    vertices lie exactly on the measured samples.
+    """
+
+    def __init__(self, x_values, y_values, base=PYRAMID_BASE):
+        """Builds all levels of the pyramid.
+
+        Input:
+            x_values:   1D numpy array of abscissa values sorted in
+                        non-decreasing order.
+
+            y_values:   1D numpy array of ordinate values.
+
+            base:       Number of samples in a block of the finest level.
+        """
+
+        self._x = np.asarray(x_values)
+        self._y = np.asarray(y_values)
+
+        if self._x.shape != self._y.shape or self._x.ndim != 1:
+            raise ValueError(
+                'Abscissa and ordinate must be 1D arrays of the same size.'
+                )
+
+        if base < 2:
+            raise ValueError('Base block length must be at least 2.')
+
+        self._base = int(base)
+        self._levels = list()
+        dtype = np.int32 if self._y.size < np.iinfo(np.int32).max \
+            else np.int64
+
+        if self._y.size < 2 * self._base:
+            return
+
+        # Finest level is reduced from the samples directly. NaN values
+        # never become block extremes unless the whole block is NaN.
+        count = self._y.size // self._base
+        blocks = self._y[:count * self._base].reshape(count, self._base)
+        missing = np.isnan(blocks)
+        offsets = np.arange(count, dtype=dtype) * self._base
+        minima = (np.argmin(np.where(missing, np.inf, blocks), axis=1)
+                  + offsets).astype(dtype)
+        maxima = (np.argmax(np.where(missing, -np.inf, blocks), axis=1)
+                  + offsets).astype(dtype)
+        self._levels.append((minima, maxima))
+
+        # Coarser levels merge pairs of blocks of the previous level.
+        while minima.size >= 2:
+            count = minima.size // 2
+            minima = self._merge(minima[:2 * count], np.less)
+            maxima = self._merge(maxima[:2 * count], np.greater)
+            self._levels.append((minima, maxima))
+
+    def _merge(self, indices, better):
+        """Reduces pairs of neighbouring blocks to one block keeping the
+        index of the better (less or greater) of their extremes.
+        """
+
+        pairs = indices.reshape(-1, 2)
+        first = self._y[pairs[:, 0]]
+        second = self._y[pairs[:, 1]]
+        take_second = better(second, first) | np.isnan(first)
+
+        return np.where(take_second, pairs[:, 1], pairs[:, 0])
+
+    @property
+    def levels(self):
+        """Number of levels of the pyramid.
+        """
+
+        return len(self._levels)
+
+    def block_length(self, level):
+        """Number of samples in a block of the given level.
+        """
+
+        return self._base << level
+
+    def level_for(self, start, stop, width):
+        """Returns the coarsest level that has at least one block per pixel
+        column for the [start, stop) range of samples, or None if even the
+        finest level has fewer blocks than columns.
+        """
+
+        blocks = (stop - start) // self._base
+        if blocks < width or not self._levels:
+            return None
+
+        return min(int(np.log2(blocks // width)), len(self._levels) - 1)
+
+    def indices(self, low=None, high=None, width=DEFAULT_WIDTH):
+        """Selects samples to draw for the visible range of the series (see
+        minmax_indices()).
+
+        Input:
+            low, high:  Limits of the visible range. If None, data limits
+                        are used.
+
+            width:      Number of pixel columns the range is drawn on.
+
+        Result:
+            1D numpy array of sorted sample indices.
+        """
+
+        width = max(int(width), 1)
+        start, stop = visible_range(self._x, low, high)
+        level = self.level_for(start, stop, width)
+
+        if level is None:
+            # Few enough samples to decimate directly.
+            return minmax_indices(
+                self._x[start:stop],
+                self._y[start:stop],
+                low,
+                high,
+                width
+                ) + start
+
+        minima, maxima = self._levels[level]
+        length = self.block_length(level)
+
+        # Only blocks lying wholly in the range are taken from the pyramid,
+        # so extremes of samples outside the range are never shown. Samples
+        # of the partial blocks at both ends, and samples past the last
+        # block of the pyramid, span less than a block, so their extremes
+        # are taken directly.
+        first = min(-(-start // length), minima.size)
+        last = max(min(stop // length, minima.size), first)
+        head_stop = min(first * length, stop)
+        tail_start = max(last * length, head_stop)
+
+        head = minmax_indices(
+            self._x[start:head_stop],
+            self._y[start:head_stop],
+            width=1
+            ) + start
+        tail = minmax_indices(
+            self._x[tail_start:stop],
+            self._y[tail_start:stop],
+            width=1
+            ) + tail_start
+
+        return np.unique(np.concatenate((
+            [start, stop - 1],
+            head,
+            minima[first:last],
+            maxima[first:last],
+            tail
+            )))
+
+    def decimate(self, low=None, high=None, width=DEFAULT_WIDTH):
+        """Returns decimated series for display of the visible range.
+
+        Result:
+            Tuple of format (x, y) of decimated 1D numpy arrays.
+        """
+
+        indices = self.indices(low, high, width)
+
+        return self._x[indices], self._y[indices]
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""Dose-volume histogram (DVH) computation and metrics.
+
+DVHs of many structures are either loaded from exported differential DVHs
+or computed directly from a dose grid and structure masks. Differential
+DVHs binned on a common dose grid are converted to cumulative DVHs once,
+after which dose-at-volume (Dx), volume-at-dose (Vx), mean, minimum and
+maximum dose queries are answered for all of them at once.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+import numpy as np
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Default dose bin width in Gy.
+BIN_WIDTH = 0.01
+
+# Default number of voxels processed at once.
+CHUNK_SIZE = 1 << 22
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+DVHMetrics = namedtuple('DVHMetrics', 'mean min max d2 d98')
+
+
+def bin_edges(bin_centers):
+    """Compute dose bin edges from dose bin centers.
+
+    Inner edges are placed halfway between neighbouring centers, while the
+    outer ones are placed half a bin width away from the first and the last
+    center.
+    """
+
+    centers = np.asarray(bin_centers, dtype=float)
+
+    if centers.ndim != 1 or centers.size < 2:
+        raise ValueError('At least two dose bin centers are required.')
+
+    if np.any(np.diff(centers) <= 0.0):
+        raise ValueError('Dose bin centers must be strictly increasing.')
+
+    middle = 0.5 * (centers[:-1] + centers[1:])
+
+    return np.r_[
+        2.0 * centers[0] - middle[0],
+        middle,
+        2.0 * centers[-1] - middle[-1]
+        ]
+
+
+# =============================================================================
+# Model classes
+# =============================================================================
+
+class DVHSet():
+    """Set of dose-volume histograms sharing the same dose bins.
+
+    Each row of the volumes array holds differential DVH of one structure
+    (or one structure in one plan). Cumulative DVHs are computed once on
+    construction, so all queries are answered by binary search and linear
+    interpolation without touching the differential data again.
+    """
+
+    def __init__(self, bin_centers, volumes, names=None):
+        volumes = np.atleast_2d(np.asarray(volumes, dtype=float))
+        edges = bin_edges(bin_centers)
+
+        if volumes.shape[1] != edges.size - 1:
+            raise ValueError(
+                'Volumes must have the same number of bins as bin centers.'
+                )
+
+        if names is None:
+            names = tuple(
+                'Structure {0}'.format(index + 1)
+                for index in range(volumes.shape[0])
+                )
+        elif len(names) != volumes.shape[0]:
+            raise ValueError('There must be one name per DVH.')
+
+        self._names = tuple(names)
+        self._centers = np.asarray(bin_centers, dtype=float)
+        self._edges = edges
+        self._differential = volumes
+
+        # Cumulative volume receiving at least the dose of each bin edge.
+        # Last edge receives no volume at all.
+        self._cumulative = np.zeros((volumes.shape[0], edges.size))
+        self._cumulative[:, :-1] = np.cumsum(
+            volumes[:, ::-1],
+            axis=1
+            )[:, ::-1]
+        self._total = self._cumulative[:, 0]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self._relative = 100.0 * self._cumulative \
+                / self._total[:, np.newaxis]
+
+        # Flattened search keys for Dx queries. Each row of the relative
+        # cumulative DVH is turned into a non-decreasing sequence (100 - V)
+        # and shifted by the row number times a constant larger than 100, so
+        # queries for all rows are answered by a single binary search.
+        self._key_step = 200.0
+        self._keys = (
+            (100.0 - np.nan_to_num(self._relative, nan=100.0))
+            + self._key_step * np.arange(volumes.shape[0])[:, np.newaxis]
+            ).ravel()
+
+    @classmethod
+    def from_graphs(cls, graphs):
+        """Create DVH set from Graph objects holding differential DVHs (dose
+        bin centers as abscissa, volume as ordinate). All graphs must share
+        the same dose bins.
+        """
+
+        centers = np.asarray(graphs[0].x, dtype=float)
+        for graph in graphs[1:]:
+            if not np.array_equal(graph.x, centers):
+                raise ValueError('All DVHs must share the same dose bins.')
+
+        return cls(
+            centers,
+            np.vstack([graph.y for graph in graphs]),
+            names=[graph.headers[1] for graph in graphs]
+            )
+
+    @property
+    def names(self):
+        """Names of the structures in the set.
+        """
+
+        return self._names
+
+    @property
+    def bin_centers(self):
+        """Dose bin centers.
+        """
+
+        return self._centers
+
+    @property
+    def bin_edges(self):
+        """Dose bin edges.
+        """
+
+        return self._edges
+
+    @property
+    def differential(self):
+        """Differential DVHs, one per row.
+        """
+
+        return self._differential
+
+    @property
+    def total_volume(self):
+        """Total volume of each structure.
+        """
+
+        return self._total
+
+    def cumulative(self, relative=True):
+        """Cumulative DVHs sampled at dose bin edges, one per row. If relative
+        is True volumes are given in percent of the total volume.
+        """
+
+        if relative:
+            return self._relative
+
+        return self._cumulative
+
+    def dose_at_volume(self, volume):
+        """Compute minimum dose received by the hottest given percentage of
+        volume (Dx) for all structures.
+
+        Input:
+            volume: Scalar or 1D array of volumes in percent of the total
+                    volume.
+
+        Result:
+            2D numpy array of shape (structure_count, query_count).
+        """
+
+        volume = np.atleast_1d(np.asarray(volume, dtype=float))
+        row_count, edge_count = self._relative.shape
+        rows = np.arange(row_count)[:, np.newaxis]
+
+        # First edge (per row) whose cumulative volume drops below the
+        # queried volume.
+        queries = (100.0 - volume) + self._key_step * rows
+        upper = np.searchsorted(self._keys, queries, side='right') \
+            - rows * edge_count
+        upper = np.clip(upper, 1, edge_count - 1)
+        lower = upper - 1
+
+        v_lower = self._relative[rows, lower]
+        v_upper = self._relative[rows, upper]
+        span = v_lower - v_upper
+        weight = np.where(
+            span > 0.0,
+            (v_lower - volume) / np.where(span > 0.0, span, 1.0),
+            0.0
+            )
+
+        result = self._edges[lower] \
+            + weight * (self._edges[upper] - self._edges[lower])
+
+        return np.where(np.isnan(v_lower), np.nan, result)
+
+    def volume_at_dose(self, dose, relative=True):
+        """Compute volume receiving at least given dose (Vx) for all
+        structures.
+
+        Input:
+            dose:       Scalar or 1D array of doses in Gy.
+
+            relative:   If True volumes are given in percent of the total
+                        volume, othervise in absolute units.
+
+        Result:
+            2D numpy array of shape (structure_count, query_count).
+        """
+
+        dose = np.atleast_1d(np.asarray(dose, dtype=float))
+        cumulative = self.cumulative(relative)
+
+        clipped = np.clip(dose, self._edges[0], self._edges[-1])
+        upper = np.clip(
+            np.searchsorted(self._edges, clipped, side='right'),
+            1,
+            self._edges.size - 1
+            )
+        lower = upper - 1
+        weight = (clipped - self._edges[lower]) \
+            / (self._edges[upper] - self._edges[lower])
+
+        return cumulative[:, lower] * (1.0 - weight) \
+            + cumulative[:, upper] * weight
+
+    def mean_dose(self):
+        """Compute mean dose of all structures.
+        """
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self._differential @ self._centers) / self._total
+
+    def min_dose(self):
+        """Compute minimum dose (center of the first non-empty bin) of all
+        structures.
+        """
+
+        occupied = self._differential > 0.0
+        first = np.argmax(occupied, axis=1)
+
+        return np.where(occupied.any(axis=1), self._centers[first], np.nan)
+
+    def max_dose(self):
+        """Compute maximum dose (center of the last non-empty bin) of all
+        structures.
+        """
+
+        occupied = self._differential[:, ::-1] > 0.0
+        last = self._centers.size - 1 - np.argmax(occupied, axis=1)
+
+        return np.where(occupied.any(axis=1), self._centers[last], np.nan)
+
+    def metrics(self):
+        """Compute summary metrics (mean, minimum and maximum dose, D2 and
+        D98) for all structures.
+
+        Result:
+            DVHMetrics named tuple of 1D numpy arrays with one value per
+            structure.
+        """
+
+        near_min_max = self.dose_at_volume([2.0, 98.0])
+
+        return DVHMetrics(
+            mean=self.mean_dose(),
+            min=self.min_dose(),
+            max=self.max_dose(),
+            d2=near_min_max[:, 0],
+            d98=near_min_max[:, 1]
+            )
+
+    def to_graphs(self, cumulative=False):
+        """Return one Graph object per structure.
+
+        Differential DVHs use the same layout as DVHs exported by the
+        planning system (dose bin centers as abscissa, volume as ordinate).
+        Cumulative DVHs are sampled at bin edges, with volume given in
+        percent of the total volume.
+        """
+
+        graphs = list()
+        for index, name in enumerate(self._names):
+            if cumulative:
+                data = np.column_stack((self._edges, self._relative[index]))
+                headers = ('Dose(Gy)', '{0} (%)'.format(name))
+            else:
+                data = np.column_stack(
+                    (self._centers, self._differential[index])
+                    )
+                headers = ('Bin center(Gy)', name)
+            graphs.append(mdam.Graph(data, headers, name))
+
+        return graphs
+
+
+# =============================================================================
+# DVH computation
+# =============================================================================
+
+def load_dose(file_name):
+    """Load dose grid saved with numpy.save() as a read-only memory map, so
+    large grids are not read into memory at once.
+    """
+
+    return np.load(file_name, mmap_mode='r')
+
+
+def build_dvh(
+        dose,
+        masks,
+        names=None,
+        bin_width=BIN_WIDTH,
+        max_dose=None,
+        voxel_volume=1.0,
+        chunk_size=CHUNK_SIZE
+        ):
+    """Compute DVHs of many structures from a dose grid.
+
+    Voxels are processed in chunks. For each chunk, bin indices of all
+    voxels are computed once and the voxels of all structures are counted
+    with a single numpy.bincount() call over combined (structure, bin)
+    indices. Structures may overlap.
+
+    Input:
+        dose:           Dose grid in Gy, numpy array or memmap of any shape.
+
+        masks:          Boolean array of shape (structure_count,
+                        *dose.shape) or sequence of boolean arrays of the
+                        same shape as dose.
+
+        names:          Names of the structures.
+
+        bin_width:      Dose bin width in Gy.
+
+        max_dose:       Upper dose limit of the histogram. If None, maximum
+                        of the dose grid is used. Voxels above the limit are
+                        counted in the last bin.
+
+        voxel_volume:   Volume of a single voxel (e.g. in cm3).
+
+        chunk_size:     Number of voxels processed at once.
+
+    Result:
+        DVHSet object.
+    """
+
+    if bin_width <= 0.0:
+        raise ValueError('Bin width must be positive.')
+
+    flat_dose = np.asarray(dose).reshape(-1)
+    flat_masks = [np.asarray(mask).reshape(-1) for mask in masks]
+
+    for mask in flat_masks:
+        if mask.size != flat_dose.size:
+            raise ValueError('Masks must have the same shape as dose.')
+
+    if max_dose is None:
+        max_dose = 0.0
+        for start in range(0, flat_dose.size, chunk_size):
+            max_dose = max(
+                max_dose,
+                float(np.max(flat_dose[start:start + chunk_size]))
+                )
+
+    bin_count = int(np.floor(max_dose / bin_width)) + 1
+    structure_count = len(flat_masks)
+    counts = np.zeros(structure_count * bin_count, dtype=np.int64)
+
+    for start in range(0, flat_dose.size, chunk_size):
+        stop = min(start + chunk_size, flat_dose.size)
+
+        bins = np.clip(
+            (flat_dose[start:stop] / bin_width).astype(np.intp),
+            0,
+            bin_count - 1
+            )
+        selected = np.stack([mask[start:stop] for mask in flat_masks])
+        structure, voxel = np.nonzero(selected)
+
+        counts += np.bincount(
+            structure * bin_count + bins[voxel],
+            minlength=structure_count * bin_count
+            )
+
+    centers = (np.arange(bin_count) + 0.5) * bin_width
+    if bin_count == 1:
+        # DVHSet needs at least two bins.
+        centers = np.r_[centers, centers + bin_width]
+        counts = np.column_stack((
+            counts.reshape(structure_count, 1),
+            np.zeros((structure_count, 1), dtype=np.int64)
+            )).reshape(-1)
+        bin_count = 2
+
+    return DVHSet(
+        centers,
+        counts.reshape(structure_count, bin_count) * voxel_volume,
+        names
+        )
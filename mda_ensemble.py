@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Streaming statistics of repeated measurements.
+
+Repeated scans are added one at a time, resampled onto a common grid and
+folded into Welford running accumulators, so memory use doesn't depend on
+the number of repeats. Mean, standard deviation and min/max envelope are
+available at any time.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] B. P. Welford, Note on a method for calculating corrected sums of
+#     squares and products, Technometrics 4 (3), 1962.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from os.path import basename
+import numpy as np
+import mda_models as mdam
+import mda_resample as mdar
+
+
+# =============================================================================
+# Model classes
+# =============================================================================
+
+class EnsembleAggregator():
+    """Running mean, standard deviation and min/max envelope of repeated
+    measurements on a common grid.
+
+    If grid is not given, abscissa of the first added data set is used.
+    Grid samples not covered by a data set are not counted for that data
+    set, so each grid sample keeps its own count.
+    """
+
+    def __init__(self, grid=None, method='linear', headers=None, title=None):
+        self._grid = None
+        self._method = method
+        self.headers = headers
+        self.title = title
+
+        # Welford accumulators.
+        self._count = None
+        self._mean = None
+        self._m2 = None
+        self._min = None
+        self._max = None
+
+        if grid is not None:
+            self._allocate(np.asarray(grid, dtype=float))
+
+    def _allocate(self, grid):
+        """Set up grid and allocate accumulators.
+        """
+
+        self._grid = grid
+        self._count = np.zeros(grid.size, dtype=np.int64)
+        self._mean = np.zeros(grid.size, dtype=float)
+        self._m2 = np.zeros(grid.size, dtype=float)
+        self._min = np.full(grid.size, np.nan)
+        self._max = np.full(grid.size, np.nan)
+
+    def add(self, data):
+        """Add a data set to the ensemble.
+
+        Input:
+            data:   2D numpy array as returned by CSVDataReader.read_data(),
+                    with abscissa in the first and ordinate in the second
+                    column. Rows flagged as erroneous by the reader (filled
+                    with MIN_FLOAT) are ignored. Samples sharing the same
+                    abscissa value are replaced by their mean.
+        """
+
+        data = np.asarray(data, dtype=float)
+        if data.ndim != 2 or data.shape[1] < 2:
+            raise ValueError('Data set must have at least two columns.')
+
+        data = data[~np.any(data == mdam.MIN_FLOAT, axis=1)]
+
+        # Interpolation needs strictly increasing abscissa, so repeated
+        # abscissa values are averaged (np.unique() also sorts them).
+        x_values, inverse, counts = np.unique(
+            data[:, 0],
+            return_inverse=True,
+            return_counts=True
+            )
+        data = np.column_stack((
+            x_values,
+            np.bincount(inverse, weights=data[:, 1]) / counts
+            ))
+
+        if self._grid is None:
+            self._allocate(data[:, 0].copy())
+
+        if data.shape[0] == self._grid.size \
+                and np.array_equal(data[:, 0], self._grid):
+            values = data[:, 1]
+        else:
+            values = mdar.get_plan(
+                data[:, 0],
+                self._grid,
+                method=self._method,
+                antialias=False
+                ).apply(data[:, 1])
+
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0.0)
+
+        self._count += valid
+        delta = values - self._mean
+        self._mean += np.where(valid, delta / np.maximum(self._count, 1), 0.0)
+        self._m2 += np.where(valid, delta * (values - self._mean), 0.0)
+        self._min = np.where(valid, np.fmin(self._min, values), self._min)
+        self._max = np.where(valid, np.fmax(self._max, values), self._max)
+
+    def add_graph(self, graph):
+        """Add data set held by a Graph object to the ensemble.
+        """
+
+        self.add(np.column_stack((graph.x, graph.y)))
+
+        if self.headers is None:
+            self.headers = graph.headers
+
+    def add_file(self, file_name, delimiter=','):
+        """Read a data set from the CSV file and add it to the ensemble.
+
+        It returns CSVDataReader instance used for reading, so its error
+        log can be examined. If file could not be red nothing is added.
+        """
+
+        reader = mdam.CSVDataReader()
+        data = reader.read_data(file_name, delimiter)
+
+        if data is not None:
+            self.add(data)
+            if self.headers is None:
+                self.headers = reader.headers
+            if self.title is None:
+                self.title = basename(file_name)
+
+        return reader
+
+    @property
+    def grid(self):
+        """Common grid all data sets are resampled onto.
+        """
+
+        return self._grid
+
+    @property
+    def count(self):
+        """Number of data sets contributing to each grid sample.
+        """
+
+        return self._count
+
+    @property
+    def mean(self):
+        """Mean value at each grid sample. NaN where no data set contributes.
+        """
+
+        return np.where(self._count > 0, self._mean, np.nan)
+
+    @property
+    def variance(self):
+        """Sample variance at each grid sample. NaN where less than two data
+        sets contribute.
+        """
+
+        return np.where(
+            self._count > 1,
+            self._m2 / np.maximum(self._count - 1, 1),
+            np.nan
+            )
+
+    @property
+    def std(self):
+        """Sample standard deviation at each grid sample.
+        """
+
+        return np.sqrt(self.variance)
+
+    @property
+    def minimum(self):
+        """Lower envelope of the ensemble.
+        """
+
+        return self._min
+
+    @property
+    def maximum(self):
+        """Upper envelope of the ensemble.
+        """
+
+        return self._max
+
+    def to_graph(self):
+        """Return EnsembleGraph holding current ensemble statistics.
+        """
+
+        if self._grid is None:
+            raise ValueError('No data sets were added to the ensemble.')
+
+        return EnsembleGraph(self)
+
+
+class EnsembleGraph(mdam.Graph):
+    """Graph holding mean of an ensemble of measurements together with its
+    standard deviation and min/max envelope. Statistics are a snapshot taken
+    when the graph is created.
+    """
+
+    def __init__(self, ensemble):
+        title = ensemble.title if ensemble.title else 'Ensemble'
+        super().__init__(
+            np.column_stack((ensemble.grid, ensemble.mean)),
+            ensemble.headers,
+            '{0} (n = {1})'.format(title, int(ensemble.count.max()))
+            )
+        self._stats = dict()
+        self._stats['std'] = ensemble.std
+        self._stats['min'] = ensemble.minimum.copy()
+        self._stats['max'] = ensemble.maximum.copy()
+        self._stats['count'] = ensemble.count.copy()
+
+    @property
+    def std(self):
+        """Sample standard deviation at each sample.
+        """
+
+        return self._stats['std']
+
+    @property
+    def minimum(self):
+        """Lower envelope of the ensemble.
+        """
+
+        return self._stats['min']
+
+    @property
+    def maximum(self):
+        """Upper envelope of the ensemble.
+        """
+
+        return self._stats['max']
+
+    @property
+    def count(self):
+        """Number of data sets contributing to each sample.
+        """
+
+        return self._stats['count']
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Batched non-linear least squares fitting of dose models.
+
+Levenberg-Marquardt iterations are carried out for a whole stack of curves
+at once: Jacobians, normal equations and trial steps of all curves are
+computed with single vectorized operations, and each curve has its own
+damping factor and convergence flag. Curves that have converged drop out
+of subsequent iterations.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] K. Madsen, H. B. Nielsen, O. Tingleff, Methods for non-linear least
+#     squares problems, 2nd ed., IMM DTU, 2004.
+# [2] M. Abramowitz, I. A. Stegun, Handbook of Mathematical Functions,
+#     formula 7.1.26, 1964.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+import numpy as np
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Coefficients of the rational approximation of the error function [2].
+_ERF_P = 0.3275911
+_ERF_A = (0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429)
+
+_TWO_OVER_SQRT_PI = 2.0 / np.sqrt(np.pi)
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+FitResult = namedtuple(
+    'FitResult',
+    'params residuals cost converged iterations'
+    )
+
+
+Model = namedtuple('Model', 'name param_names function jacobian guess')
+
+
+def erf(values):
+    """Vectorized error function (absolute error below 1.5E-7).
+    """
+
+    values = np.asarray(values, dtype=float)
+    magnitude = np.abs(values)
+    t = 1.0 / (1.0 + _ERF_P * magnitude)
+    poly = t * (_ERF_A[0] + t * (_ERF_A[1] + t * (
+        _ERF_A[2] + t * (_ERF_A[3] + t * _ERF_A[4])
+        )))
+
+    return np.sign(values) * (1.0 - poly * np.exp(-magnitude * magnitude))
+
+
+def _rows(x_values, count):
+    """Utility routine that returns abscissa as 2D array broadcastable
+    against count curves.
+    """
+
+    x_values = np.asarray(x_values, dtype=float)
+    if x_values.ndim == 1:
+        return x_values[np.newaxis, :]
+
+    return x_values[:count] if x_values.shape[0] != count else x_values
+
+
+def _edge_means(values, fraction=0.1):
+    """Utility routine that returns means of the first and the last fraction
+    of samples of each curve, ignoring NaNs.
+    """
+
+    count = max(int(values.shape[1] * fraction), 1)
+
+    return (
+        np.nanmean(values[:, :count], axis=1),
+        np.nanmean(values[:, -count:], axis=1)
+        )
+
+
+# =============================================================================
+# Models
+# =============================================================================
+
+def _sigmoid(x_values, params):
+    low, amplitude, center, width = (
+        params[:, k, np.newaxis] for k in range(4)
+        )
+
+    return low + 0.5 * amplitude * (1.0 + erf((x_values - center) / width))
+
+
+def _sigmoid_jacobian(x_values, params):
+    _, amplitude, center, width = (
+        params[:, k, np.newaxis] for k in range(4)
+        )
+    z = (x_values - center) / width
+    gauss = 0.5 * amplitude * _TWO_OVER_SQRT_PI * np.exp(-z * z)
+    ones = np.ones(np.broadcast(x_values, center).shape)
+
+    return np.stack(
+        (
+            ones,
+            0.5 * (1.0 + erf(z)) * ones,
+            -gauss / width,
+            -gauss * z / width
+            ),
+        axis=-1
+        )
+
+
+def _sigmoid_guess(x_values, y_values):
+    x_values = np.broadcast_to(x_values, y_values.shape)
+    first, last = _edge_means(y_values)
+    middle = 0.5 * (first + last)
+    nearest = np.nanargmin(np.abs(y_values - middle[:, np.newaxis]), axis=1)
+    rows = np.arange(y_values.shape[0])
+    span = np.nanmax(x_values, axis=1) - np.nanmin(x_values, axis=1)
+
+    return np.column_stack((
+        first,
+        last - first,
+        x_values[rows, nearest],
+        0.1 * span
+        ))
+
+
+def _exponential(x_values, params):
+    amplitude, rate, offset, origin = (
+        params[:, k, np.newaxis] for k in range(4)
+        )
+
+    return amplitude * np.exp(-rate * (x_values - origin)) + offset
+
+
+def _exponential_jacobian(x_values, params):
+    amplitude, rate, offset, origin = (
+        params[:, k, np.newaxis] for k in range(4)
+        )
+    decay = np.exp(-rate * (x_values - origin))
+    ones = np.ones(decay.shape)
+
+    return np.stack(
+        (
+            decay,
+            -amplitude * (x_values - origin) * decay,
+            ones,
+            np.zeros(decay.shape)
+            ),
+        axis=-1
+        )
+
+
+def _exponential_guess(x_values, y_values):
+    x_values = np.broadcast_to(x_values, y_values.shape)
+    first, last = _edge_means(y_values)
+    origin = np.nanmin(x_values, axis=1)
+    span = np.nanmax(x_values, axis=1) - origin
+    ratio = np.where(
+        (first > 0.0) & (last > 0.0),
+        first / np.where(last > 0.0, last, 1.0),
+        np.e
+        )
+    rate = np.log(np.where(ratio > 1.0, ratio, np.e)) / span
+
+    return np.column_stack((first, rate, np.zeros_like(first), origin))
+
+
+# Error function edge, used for penumbrae:
+#   f(x) = low + amplitude / 2 * (1 + erf((x - center) / width)).
+SIGMOID = Model(
+    name='sigmoid',
+    param_names=('low', 'amplitude', 'center', 'width'),
+    function=_sigmoid,
+    jacobian=_sigmoid_jacobian,
+    guess=_sigmoid_guess
+    )
+
+
+# Exponential tail, used for depth dose fall-off:
+#   f(x) = amplitude * exp(-rate * (x - origin)) + offset.
+# Origin is fixed at the start of the fitted range (its Jacobian column is
+# zero), which keeps amplitude and rate well conditioned.
+EXPONENTIAL = Model(
+    name='exponential',
+    param_names=('amplitude', 'rate', 'offset', 'origin'),
+    function=_exponential,
+    jacobian=_exponential_jacobian,
+    guess=_exponential_guess
+    )
+
+
+MODELS = {model.name: model for model in (SIGMOID, EXPONENTIAL)}
+
+
+# =============================================================================
+# Fitting
+# =============================================================================
+
+def levenberg_marquardt(
+        model,
+        x_values,
+        y_values,
+        initial=None,
+        max_iterations=100,
+        tolerance=1.0E-10,
+        damping=1.0E-3
+        ):
+    """Fit the model to a stack of curves by Levenberg-Marquardt method.
+
+    Input:
+        model:          Model named tuple (e.g. SIGMOID, EXPONENTIAL) or its
+                        name.
+
+        x_values:       1D numpy array of abscissa shared by all curves, or
+                        2D array holding abscissa of each curve.
+
+        y_values:       1D numpy array storing a single curve or 2D numpy
+                        array storing one curve per row. NaN samples are
+                        ignored.
+
+        initial:        Initial parameters, one row per curve. If None they
+                        are estimated from the data.
+
+        max_iterations: Maximum number of iterations per curve.
+
+        tolerance:      Curve is considered converged when relative decrease
+                        of the cost or relative size of the step falls
+                        below tolerance.
+
+        damping:        Initial damping factor.
+
+    Result:
+        FitResult named tuple, where params holds fitted parameters (one row
+        per curve), residuals holds data minus model (NaN where data is
+        missing), cost holds sum of squared residuals, converged holds
+        convergence flag and iterations number of iterations of each curve.
+    """
+
+    if isinstance(model, str):
+        if model not in MODELS:
+            raise ValueError(
+                'Model must be one of {0}'.format(', '.join(MODELS))
+                )
+        model = MODELS[model]
+
+    y_values = np.atleast_2d(np.asarray(y_values, dtype=float))
+    curve_count = y_values.shape[0]
+    x_values = _rows(x_values, curve_count)
+
+    if x_values.shape[-1] != y_values.shape[1]:
+        raise ValueError('Curves must have the same size as abscissa.')
+
+    weight = np.isfinite(y_values).astype(float)
+    observed = np.nan_to_num(y_values)
+
+    if initial is None:
+        params = model.guess(x_values, y_values)
+    else:
+        params = np.array(
+            np.broadcast_to(initial, (curve_count, len(model.param_names))),
+            dtype=float
+            )
+
+    def residual(rows, trial):
+        x_rows = x_values if x_values.shape[0] == 1 else x_values[rows]
+        return weight[rows] * (
+            observed[rows] - model.function(x_rows, trial)
+            )
+
+    all_rows = np.arange(curve_count)
+    residuals = residual(all_rows, params)
+    cost = (residuals * residuals).sum(axis=1)
+    lam = np.full(curve_count, damping)
+    active = np.isfinite(cost)
+    converged = np.zeros(curve_count, dtype=bool)
+    iterations = np.zeros(curve_count, dtype=int)
+    identity = np.eye(params.shape[1])
+
+    for _ in range(max_iterations):
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+
+        x_rows = x_values if x_values.shape[0] == 1 else x_values[rows]
+        jacobian = model.jacobian(x_rows, params[rows]) \
+            * weight[rows][:, :, np.newaxis]
+        normal = np.einsum('mnp,mnq->mpq', jacobian, jacobian)
+        gradient = np.einsum('mnp,mn->mp', jacobian, residuals[rows])
+
+        # Marquardt scaling by the diagonal of the normal matrix. Small
+        # identity term keeps matrices of fixed parameters invertible.
+        diagonal = np.einsum('mpp->mp', normal)
+        system = normal + lam[rows, np.newaxis, np.newaxis] * (
+            diagonal[:, :, np.newaxis] * identity
+            ) + 1.0E-12 * identity
+        step = np.linalg.solve(system, gradient[:, :, np.newaxis])[:, :, 0]
+
+        trial = params[rows] + step
+        trial_residuals = residual(rows, trial)
+        trial_cost = (trial_residuals * trial_residuals).sum(axis=1)
+
+        better = np.isfinite(trial_cost) & (trial_cost < cost[rows])
+        improved = rows[better]
+        decrease = cost[improved] - trial_cost[better]
+
+        params[improved] = trial[better]
+        residuals[improved] = trial_residuals[better]
+        cost[improved] = trial_cost[better]
+        lam[improved] *= 0.1
+        lam[rows[~better]] *= 10.0
+        iterations[rows] += 1
+
+        small_step = np.all(
+            np.abs(step) <= tolerance * (np.abs(params[rows]) + tolerance),
+            axis=1
+            )
+        done = small_step.copy()
+        done[better] |= decrease <= tolerance * (cost[improved] + tolerance)
+        converged[rows[done]] = True
+
+        # Curves whose damping has grown out of bounds have stalled.
+        stalled = lam[rows] > 1.0E12
+        active[rows[done | stalled]] = False
+
+    fitted = np.where(
+        weight > 0.0,
+        observed - model.function(x_values, params),
+        np.nan
+        )
+
+    return FitResult(
+        params=params,
+        residuals=fitted,
+        cost=cost,
+        converged=converged,
+        iterations=iterations
+        )
+
+
+def fit_graphs(graphs, model, x_range=None, **kwargs):
+    """Fit the model to ordinate values of given Graph objects.
+
+    Graphs are fitted together in batches of equal size. Fit results are
+    cached in each graph (see Graph.cached()), so repeated requests with
+    the same settings don't refit.
+
+    Input:
+        graphs:     Sequence of Graph objects.
+
+        model:      Model named tuple or its name.
+
+        x_range:    Tuple of format (low, high) restricting the fit to the
+                    given abscissa range (e.g. the penumbra region).
+
+        Remaining key-word arguments are passed to levenberg_marquardt().
+
+    Result:
+        List holding one FitResult per graph, with scalar cost, converged
+        and iterations fields. Residuals are given for the fitted range
+        only.
+    """
+
+    if isinstance(model, str):
+        model = MODELS[model]
+
+    key = ('fit', model.name, x_range, repr(sorted(kwargs.items())))
+    results = [None] * len(graphs)
+
+    def selected(graph):
+        if x_range is None:
+            return graph.x, graph.y
+        inside = (graph.x >= x_range[0]) & (graph.x <= x_range[1])
+        return graph.x[inside], graph.y[inside]
+
+    # Group graphs needing a fit by the number of fitted samples.
+    pending = dict()
+    for index, graph in enumerate(graphs):
+        found = graph.cached(key)
+        if found is not None:
+            results[index] = found
+            continue
+        x_values, y_values = selected(graph)
+        pending.setdefault(x_values.size, list()).append(
+            (index, x_values, y_values)
+            )
+
+    for members in pending.values():
+        batch = levenberg_marquardt(
+            model,
+            np.vstack([item[1] for item in members]),
+            np.vstack([item[2] for item in members]),
+            **kwargs
+            )
+        for row, (index, _, _) in enumerate(members):
+            result = FitResult(
+                params=batch.params[row],
+                residuals=batch.residuals[row],
+                cost=float(batch.cost[row]),
+                converged=bool(batch.converged[row]),
+                iterations=int(batch.iterations[row])
+                )
+            graphs[index].cache(key, result)
+            results[index] = result
+
+    return results
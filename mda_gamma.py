@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""One dimensional gamma index comparison of an evaluated curve against a
+reference curve.
+
+Reference curve is treated as piecewise linear, so for each evaluated point
+the exact minimum over reference segments is found. Only segments within
+the search radius are considered, which are located by binary search on
+the sorted reference abscissa.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] D. A. Low et al., A technique for the quantitative evaluation of dose
+#     distributions, Med. Phys. 25 (5), 1998.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+import numpy as np
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Default gamma criteria: dose difference in percent and distance to
+# agreement in units of abscissa (mm).
+DOSE_CRITERION = 3.0
+DTA_CRITERION = 3.0
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+GammaResult = namedtuple('GammaResult', 'gamma pass_rate')
+
+
+# =============================================================================
+# Gamma analysis
+# =============================================================================
+
+def gamma_index(
+        x_eval,
+        d_eval,
+        x_ref,
+        d_ref,
+        dose_criterion=DOSE_CRITERION,
+        dta=DTA_CRITERION,
+        normalization='global',
+        dose_threshold=0.0,
+        search_radius=None,
+        chunk_size=4096
+        ):
+    """Compute gamma index of evaluated points against a reference curve.
+
+    Input:
+        x_eval:         1D numpy array storing abscissa of evaluated points.
+
+        d_eval:         1D numpy array storing doses of evaluated points.
+
+        x_ref:          1D numpy array storing abscissa of the reference
+                        curve.
+
+        d_ref:          1D numpy array storing doses of the reference curve.
+
+        dose_criterion: Dose difference criterion in percent.
+
+        dta:            Distance to agreement criterion in units of
+                        abscissa.
+
+        normalization:  Dose difference normalization. Can have one of the
+                        following values:
+                            'global' (percent of the reference maximum),
+                            'local' (percent of the evaluated dose).
+
+        dose_threshold: Evaluated points with dose below this percentage of
+                        the reference maximum are excluded from the pass
+                        rate.
+
+        search_radius:  Only reference points within this distance from an
+                        evaluated point are searched. Defaults to three
+                        times the distance to agreement. Points with no
+                        reference segment within the radius get infinite
+                        gamma.
+
+        chunk_size:     Number of evaluated points processed at once.
+
+    Result:
+        GammaResult named tuple, where gamma is 1D numpy array holding gamma
+        index of each evaluated point and pass_rate is percentage of points
+        above dose threshold having gamma index less or equal to 1. Gamma of
+        points for which dose difference criterion is zero (local
+        normalization at zero dose) is set to NaN.
+    """
+
+    if normalization not in ('global', 'local'):
+        raise ValueError('Normalization must be one of "global", "local"')
+
+    if dose_criterion <= 0.0 or dta <= 0.0:
+        raise ValueError('Gamma criteria must be positive.')
+
+    x_eval = np.asarray(x_eval, dtype=float)
+    d_eval = np.asarray(d_eval, dtype=float)
+    x_ref = np.asarray(x_ref, dtype=float)
+    d_ref = np.asarray(d_ref, dtype=float)
+
+    if x_eval.shape != d_eval.shape or x_ref.shape != d_ref.shape:
+        raise ValueError('Abscissa and dose arrays must be of the same size.')
+
+    if x_ref.size < 2:
+        raise ValueError('Reference curve must have at least two points.')
+
+    order = np.argsort(x_ref, kind='stable')
+    x_ref = x_ref[order]
+    d_ref = d_ref[order]
+
+    if search_radius is None:
+        search_radius = 3.0 * dta
+
+    reference_max = d_ref.max()
+    if normalization == 'global':
+        tolerance = np.full_like(
+            d_eval,
+            dose_criterion * reference_max / 100.0
+            )
+    else:
+        tolerance = np.abs(d_eval) * dose_criterion / 100.0
+
+    # Reference segments (k, k + 1) that may contain points within the
+    # search radius. One extra segment on each side covers segments
+    # crossing the radius boundary.
+    first = np.maximum(
+        np.searchsorted(x_ref, x_eval - search_radius, side='left') - 1,
+        0
+        )
+    last = np.minimum(
+        np.searchsorted(x_ref, x_eval + search_radius, side='right'),
+        x_ref.size - 1
+        )
+    width = int(max((last - first).max(), 1))
+    offsets = np.arange(width)
+
+    gamma = np.empty_like(d_eval)
+    for start in range(0, x_eval.size, chunk_size):
+        stop = min(start + chunk_size, x_eval.size)
+
+        segment = first[start:stop, np.newaxis] + offsets
+        valid = segment < last[start:stop, np.newaxis]
+        segment = np.minimum(segment, x_ref.size - 2)
+
+        x_point = x_eval[start:stop, np.newaxis]
+        d_point = d_eval[start:stop, np.newaxis]
+        d_tol = tolerance[start:stop, np.newaxis]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Segment end points in normalized (distance, dose) space with
+            # the evaluated point at the origin.
+            x_low = (x_ref[segment] - x_point) / dta
+            x_high = (x_ref[segment + 1] - x_point) / dta
+            d_low = (d_ref[segment] - d_point) / d_tol
+            d_high = (d_ref[segment + 1] - d_point) / d_tol
+
+            x_step = x_high - x_low
+            d_step = d_high - d_low
+            length = x_step * x_step + d_step * d_step
+            position = np.clip(
+                -(x_low * x_step + d_low * d_step)
+                / np.where(length > 0.0, length, 1.0),
+                0.0,
+                1.0
+                )
+            x_near = x_low + position * x_step
+            d_near = d_low + position * d_step
+            distance = x_near * x_near + d_near * d_near
+
+        distance = np.where(valid, distance, np.inf)
+        gamma[start:stop] = np.sqrt(distance.min(axis=1))
+
+    gamma = np.where(tolerance > 0.0, gamma, np.nan)
+
+    evaluated = d_eval >= dose_threshold * reference_max / 100.0
+    evaluated &= ~np.isnan(gamma)
+    if evaluated.any():
+        pass_rate = 100.0 * np.count_nonzero(gamma[evaluated] <= 1.0) \
+            / np.count_nonzero(evaluated)
+    else:
+        pass_rate = np.nan
+
+    return GammaResult(gamma=gamma, pass_rate=float(pass_rate))
+
+
+def compare_graphs(evaluated, reference, **kwargs):
+    """Compute gamma index of the evaluated Graph object against the
+    reference Graph object.
+
+    Key-word arguments are passed to gamma_index().
+
+    Result:
+        GammaResult named tuple (see gamma_index()).
+    """
+
+    return gamma_index(
+        evaluated.x,
+        evaluated.y,
+        reference.x,
+        reference.y,
+        **kwargs
+        )
@@ -51,8 +51,11 @@
 # =============================================================================
 
 from sys import float_info as fi  # Required by MIN_FLOAT and MAX_FLOAT
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 import csv
+import os
+import re
+import threading
 import numpy as np
 
 
@@ -67,6 +70,30 @@ MM_PER_IN = 25.4
 MIN_FLOAT = fi.min
 MAX_FLOAT = fi.max
 
+# Unit enclosed in parentheses or square brackets at the end of a header.
+_UNIT_PATTERN = re.compile(
+    r'^(?P<name>.*?)[(\[](?P<unit>[^()\[\]]+)[)\]]$'
+    )
+
+# Factors converting known units to the common units (millimetres for
+# lengths and grays for doses). Keys are lower case unit names as they
+# appear in column headers.
+UNIT_FACTORS = {
+    'um': ('mm', 1.0E-3),
+    'mm': ('mm', 1.0),
+    'cm': ('mm', 10.0),
+    'm': ('mm', 1000.0),
+    'in': ('mm', MM_PER_IN),
+    'inch': ('mm', MM_PER_IN),
+    'inches': ('mm', MM_PER_IN),
+    'mgy': ('Gy', 1.0E-3),
+    'cgy': ('Gy', 1.0E-2),
+    'gy': ('Gy', 1.0),
+    }
+
+# Number of file lines between two progress reports of CSVDataReader.
+PROGRESS_INTERVAL = 4096
+
 
 # =============================================================================
 # Utility classes and functions
@@ -86,8 +113,64 @@ def _checktype(tpe, var, vardsc):
         ))
 
 
+def parse_unit(header):
+    """Splits column header into quantity name and unit.
+
+    Unit is expected to be enclosed in parentheses or square brackets at
+    the end of the header, e.g. 'Distance_(inches)', 'Bin center(Gy)' or
+    'D/[Gy*cm2]'. Separators between name and unit ('_', '/', ' ') are
+    dropped from the name.
+
+    It returns tuple of format (name, unit), where unit is None if header
+    declares no unit.
+    """
+
+    match = _UNIT_PATTERN.match(header.strip())
+    if match is None:
+        return (header, None)
+
+    return (match.group('name').rstrip('_/ '), match.group('unit').strip())
+
+
+def convert_units(data, headers, units):
+    """Converts data columns in place to the common units (millimetres and
+    grays).
+
+    Conversion is done in a single vectorized pass over the whole data
+    table. Fields flagged as erroneous (MIN_FLOAT) are left untouched.
+    Columns with unknown or no units are left as they are.
+
+    It returns tuple of format (headers, units) updated to the units of the
+    converted data.
+    """
+
+    factors = np.ones(len(units), dtype=float)
+    new_units = list(units)
+
+    for index, unit in enumerate(units):
+        if unit is not None and unit.lower() in UNIT_FACTORS:
+            new_units[index], factors[index] = UNIT_FACTORS[unit.lower()]
+
+    if np.any(factors != 1.0):
+        np.multiply(data, factors, out=data, where=data != MIN_FLOAT)
+
+    if headers:
+        new_headers = list()
+        for header, unit, new_unit in zip(headers, units, new_units):
+            if unit is not None and unit != new_unit:
+                # Replace the last occurrence of the unit (the one enclosed
+                # in brackets) with the new one.
+                position = header.rfind(unit)
+                header = header[:position] + new_unit \
+                    + header[position + len(unit):]
+            new_headers.append(header)
+        headers = tuple(new_headers)
+
+    return headers, tuple(new_units)
+
+
 ReadErrorType = namedtuple('ReadErrorType', 'EMPTY_FILE NO_DATA \
-    TOO_MANY_COLUMNS ROW_WIDTH_TOO_SMALL ROW_WIDTH_TOO_BIG')
+    TOO_MANY_COLUMNS ROW_WIDTH_TOO_SMALL ROW_WIDTH_TOO_BIG CANCELLED')
 
 
 ReadError = ReadErrorType(
@@ -95,15 +178,22 @@ ReadError = ReadErrorType(
     NO_DATA='No table data could be found',
     TOO_MANY_COLUMNS='Too many data columns',
     ROW_WIDTH_TOO_SMALL='Row width too small',
-    ROW_WIDTH_TOO_BIG='Row width too big'
+    ROW_WIDTH_TOO_BIG='Row width too big',
+    CANCELLED='Reading cancelled'
     )
 
 
+class ReadCancelled(Exception):
+    """Raised inside CSVDataReader when reading is cancelled by the user.
+    It never leaves read_data().
+    """
+
+
 class CSVDataReader():
     """TODO: Put class docstring HERE.
     """
 
-    def __init__(self, max_col_count=2):
+    def __init__(self, max_col_count=2, convert_units=True):
         # Set maximum allowed column count per dataset to 2. Usually we allow
         # up to 26 columns (same as the number of letters in the modern English
         # alfabet), but since our GUI currently supports displaying and
@@ -111,21 +201,32 @@ class CSVDataReader():
         # to 2 here.
         self.max_col_count = max_col_count
 
+        # If set, columns with units declared in the header are converted
+        # to the common units (see UNIT_FACTORS) while reading.
+        self.convert_units = convert_units
+
         # Initialize attributes.
         self.file_name = None  # Name of file containing data.
         self.headers = None  # Tuple holding data column headers.
+        self.units = None  # Tuple holding data column units.
         self.error_count = 0  # Counts errors encountered while reading data.
         self.errors = list()  # Map of row numbers and encountered errors.
         self.last_error = None  # Last encountered error string.
         self.row_count = -1  # Number of red rows.
         self.column_count = -1  # Number of red columns.
 
+        # Progress reporting and cancellation (see read_data()).
+        self._progress = None
+        self._cancel = None
+        self._file_size = 0
+
     def _clear_error_log(self):
         """Resets all error attributes and prepares reader for new reading.
         """
 
         self.file_name = None
         self.headers = None
+        self.units = None
         self.error_count = 0
         self.errors = list()
         self.last_error = None
@@ -201,7 +302,10 @@ class CSVDataReader():
         old_pos = data_file.tell()
         data_file.seek(0)
 
-        datareader = csv.reader(data_file, delimiter=delimiter)
+        datareader = csv.reader(
+            self._lines(data_file, 0),
+            delimiter=delimiter
+            )
         for row in datareader:
             # If this is first row beeing red count number of fields it
             # contains and use that number as number of columns in the dataset.
@@ -227,7 +331,34 @@ class CSVDataReader():
 
         return (row_count, column_count)
 
-    def read_data(self, file_name, delimiter=','):
+    def _lines(self, data_file, passes_done):
+        """Iterates over lines of the file reporting progress every
+        PROGRESS_INTERVAL lines.
+
+        File is red twice, once to find the data shape and once to read the
+        data, so progress of each pass counts as half of the total.
+        passes_done is the number of passes completed before this one.
+        """
+
+        for count, line in enumerate(data_file, 1):
+            if count % PROGRESS_INTERVAL == 0:
+                self._report(
+                    passes_done * self._file_size + data_file.buffer.tell()
+                    )
+            yield line
+
+    def _report(self, bytes_read):
+        """Passes number of bytes red to the progress callback and checks
+        if reading was cancelled.
+        """
+
+        if self._cancel is not None and self._cancel.is_set():
+            raise ReadCancelled()
+
+        if self._progress is not None:
+            self._progress(bytes_read, 2 * self._file_size)
+
+    def read_data(self, file_name, delimiter=',', progress=None, cancel=None):
         """Tries to read CSV data from a file designated with a passed file
         name.
 
@@ -245,11 +376,39 @@ class CSVDataReader():
             file beeing red where the errors have occured. If the error have
             occured in the header error string is mapped to the zero;
             3. last_error is an error string of the last encountered error.
+
+        Reading can be run on a worker thread. In that case progress is a
+        callable taking arguments (bytes_read, total_bytes) called from time
+        to time while reading and cancel is a threading.Event (or any object
+        with is_set() method) that stops reading when set. Cancelled reading
+        returns None and sets ReadError.CANCELLED as the last error.
         """
 
         # Reset attributes and clear error log.
         self._clear_error_log()
         self.file_name = file_name
+        self._progress = progress
+        self._cancel = cancel
+        self._file_size = os.path.getsize(file_name)
+
+        try:
+            data = self._read_data(delimiter)
+
+        except ReadCancelled:
+            self.error_count += 1
+            self.last_error = ReadError.CANCELLED
+            self.errors.append((0, self.last_error))
+            data = None
+
+        finally:
+            self._progress = None
+            self._cancel = None
+
+        return data
+
+    def _read_data(self, delimiter):
+        """Does the actual reading for read_data().
+        """
 
         # Initialize data container.
         data = None
@@ -289,9 +448,16 @@ class CSVDataReader():
                 dtype=float
                 )
 
-            datareader = csv.reader(data_file, delimiter=delimiter)
+            datareader = csv.reader(
+                self._lines(data_file, 1),
+                delimiter=delimiter
+                )
             row_index = 0  # Row index.
 
+            # Index of the data table row corresponding to the file row.
+            # Header, if present, takes first file row.
+            data_offset = 1 if has_header else 0
+
             for row in datareader:
                 if has_header and row_index == 0:
                     self.headers = tuple(row)
@@ -313,14 +479,17 @@ class CSVDataReader():
 
                         # Column index.
                         for column_index in range(self.column_count):
-                            data[row_index - 1, column_index] = MIN_FLOAT
+                            data[
+                                row_index - data_offset,
+                                column_index
+                                ] = MIN_FLOAT
 
                     else:
                         # Column index.
                         for column_index in range(self.column_count):
                             try:
                                 data[
-                                    row_index - 1,
+                                    row_index - data_offset,
                                     column_index
                                     ] = float(row[column_index])
 
@@ -334,10 +503,28 @@ class CSVDataReader():
                                     row_index + 1,
                                     self.last_error
                                     ))
-                                data[row_index - 1, column_index] = MIN_FLOAT
+                                data[
+                                    row_index - data_offset,
+                                    column_index
+                                    ] = MIN_FLOAT
 
                 row_index += 1  # Increase row index.
 
+        # Pick up units declared in column headers and bring data to
+        # the common units.
+        self.units = tuple(
+            parse_unit(header)[1] for header in self.headers
+            ) if self.headers else (None,) * self.column_count
+
+        if self.convert_units:
+            self.headers, self.units = convert_units(
+                data,
+                self.headers,
+                self.units
+                )
+
+        self._report(2 * self._file_size)
+
         return data
 
     def print_error_report(self):
@@ -417,6 +604,14 @@ class Graph():
         self._data['raw'] = data
         self._data['title'] = title
 
+        # Values derived from the raw data (e.g. sampling grid properties)
+        # are computed on first request and kept here.
+        self._cache = dict()
+
+        # Incremented on every change of the data set, so consumers can
+        # tell if values they derived from it are stale.
+        self._generation = 0
+
     @property
     def headers(self):
         """TODO: Put method docstring HERE.
@@ -439,6 +634,30 @@ class Graph():
 
         return self._data['raw']
 
+    @data.setter
+    def data(self, data):
+        """Replaces data set and drops all values derived from the old one.
+        """
+
+        self._data['raw'] = data
+        self.invalidate()
+
+    def invalidate(self):
+        """Drops all cached values derived from the data set. Must be called
+        after the data array has been modified in place.
+        """
+
+        self._cache.clear()
+        self._generation += 1
+
+    @property
+    def generation(self):
+        """Generation of the data set. It changes whenever the data set
+        changes (see invalidate()).
+        """
+
+        return self._generation
+
     @property
     def title(self):
         """TODO: Put method docstring HERE.
@@ -446,6 +665,200 @@ class Graph():
 
         return self._data['title']
 
+    @property
+    def units(self):
+        """Units of data columns parsed from the headers. None for columns
+        declaring no unit.
+        """
+
+        return tuple(parse_unit(header)[1] for header in self.headers)
+
+    @property
+    def x(self):
+        """Abscissa values of the data set (first column). If the data set
+        has only one column sample indexes are returned instead.
+        """
+
+        if self._data['raw'].ndim < 2 or self._data['raw'].shape[1] < 2:
+            return np.arange(self._data['raw'].shape[0], dtype=float)
+
+        return self._data['raw'][:, 0]
+
+    @property
+    def y(self):
+        """Ordinate values of the data set (second column, or the only
+        column if data set has just one).
+        """
+
+        if self._data['raw'].ndim < 2:
+            return self._data['raw']
+
+        return self._data['raw'][:, min(1, self._data['raw'].shape[1] - 1)]
+
+    def cached(self, key, default=None):
+        """Returns value cached under the key or default if there is none.
+        Analysis modules use the cache to keep their results (e.g. fitted
+        model parameters) alongside the data.
+        """
+
+        return self._cache.get(key, default)
+
+    def cache(self, key, value):
+        """Caches value under the key (see cached()).
+        """
+
+        self._cache[key] = value
+
+    def _integral_index(self):
+        """Returns abscissa and ordinate values sorted by abscissa together
+        with the cumulative trapezoid integral at each sample. Computed once
+        per data set and kept in the cache.
+        """
+
+        if 'integral' not in self._cache:
+            x_values = np.asarray(self.x, dtype=float)
+            y_values = np.asarray(self.y, dtype=float)
+
+            if np.any(np.diff(x_values) < 0.0):
+                order = np.argsort(x_values, kind='stable')
+                x_values = x_values[order]
+                y_values = y_values[order]
+
+            cumulative = np.zeros(x_values.size, dtype=float)
+            np.cumsum(
+                0.5 * (y_values[1:] + y_values[:-1]) * np.diff(x_values),
+                out=cumulative[1:]
+                )
+            self._cache['integral'] = (x_values, y_values, cumulative)
+
+        return self._cache['integral']
+
+    def cumulative_integral(self, x_values):
+        """Computes integral of the ordinate values (trapezoidal rule) from
+        the first sample up to given abscissa values.
+
+        Each query takes O(log N) time: the sample preceding the abscissa
+        is found by binary search in the cached cumulative integral and the
+        remaining partial trapezoid is added. Abscissa values outside the
+        data range are clamped to it.
+        """
+
+        grid, values, cumulative = self._integral_index()
+        query = np.clip(np.asarray(x_values, dtype=float), grid[0], grid[-1])
+
+        lower = np.clip(
+            np.searchsorted(grid, query, side='right') - 1,
+            0,
+            grid.size - 2
+            )
+        step = grid[lower + 1] - grid[lower]
+        weight = np.where(
+            step > 0.0,
+            (query - grid[lower]) / np.where(step > 0.0, step, 1.0),
+            0.0
+            )
+        end_value = values[lower] \
+            + weight * (values[lower + 1] - values[lower])
+
+        return cumulative[lower] \
+            + 0.5 * (values[lower] + end_value) * (query - grid[lower])
+
+    def area(self, low=None, high=None):
+        """Computes area under the ordinate values between abscissa values
+        low and high (defaulting to the whole data range). Both can be
+        arrays, in which case area of each [low, high] pair is computed.
+        """
+
+        grid = self._integral_index()[0]
+        if low is None:
+            low = grid[0]
+        if high is None:
+            high = grid[-1]
+
+        return self.cumulative_integral(high) - self.cumulative_integral(low)
+
+    def mean_value(self, low=None, high=None):
+        """Computes mean of the ordinate values over abscissa range [low,
+        high] (defaulting to the whole data range).
+        """
+
+        grid = self._integral_index()[0]
+        low = grid[0] if low is None else np.clip(low, grid[0], grid[-1])
+        high = grid[-1] if high is None else np.clip(high, grid[0], grid[-1])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.area(low, high) / (np.asarray(high) - low)
+
+    def normalized_cumulative(self):
+        """Returns cumulative integral at each (sorted) sample normalized to
+        the total integral, together with the sorted abscissa values.
+
+        Result:
+            Tuple of format (x, cumulative).
+        """
+
+        grid, _, cumulative = self._integral_index()
+
+        return grid, cumulative / cumulative[-1]
+
+    def is_uniform(self, rtol=1.0E-3):
+        """Tests if data set is sampled on a uniform grid.
+
+        Sampling is considered uniform if all steps between consecutive
+        abscissa values are equal to the median step within rtol times the
+        median step. Default tolerance accepts grids read from files with
+        abscissa values rounded to a few decimal places. Result is cached,
+        so repeated calls are cheap.
+        """
+
+        key = ('uniform', rtol)
+        if key not in self._cache:
+            steps = np.diff(self.x)
+            step = np.median(steps) if steps.size else 0.0
+            if step == 0.0:
+                self._cache[key] = False
+            else:
+                self._cache[key] = bool(np.all(
+                    np.abs(steps - step) <= rtol * abs(step)
+                    ))
+
+        return self._cache[key]
+
+    def smoothed(self, win_type='hanning', win_len=11):
+        """Smooth the ordinate values of the data set taking abscissa values
+        into account.
+
+        For uniformly sampled data sets this is the same as calling
+        scaled_window_smoothed() on the ordinate values. For non-uniformly
+        sampled data sets distance weighted kernel smoothing is used instead
+        (see kernel_smoothed()), with the kernel half-width equal to the
+        half-width of the win_len window on the median sampling step.
+
+        Input:
+            win_type:   The type of window (see scaled_window_smoothed()).
+
+            win_len:    The length of the smoothing window in samples.
+
+        Result:
+            The smoothed 1D data array.
+        """
+
+        if self.is_uniform():
+            return self.scaled_window_smoothed(
+                self.y,
+                win_type=win_type,
+                win_len=win_len
+                )
+
+        half_width = 0.5 * (win_len - 1) * np.median(np.abs(np.diff(self.x)))
+
+        return self.kernel_smoothed(
+            self.x,
+            self.y,
+            win_type=win_type,
+            half_width=half_width
+            )
+
     def scaled_window_smoothed(
             self,
             data_array,
@@ -520,5 +933,351 @@ class Graph():
         result = np.convolve(window / window.sum(), reflected, mode='valid')
 
         # Because len(output) != len(input) we don't simply return result,
-        # but a ...
-        return result[int(win_len/2):-int((win_len/2)+1)]
+        # but a slice centered on the original samples, so the smoothed
+        # array can be plotted against the same abscissa values.
+        offset = int((win_len - 1) / 2)
+        return result[offset:offset + data_array.size]
+
+    def kernel_smoothed(
+            self,
+            x_array,
+            data_array,
+            win_type='hanning',
+            half_width=1.0,
+            chunk_size=4096
+            ):
+        """Smooth the data sampled on a non-uniform grid using a distance
+        weighted kernel.
+
+        Each output value is a weighted average of all input values whose
+        abscissa lies within half_width from the abscissa of the output
+        point. Weights are given by the continuous form of the requested
+        window evaluated at the normalized distance, so for uniform grids
+        the kernel reproduces the scaled window used by
+        scaled_window_smoothed(). Near the ends of the data set the kernel
+        is truncated and renormalized instead of reflecting the signal.
+
+        Window bounds are found by binary search on the sorted abscissa
+        values, and weights are evaluated for a block of output points at a
+        time, so the cost is O(N*K) where K is the largest number of samples
+        falling within the window, and not O(N^2).
+
+        Input:
+            x_array:    1D numpy array storing abscissa values.
+
+            data_array: 1D numpy array storing data to be smoothed.
+
+            win_type:   The type of window. Can have one of the following
+                        values:
+                            'flat',
+                            'hanning',
+                            'hamming',
+                            'bartlett',
+                            'blackman'.
+
+            half_width: Half-width of the kernel in units of abscissa.
+
+            chunk_size: Number of output points processed at once. Limits
+                        memory used for the weights matrix.
+
+        Result:
+            The smoothed 1D data array.
+        """
+
+        if x_array.size != data_array.size:
+            raise ValueError(
+                'Abscissa and data arrays must be of the same size.'
+                )
+
+        if half_width <= 0.0:
+            return data_array
+
+        win_types = ['flat', 'hanning', 'hamming', 'bartlett', 'blackman']
+        if win_type not in win_types:
+            raise ValueError(
+                'Scaled window type must be one of "flat", "hanning", \
+                "hamming", "bartlett", "blackman"'
+                )
+
+        # Sort samples by abscissa so window bounds can be found by binary
+        # search. Result is put back in the original order at the end.
+        order = np.argsort(x_array, kind='stable')
+        x_sorted = x_array[order]
+        y_sorted = data_array[order]
+
+        lower = np.searchsorted(x_sorted, x_sorted - half_width, side='left')
+        upper = np.searchsorted(x_sorted, x_sorted + half_width, side='right')
+        width = int((upper - lower).max())
+        offsets = np.arange(width)
+
+        result_sorted = np.empty_like(y_sorted, dtype=float)
+        for start in range(0, x_sorted.size, chunk_size):
+            stop = min(start + chunk_size, x_sorted.size)
+
+            index = lower[start:stop, np.newaxis] + offsets
+            inside = index < upper[start:stop, np.newaxis]
+            index = np.minimum(index, x_sorted.size - 1)
+
+            dist = np.abs(
+                x_sorted[index] - x_sorted[start:stop, np.newaxis]
+                ) / half_width
+
+            if win_type == 'hanning':
+                weights = 0.5 + 0.5 * np.cos(np.pi * dist)
+            elif win_type == 'hamming':
+                weights = 0.54 + 0.46 * np.cos(np.pi * dist)
+            elif win_type == 'bartlett':
+                weights = 1.0 - dist
+            elif win_type == 'blackman':
+                weights = 0.42 + 0.5 * np.cos(np.pi * dist) \
+                    + 0.08 * np.cos(2.0 * np.pi * dist)
+            else:  # Default is the moving average.
+                weights = np.ones_like(dist)
+
+            weights = np.where(inside, np.clip(weights, 0.0, None), 0.0)
+            norm = weights.sum(axis=1)
+
+            # Kernels with zero weight (e.g. window tapering to zero at the
+            # only neighbour) fall back to the original value.
+            smoothed = (weights * y_sorted[index]).sum(axis=1)
+            result_sorted[start:stop] = np.where(
+                norm > 0.0,
+                smoothed / np.where(norm > 0.0, norm, 1.0),
+                y_sorted[start:stop]
+                )
+
+        result = np.empty_like(result_sorted)
+        result[order] = result_sorted
+
+        return result
+
+
+class GraphCollection():
+    """Ordered collection of Graph objects displayed together (e.g. daily QA
+    profiles overlaid in one plot).
+
+    Each graph is stored under a unique name and carries a visibility flag.
+    Graphs keep their own caches, so adding, removing or hiding one graph
+    leaves values derived from the others intact.
+    """
+
+    def __init__(self, graphs=None):
+        self._graphs = OrderedDict()  # Map of names and graphs.
+        self._visible = dict()  # Map of names and visibility flags.
+
+        if graphs is not None:
+            for graph in graphs:
+                self.add(graph)
+
+    def __len__(self):
+        return len(self._graphs)
+
+    def __iter__(self):
+        return iter(self._graphs.values())
+
+    def __contains__(self, name):
+        return name in self._graphs
+
+    def __getitem__(self, name):
+        return self._graphs[name]
+
+    @property
+    def names(self):
+        """Tuple of names of the graphs in order they were added.
+        """
+
+        return tuple(self._graphs)
+
+    def add(self, graph, name=None, visible=True):
+        """Adds graph to the collection and returns the name it is stored
+        under. If name is not given graph title is used. Names already
+        taken get a numeric suffix.
+        """
+
+        _checktype(Graph, graph, 'Graph')
+        if graph is None:
+            raise TypeError('Graph must be Graph, not NoneType')
+
+        base = name if name is not None else (graph.title or 'Graph')
+        name = base
+        suffix = 1
+        while name in self._graphs:
+            suffix += 1
+            name = '{0} ({1})'.format(base, suffix)
+
+        self._graphs[name] = graph
+        self._visible[name] = bool(visible)
+
+        return name
+
+    def remove(self, name):
+        """Removes graph with the given name from the collection.
+        """
+
+        del self._graphs[name]
+        del self._visible[name]
+
+    def is_visible(self, name):
+        """Returns visibility flag of the graph with the given name.
+        """
+
+        return self._visible[name]
+
+    def set_visible(self, name, visible):
+        """Sets visibility flag of the graph with the given name.
+        """
+
+        if name not in self._graphs:
+            raise KeyError(name)
+
+        self._visible[name] = bool(visible)
+
+
+class RingBuffer():
+    """Fixed capacity buffer holding the most recent samples of a data
+    stream (e.g. scan in progress).
+
+    Samples are rows of a preallocated 2D array. When the buffer is full,
+    new samples overwrite the oldest ones, so memory use does not grow
+    however long the stream runs. Appending is thread-safe, so samples can
+    be pushed from an acquisition thread while the GUI reads them.
+    """
+
+    def __init__(self, capacity, columns=2, dtype=float):
+        if capacity < 1:
+            raise ValueError('Capacity must be a positive number.')
+
+        self._buffer = np.full((capacity, columns), np.nan, dtype=dtype)
+        self._start = 0  # Row of the oldest sample.
+        self._size = 0  # Number of samples in the buffer.
+        self._total = 0  # Number of samples ever appended.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        """Maximum number of samples kept in the buffer.
+        """
+
+        return self._buffer.shape[0]
+
+    @property
+    def columns(self):
+        """Number of values per sample.
+        """
+
+        return self._buffer.shape[1]
+
+    @property
+    def total(self):
+        """Number of samples appended since the buffer was created. Readers
+        compare it with the value seen last time to tell how many samples
+        arrived in between.
+        """
+
+        return self._total
+
+    def append(self, samples):
+        """Appends a sample (1D array) or a block of samples (2D array, one
+        sample per row). Costs no more than two slice copies regardless of
+        where the block wraps around.
+        """
+
+        samples = np.asarray(samples, dtype=self._buffer.dtype)
+        if samples.ndim == 1:
+            samples = samples[np.newaxis, :]
+
+        if samples.ndim != 2 or samples.shape[1] != self.columns:
+            raise ValueError(
+                'Samples must have {0} values each.'.format(self.columns)
+                )
+
+        count = samples.shape[0]
+        capacity = self.capacity
+
+        with self._lock:
+            if count >= capacity:
+                # Block alone fills the buffer.
+                self._buffer[:] = samples[count - capacity:]
+                self._start = 0
+                self._size = capacity
+
+            else:
+                end = (self._start + self._size) % capacity
+                first = min(count, capacity - end)
+                self._buffer[end:end + first] = samples[:first]
+                self._buffer[:count - first] = samples[first:]
+
+                overflow = max(self._size + count - capacity, 0)
+                self._start = (self._start + overflow) % capacity
+                self._size += count - overflow
+
+            self._total += count
+
+    def latest(self, count=None):
+        """Returns copy of the most recent count samples (all if count is
+        None) ordered from the oldest to the newest one.
+        """
+
+        with self._lock:
+            size = self._size
+            if count is None or count > size:
+                count = size
+
+            begin = (self._start + size - count) % self.capacity
+            end = begin + count
+            if end <= self.capacity:
+                return self._buffer[begin:end].copy()
+
+            return np.concatenate((
+                self._buffer[begin:],
+                self._buffer[:end - self.capacity]
+                ))
+
+    @property
+    def data(self):
+        """Copy of all samples in the buffer ordered from the oldest to the
+        newest one.
+        """
+
+        return self.latest()
+
+    def clear(self):
+        """Drops all samples.
+        """
+
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+
+def stack_graphs(graphs, win_type=None, win_len=11):
+    """Stack ordinate values of given Graph objects into a 2D array.
+
+    Curves that are not sampled on the abscissa grid of the first graph are
+    linearly interpolated onto it. If win_type is given, smoothed ordinate
+    values (see Graph.smoothed()) are stacked instead of the raw ones.
+
+    Result:
+        Tuple of format (x, curves), where x is 1D numpy array of abscissa
+        values and curves is 2D numpy array storing one curve per row.
+    """
+
+    x_values = np.asarray(graphs[0].x, dtype=float)
+    curves = np.empty((len(graphs), x_values.size), dtype=float)
+
+    for index, graph in enumerate(graphs):
+        if win_type is None:
+            y_values = graph.y
+        else:
+            y_values = graph.smoothed(win_type=win_type, win_len=win_len)
+
+        if graph.x.size == x_values.size \
+                and np.array_equal(graph.x, x_values):
+            curves[index] = y_values
+        else:
+            curves[index] = np.interp(x_values, graph.x, y_values)
+
+    return x_values, curves
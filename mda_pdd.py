@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Beam quality metrics of percentage depth dose (PDD) curves.
+
+Metrics are computed for a whole stack of curves sampled on a common depth
+grid at once. Photon beams are characterized by the depth of dose maximum,
+doses at 10 cm and 20 cm depth and the PDD20/10 ratio, and electron beams by
+R90, R80, R50, practical range (Rp) and the bremsstrahlung tail dose.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] IAEA TRS-398, Absorbed Dose Determination in External Beam
+#     Radiotherapy, 2000.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+import numpy as np
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Default depths (in mm) at which D10 and D20 are taken.
+D10_DEPTH = 100.0
+D20_DEPTH = 200.0
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+PhotonMetrics = namedtuple(
+    'PhotonMetrics',
+    'dmax dose_max d10 d20 pdd20_10'
+    )
+
+
+ElectronMetrics = namedtuple(
+    'ElectronMetrics',
+    'dmax dose_max r90 r80 r50 rp tail'
+    )
+
+
+def _as_stack(depth, doses):
+    """Utility routine that checks depth and doses arrays and returns doses
+    as two dimensional array with one curve per row.
+    """
+
+    depth = np.asarray(depth, dtype=float)
+    doses = np.atleast_2d(np.asarray(doses, dtype=float))
+
+    if depth.ndim != 1 or doses.shape[1] != depth.size:
+        raise ValueError(
+            'Doses must have the same number of samples as the depth array.'
+            )
+
+    if depth.size < 2 or np.any(np.diff(depth) <= 0.0):
+        raise ValueError('Depth values must be strictly increasing.')
+
+    return depth, doses
+
+
+def _squeeze(result, single):
+    """Utility routine that converts metrics of a single curve from one
+    element arrays to scalars.
+    """
+
+    if not single:
+        return result
+
+    return type(result)(*(float(field[0]) for field in result))
+
+
+def interpolate_at(depth, doses, query):
+    """Linearly interpolate stack of curves at given depths.
+
+    Input:
+        depth:  1D numpy array storing strictly increasing depths.
+
+        doses:  2D numpy array storing one curve per row.
+
+        query:  Scalar or 1D array of depths shared by all curves.
+
+    Result:
+        2D numpy array of shape (curve_count, query_count). Depths outside
+        the depth range yield NaN.
+    """
+
+    query = np.atleast_1d(np.asarray(query, dtype=float))
+
+    upper = np.clip(np.searchsorted(depth, query), 1, depth.size - 1)
+    lower = upper - 1
+    weight = (query - depth[lower]) / (depth[upper] - depth[lower])
+    outside = (query < depth[0]) | (query > depth[-1])
+
+    result = doses[:, lower] * (1.0 - weight) + doses[:, upper] * weight
+
+    return np.where(outside, np.nan, result)
+
+
+def distal_crossing(depth, doses, level, start):
+    """Find depths where curves first fall below given level past the start
+    sample.
+
+    Crossing depth is linearly interpolated between the last sample above
+    and the first sample below the level.
+
+    Input:
+        depth:  1D numpy array storing strictly increasing depths.
+
+        doses:  2D numpy array storing one curve per row.
+
+        level:  Scalar or 1D array holding one level per curve.
+
+        start:  1D array holding index of the sample per curve from which
+                the search starts (usually index of the dose maximum).
+
+    Result:
+        1D numpy array holding one crossing depth per curve. Curves that
+        never fall below the level yield NaN.
+    """
+
+    level = np.broadcast_to(np.asarray(level, dtype=float), start.shape)
+    index = np.arange(depth.size)
+    below = (index > start[:, np.newaxis]) \
+        & (doses < level[:, np.newaxis])
+
+    found = below.any(axis=1)
+    after = np.maximum(np.argmax(below, axis=1), 1)
+    before = after - 1
+
+    rows = np.arange(doses.shape[0])
+    dose_before = doses[rows, before]
+    dose_after = doses[rows, after]
+    span = np.where(dose_before != dose_after, dose_before - dose_after, 1.0)
+    weight = (dose_before - level) / span
+    result = depth[before] + weight * (depth[after] - depth[before])
+
+    return np.where(found, result, np.nan)
+
+
+# =============================================================================
+# PDD analysis
+# =============================================================================
+
+def photon_metrics(
+        depth,
+        doses,
+        d10_depth=D10_DEPTH,
+        d20_depth=D20_DEPTH
+        ):
+    """Compute photon beam quality metrics for a stack of PDD curves.
+
+    Input:
+        depth:      1D numpy array storing strictly increasing depths.
+
+        doses:      1D numpy array storing a single curve or 2D numpy
+                    array storing one curve per row.
+
+        d10_depth:  Depth at which D10 is taken (default 100 mm).
+
+        d20_depth:  Depth at which D20 is taken (default 200 mm).
+
+    Result:
+        PhotonMetrics named tuple, where:
+            1. dmax is depth of the dose maximum;
+            2. dose_max is the maximum dose;
+            3. d10 and d20 are doses at d10_depth and d20_depth in percent
+               of the maximum dose;
+            4. pdd20_10 is ratio of d20 and d10.
+
+        For a single curve fields are scalars, otherwise 1D numpy arrays
+        with one value per curve.
+    """
+
+    single = np.ndim(doses) == 1
+    depth, doses = _as_stack(depth, doses)
+
+    rows = np.arange(doses.shape[0])
+    max_index = np.argmax(doses, axis=1)
+    dose_max = doses[rows, max_index]
+
+    percent = interpolate_at(depth, doses, [d10_depth, d20_depth]) \
+        * (100.0 / dose_max[:, np.newaxis])
+
+    result = PhotonMetrics(
+        dmax=depth[max_index],
+        dose_max=dose_max,
+        d10=percent[:, 0],
+        d20=percent[:, 1],
+        pdd20_10=percent[:, 1] / percent[:, 0]
+        )
+
+    return _squeeze(result, single)
+
+
+def electron_metrics(depth, doses):
+    """Compute electron beam quality metrics for a stack of PDD curves.
+
+    R90, R80 and R50 are depths beyond the dose maximum where dose falls to
+    90 %, 80 % and 50 % of the maximum. Practical range (Rp) is the depth
+    where tangent through the steepest point of the distal fall-off meets
+    the bremsstrahlung tail. Tail dose is taken as the mean dose beyond the
+    depth where the tangent reaches zero dose.
+
+    Input:
+        depth:  1D numpy array storing strictly increasing depths.
+
+        doses:  1D numpy array storing a single curve or 2D numpy array
+                storing one curve per row.
+
+    Result:
+        ElectronMetrics named tuple, where dmax is the depth of the dose
+        maximum, dose_max is the maximum dose, r90, r80, r50 and rp are
+        depths and tail is the bremsstrahlung tail dose in percent of the
+        maximum dose. For a single curve fields are scalars, otherwise 1D
+        numpy arrays with one value per curve. Metrics that can not be
+        determined are set to NaN.
+    """
+
+    single = np.ndim(doses) == 1
+    depth, doses = _as_stack(depth, doses)
+
+    rows = np.arange(doses.shape[0])
+    max_index = np.argmax(doses, axis=1)
+    dose_max = doses[rows, max_index]
+    percent = doses * (100.0 / dose_max[:, np.newaxis])
+
+    r90 = distal_crossing(depth, percent, 90.0, max_index)
+    r80 = distal_crossing(depth, percent, 80.0, max_index)
+    r50 = distal_crossing(depth, percent, 50.0, max_index)
+
+    # Tangent through the steepest point of the distal fall-off.
+    gradient = np.gradient(percent, depth, axis=1)
+    distal = np.arange(depth.size) > max_index[:, np.newaxis]
+    steepest = np.argmin(np.where(distal, gradient, np.inf), axis=1)
+    slope = gradient[rows, steepest]
+    slope = np.where(slope < 0.0, slope, np.nan)
+    zero_depth = depth[steepest] - percent[rows, steepest] / slope
+
+    # Bremsstrahlung tail is everything beyond the tangent's zero crossing.
+    tail_mask = depth > zero_depth[:, np.newaxis]
+    tail_count = tail_mask.sum(axis=1)
+    tail = np.where(
+        tail_count > 0,
+        np.where(tail_mask, percent, 0.0).sum(axis=1)
+        / np.maximum(tail_count, 1),
+        np.nan
+        )
+
+    rp = depth[steepest] + (tail - percent[rows, steepest]) / slope
+
+    result = ElectronMetrics(
+        dmax=depth[max_index],
+        dose_max=dose_max,
+        r90=r90,
+        r80=r80,
+        r50=r50,
+        rp=rp,
+        tail=tail
+        )
+
+    return _squeeze(result, single)
+
+
+def analyse_graphs(graphs, beam='photon', **kwargs):
+    """Compute beam quality metrics for a sequence of Graph objects holding
+    PDD curves (depth as abscissa, dose as ordinate).
+
+    Input:
+        graphs: Graph object or sequence of Graph objects.
+
+        beam:   Beam type. Can have one of the following values:
+                    'photon',
+                    'electron'.
+
+        Remaining key-word arguments are passed to photon_metrics() or
+        electron_metrics().
+
+    Result:
+        PhotonMetrics or ElectronMetrics named tuple (see photon_metrics()
+        and electron_metrics()).
+    """
+
+    if beam not in ('photon', 'electron'):
+        raise ValueError('Beam type must be one of "photon", "electron"')
+
+    single = not isinstance(graphs, (list, tuple))
+    if single:
+        graphs = [graphs]
+
+    depth, doses = mdam.stack_graphs(graphs)
+    if single:
+        doses = doses[0]
+
+    if beam == 'photon':
+        return photon_metrics(depth, doses, **kwargs)
+
+    return electron_metrics(depth, doses, **kwargs)
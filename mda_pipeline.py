@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""Lazy analysis pipeline with memoized stages.
+
+Analysis chain (read, mask, smooth, normalize, extract metrics, ...) is
+described as a directed acyclic graph of stages. Each stage is identified by
+a key hashed from its function, its parameters and the keys of its inputs,
+and its output is cached under that key. Nothing is computed until an
+output is requested, and after a parameter change only stages downstream of
+the changed one are recomputed.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import OrderedDict
+from os.path import basename
+import hashlib
+import numpy as np
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Number of outputs (for different parameter sets) cached per stage.
+STAGE_CACHE_SIZE = 4
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+def _digest_value(digest, value):
+    """Utility routine that feeds a parameter value to the hash object.
+    """
+
+    if isinstance(value, np.ndarray):
+        digest.update(value.dtype.str.encode())
+        digest.update(repr(value.shape).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            _digest_value(digest, item)
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _digest_value(digest, value[key])
+    elif isinstance(value, mdam.Graph):
+        _digest_value(digest, value.data)
+        _digest_value(digest, value.headers)
+        _digest_value(digest, value.title)
+    else:
+        digest.update(repr(value).encode())
+
+
+def parameter_hash(function, params, input_keys=()):
+    """Compute key identifying stage output from the stage function, its
+    parameters and keys of its inputs.
+    """
+
+    digest = hashlib.sha1()
+    digest.update(
+        '{0}.{1}'.format(
+            getattr(function, '__module__', ''),
+            getattr(function, '__qualname__', repr(function))
+            ).encode()
+        )
+    _digest_value(digest, params)
+    for key in input_keys:
+        digest.update(key.encode())
+
+    return digest.hexdigest()
+
+
+# =============================================================================
+# Stage functions
+# =============================================================================
+
+def read_graph(file_name, delimiter=',', convert_units=True):
+    """Read data set from the CSV file into a Graph object. Units declared
+    in the headers are converted while reading (see CSVDataReader).
+    """
+
+    reader = mdam.CSVDataReader(convert_units=convert_units)
+    data = reader.read_data(file_name, delimiter)
+
+    if data is None:
+        raise ValueError(
+            'Could not read \'{0}\': {1}'.format(file_name, reader.last_error)
+            )
+
+    return mdam.Graph(data, reader.headers, basename(file_name))
+
+
+def mask_invalid(graph):
+    """Return Graph without rows flagged as erroneous by the reader (filled
+    with MIN_FLOAT) or holding non-finite values.
+    """
+
+    data = graph.data
+    valid = np.all((data != mdam.MIN_FLOAT) & np.isfinite(data), axis=1)
+
+    return mdam.Graph(data[valid], graph.headers, graph.title)
+
+
+def smooth(graph, win_type='hanning', win_len=11):
+    """Return Graph with ordinate values smoothed (see Graph.smoothed()).
+    """
+
+    return mdam.Graph(
+        np.column_stack((graph.x, graph.smoothed(win_type, win_len))),
+        graph.headers,
+        graph.title
+        )
+
+
+def normalize(graph, mode='max', value=100.0):
+    """Return Graph with ordinate values normalized so that the reference
+    value becomes value.
+
+    Mode can have one of the following values:
+        'max' (maximum of the ordinate values),
+        'center' (ordinate value in the middle of the abscissa range).
+    """
+
+    if mode == 'max':
+        reference = np.max(graph.y)
+    elif mode == 'center':
+        x_values = graph.x
+        reference = np.interp(
+            0.5 * (x_values.min() + x_values.max()),
+            x_values,
+            graph.y
+            )
+    else:
+        raise ValueError('Normalization mode must be one of "max", "center"')
+
+    return mdam.Graph(
+        np.column_stack((graph.x, graph.y * (value / reference))),
+        graph.headers,
+        graph.title
+        )
+
+
+# =============================================================================
+# Model classes
+# =============================================================================
+
+class Stage():
+    """Single node of the pipeline.
+
+    Stage output is computed by calling function with outputs of the input
+    stages as positional arguments, followed by params as key-word
+    arguments.
+    """
+
+    def __init__(self, name, function, inputs=(), params=None):
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.params = dict(params) if params else dict()
+
+        # Outputs cached by stage key.
+        self._cache = OrderedDict()
+
+    def key(self, input_keys):
+        """Compute key of this stage for the given keys of its inputs.
+        """
+
+        return parameter_hash(self.function, self.params, input_keys)
+
+    def cached(self, key):
+        """Return tuple of format (found, output) for the given key.
+        """
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return True, self._cache[key]
+
+        return False, None
+
+    def store(self, key, output):
+        """Store output of the stage under the given key.
+        """
+
+        self._cache[key] = output
+        if len(self._cache) > STAGE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached outputs.
+        """
+
+        self._cache.clear()
+
+
+class Pipeline():
+    """Directed acyclic graph of analysis stages with memoized outputs.
+
+    Typical use:
+
+        pipeline = Pipeline()
+        pipeline.add('read', read_graph, file_name='profile.csv')
+        pipeline.add('mask', mask_invalid, inputs=['read'])
+        pipeline.add('smooth', smooth, inputs=['mask'], win_len=11)
+        pipeline.add('metrics', mda_profile.analyse_graphs, inputs=['smooth'])
+        pipeline.output('metrics')
+        pipeline.set_params('smooth', win_len=21)
+        pipeline.output('metrics')  # Reads and masks from cache.
+
+    Stage keys are recomputed on every request, which costs hashing of the
+    parameters only. Stage outputs are recomputed only when their key
+    changes. Stage outputs must not be modified in place by the caller or by
+    downstream stages.
+    """
+
+    def __init__(self):
+        self._stages = OrderedDict()
+
+        # Number of stage function calls, for diagnostics.
+        self.evaluations = 0
+
+    def add(self, name, function, inputs=(), **params):
+        """Add a stage to the pipeline. All input stages must already be in
+        the pipeline, which keeps the pipeline acyclic.
+        """
+
+        if name in self._stages:
+            raise ValueError('Stage \'{0}\' already exists.'.format(name))
+
+        for input_name in inputs:
+            if input_name not in self._stages:
+                raise ValueError(
+                    'Unknown input stage \'{0}\'.'.format(input_name)
+                    )
+
+        self._stages[name] = Stage(name, function, inputs, params)
+
+        return self._stages[name]
+
+    def stage(self, name):
+        """Return stage with the given name.
+        """
+
+        if name not in self._stages:
+            raise KeyError('Unknown stage \'{0}\'.'.format(name))
+
+        return self._stages[name]
+
+    def set_params(self, name, **params):
+        """Update parameters of the stage. Only this stage and the stages
+        depending on it will be recomputed on the next request.
+        """
+
+        self.stage(name).params.update(params)
+
+    def key(self, name):
+        """Return current key of the stage.
+        """
+
+        return self._resolve(name, dict())[0]
+
+    def _resolve(self, name, keys):
+        """Compute key of the stage and all its inputs, memoizing keys of the
+        already visited stages in the keys dictionary.
+        """
+
+        if name not in keys:
+            stage = self.stage(name)
+            input_keys = tuple(
+                self._resolve(input_name, keys)[0]
+                for input_name in stage.inputs
+                )
+            keys[name] = (stage.key(input_keys), input_keys)
+
+        return keys[name]
+
+    def _evaluate(self, name, keys):
+        """Return output of the stage, computing it and its inputs only if
+        not cached under the current key.
+        """
+
+        stage = self.stage(name)
+        key = self._resolve(name, keys)[0]
+
+        found, output = stage.cached(key)
+        if found:
+            return output
+
+        arguments = [
+            self._evaluate(input_name, keys)
+            for input_name in stage.inputs
+            ]
+        output = stage.function(*arguments, **stage.params)
+        self.evaluations += 1
+        stage.store(key, output)
+
+        return output
+
+    def output(self, name):
+        """Return output of the stage with the given name.
+        """
+
+        return self._evaluate(name, dict())
+
+    def outputs(self, *names):
+        """Return outputs of several stages, sharing the key computation of
+        their common inputs.
+        """
+
+        keys = dict()
+
+        return tuple(self._evaluate(name, keys) for name in names)
+
+    def clear(self):
+        """Drop cached outputs of all stages.
+        """
+
+        for stage in self._stages.values():
+            stage.clear()
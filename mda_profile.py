@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""Beam profile metrics: field width (FWHM), 80-20 penumbra, flatness and
+symmetry.
+
+Metrics are computed for a whole stack of profiles sampled on a common grid
+at once. Field edges are located with sub-sample precision by linear
+interpolation between the samples bracketing each dose level.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] IEC 60976, Medical electrical equipment - Medical electron
+#     accelerators - Functional performance characteristics, 2007.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+import numpy as np
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Fraction of the field width (FWHM) over which flatness and symmetry are
+# evaluated.
+FLATTENED_FRACTION = 0.8
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+ProfileMetrics = namedtuple(
+    'ProfileMetrics',
+    'center fwhm left_penumbra right_penumbra flatness symmetry'
+    )
+
+
+def _field_regions(x_values, above):
+    """Utility routine that locates field regions of a stack of rows of
+    level tests.
+
+    Runs of samples above the level separated by a dip shorter than both
+    neighbouring runs are joined, so noise dips inside the field do not
+    split it. Of the joined regions the widest one is the field, so noise
+    spikes in the tails are ignored. Runs of all rows are found and joined
+    at once, on the flattened stack.
+
+    Input:
+        x_values:   1D numpy array storing strictly increasing abscissa.
+
+        above:      Boolean numpy array with the last axis running over
+                    samples, True where the sample is above the level.
+
+    Result:
+        Tuple of format (first, last, found) of numpy arrays of shape
+        above.shape[:-1], holding indices of the first and the last sample
+        of the field region of each row, and True for rows having one.
+    """
+
+    shape = above.shape[:-1]
+    row_count = int(np.prod(shape))
+    sample_count = above.shape[-1]
+    first = np.zeros(row_count, dtype=np.intp)
+    last = np.zeros(row_count, dtype=np.intp)
+    found = np.zeros(row_count, dtype=bool)
+
+    # Pad every row with samples below the level, so each run has a start
+    # and a stop step within its own row.
+    padded = np.zeros((row_count, sample_count + 2), dtype=np.int8)
+    padded[:, 1:-1] = above.reshape(row_count, sample_count)
+    steps = np.diff(padded, axis=1)
+    run_row, starts = np.nonzero(steps == 1)
+    stops = np.nonzero(steps == -1)[1]  # Exclusive, paired with starts.
+    if starts.size == 0:
+        return first.reshape(shape), last.reshape(shape), found.reshape(shape)
+
+    lengths = stops - starts
+    bridged = (run_row[1:] == run_row[:-1]) & (
+        starts[1:] - stops[:-1] < np.minimum(lengths[:-1], lengths[1:])
+        )
+    new = np.concatenate(([True], ~bridged))
+    end = np.concatenate((~bridged, [True]))
+    region_row = run_row[new]
+    region_first = starts[new]
+    region_last = stops[end] - 1
+    width = x_values[region_last] - x_values[region_first]
+
+    # Widest region of each row. Of equally wide ones the first is taken.
+    row_starts = np.flatnonzero(
+        np.concatenate(([True], region_row[1:] != region_row[:-1]))
+        )
+    widest = np.maximum.reduceat(width, row_starts)
+    candidates = np.flatnonzero(
+        width == np.repeat(widest, np.diff(np.r_[row_starts, width.size]))
+        )
+    chosen = candidates[np.searchsorted(candidates, row_starts)]
+
+    rows = region_row[chosen]
+    first[rows] = region_first[chosen]
+    last[rows] = region_last[chosen]
+    found[rows] = True
+
+    return first.reshape(shape), last.reshape(shape), found.reshape(shape)
+
+
+def field_edges(x_values, profiles, levels):
+    """Locate left and right field edges of a stack of profiles at given
+    dose levels.
+
+    Edges are the crossings of the level at both ends of the field region,
+    the widest region of samples above the level with short dips bridged
+    (see _field_regions()). Crossing positions are linearly interpolated
+    between the bracketing samples.
+
+    Input:
+        x_values:   1D numpy array storing strictly increasing abscissa.
+
+        profiles:   2D numpy array storing one profile per row.
+
+        levels:     Scalar or 1D array of levels shared by all profiles, or
+                    2D array of shape (profile_count, level_count).
+
+    Result:
+        Tuple of format (left, right) of 2D numpy arrays of shape
+        (profile_count, level_count). Edges that can not be found are set
+        to NaN.
+    """
+
+    profile_count, sample_count = profiles.shape
+    levels = np.asarray(levels, dtype=float)
+    if levels.ndim < 2:
+        levels = np.broadcast_to(
+            np.atleast_1d(levels),
+            (profile_count, np.atleast_1d(levels).size)
+            )
+
+    rows = np.arange(profile_count)[:, np.newaxis]
+    above = profiles[:, np.newaxis, :] >= levels[:, :, np.newaxis]
+    first, last, found = _field_regions(x_values, above)
+
+    # Crossings lie between the outer sample of the region (high) and its
+    # neighbour outside the region (low).
+    left_found = found & (first > 0)
+    right_found = found & (last < sample_count - 1)
+    left_high = np.maximum(first, 1)
+    left_low = left_high - 1
+    right_high = np.minimum(last, sample_count - 2)
+    right_low = right_high + 1
+
+    def crossing(low, high):
+        value_low = profiles[rows, low]
+        value_high = profiles[rows, high]
+        span = np.where(
+            value_high != value_low,
+            value_high - value_low,
+            1.0
+            )
+        weight = (levels - value_low) / span
+        return x_values[low] + weight * (x_values[high] - x_values[low])
+
+    left = np.where(left_found, crossing(left_low, left_high), np.nan)
+    right = np.where(right_found, crossing(right_low, right_high), np.nan)
+
+    return left, right
+
+
+def interpolate_rows(x_values, profiles, query):
+    """Linearly interpolate each profile at its own set of abscissa values.
+
+    Input:
+        x_values:   1D numpy array storing strictly increasing abscissa.
+
+        profiles:   2D numpy array storing one profile per row.
+
+        query:      2D numpy array of shape (profile_count, query_count).
+
+    Result:
+        2D numpy array of shape (profile_count, query_count). Positions
+        outside the abscissa range yield NaN.
+    """
+
+    rows = np.arange(profiles.shape[0])[:, np.newaxis]
+    upper = np.clip(np.searchsorted(x_values, query), 1, x_values.size - 1)
+    lower = upper - 1
+    weight = (query - x_values[lower]) / (x_values[upper] - x_values[lower])
+    result = profiles[rows, lower] * (1.0 - weight) \
+        + profiles[rows, upper] * weight
+
+    return np.where(
+        (query < x_values[0]) | (query > x_values[-1]),
+        np.nan,
+        result
+        )
+
+
+# =============================================================================
+# Profile analysis
+# =============================================================================
+
+def profile_metrics(
+        x_values,
+        profiles,
+        baseline=None,
+        normalization='max',
+        flattened_fraction=FLATTENED_FRACTION
+        ):
+    """Compute field width, penumbra, flatness and symmetry for a stack of
+    profiles.
+
+    Profiles are first baseline corrected and normalized to 100 %. Field
+    width is the distance between the 50 % edges, and penumbra is the
+    distance between the 80 % and 20 % edges on each side. Flatness is
+    (Dmax - Dmin) / (Dmax + Dmin) and symmetry is the maximum point
+    difference between mirrored positions, both in percent and both taken
+    over the central flattened_fraction of the field width.
+
+    Input:
+        x_values:           1D numpy array storing strictly increasing
+                            abscissa.
+
+        profiles:           1D numpy array storing a single profile or 2D
+                            numpy array storing one profile per row.
+
+        baseline:           Value subtracted from the profiles before
+                            analysis. Can have one of the following values:
+                                None (no correction),
+                                'min' (minimum of each profile),
+                                scalar,
+                                1D array holding one value per profile.
+
+                            Film gray value profiles usually need 'min'.
+
+        normalization:      Value profiles are normalized to. Can have one
+                            of the following values:
+                                'max' (maximum of each profile),
+                                'center' (value at the field center).
+
+        flattened_fraction: Fraction of the field width over which flatness
+                            and symmetry are evaluated.
+
+    Result:
+        ProfileMetrics named tuple, where center, fwhm, left_penumbra and
+        right_penumbra are in units of abscissa and flatness and symmetry
+        are in percent. For a single profile fields are scalars, otherwise
+        1D numpy arrays with one value per profile. Metrics that can not be
+        determined are set to NaN.
+    """
+
+    if normalization not in ('max', 'center'):
+        raise ValueError('Normalization must be one of "max", "center"')
+
+    single = np.ndim(profiles) == 1
+    x_values = np.asarray(x_values, dtype=float)
+    profiles = np.atleast_2d(np.asarray(profiles, dtype=float))
+
+    if x_values.ndim != 1 or profiles.shape[1] != x_values.size:
+        raise ValueError(
+            'Profiles must have the same number of samples as abscissa.'
+            )
+
+    if x_values.size < 3 or np.any(np.diff(x_values) <= 0.0):
+        raise ValueError('Abscissa values must be strictly increasing.')
+
+    if baseline is not None:
+        if isinstance(baseline, str):
+            if baseline != 'min':
+                raise ValueError('Baseline must be "min", number or array')
+            baseline = profiles.min(axis=1)
+        profiles = profiles - np.reshape(baseline, (-1, 1))
+
+    peak = np.argmax(profiles, axis=1)
+    rows = np.arange(profiles.shape[0])
+    profiles = profiles * (100.0 / profiles[rows, peak][:, np.newaxis])
+
+    left, right = field_edges(x_values, profiles, 50.0)
+    center = 0.5 * (left[:, 0] + right[:, 0])
+
+    if normalization == 'center':
+        reference = interpolate_rows(
+            x_values,
+            profiles,
+            center[:, np.newaxis]
+            )
+        profiles = profiles * (100.0 / reference)
+        left, right = field_edges(x_values, profiles, 50.0)
+        center = 0.5 * (left[:, 0] + right[:, 0])
+
+    fwhm = right[:, 0] - left[:, 0]
+
+    left, right = field_edges(x_values, profiles, [80.0, 20.0])
+    left_penumbra = left[:, 0] - left[:, 1]
+    right_penumbra = right[:, 1] - right[:, 0]
+
+    # Flatness and symmetry over the flattened region.
+    half_width = 0.5 * flattened_fraction * fwhm
+    inside = np.abs(x_values - center[:, np.newaxis]) \
+        <= half_width[:, np.newaxis]
+    any_inside = inside.any(axis=1)
+
+    region_max = np.where(inside, profiles, -np.inf).max(axis=1)
+    region_min = np.where(inside, profiles, np.inf).min(axis=1)
+    flatness = np.where(
+        any_inside,
+        100.0 * (region_max - region_min) / (region_max + region_min),
+        np.nan
+        )
+
+    mirrored = interpolate_rows(
+        x_values,
+        profiles,
+        2.0 * center[:, np.newaxis] - x_values
+        )
+    reference = interpolate_rows(x_values, profiles, center[:, np.newaxis])
+    difference = np.abs(profiles - mirrored) / reference * 100.0
+    symmetry = np.where(
+        any_inside,
+        np.where(inside, np.nan_to_num(difference), 0.0).max(axis=1),
+        np.nan
+        )
+
+    result = ProfileMetrics(
+        center=center,
+        fwhm=fwhm,
+        left_penumbra=left_penumbra,
+        right_penumbra=right_penumbra,
+        flatness=flatness,
+        symmetry=symmetry
+        )
+
+    if single:
+        return ProfileMetrics(*(float(field[0]) for field in result))
+
+    return result
+
+
+def analyse_graphs(graphs, win_type=None, win_len=11, **kwargs):
+    """Compute profile metrics for a Graph object or a sequence of Graph
+    objects.
+
+    Input:
+        graphs:     Graph object or sequence of Graph objects.
+
+        win_type:   If given, profiles are smoothed with the window of this
+                    type before analysis (see Graph.smoothed()).
+
+        win_len:    The length of the smoothing window.
+
+        Remaining key-word arguments are passed to profile_metrics().
+
+    Result:
+        ProfileMetrics named tuple (see profile_metrics()).
+    """
+
+    single = not isinstance(graphs, (list, tuple))
+    if single:
+        graphs = [graphs]
+
+    x_values, profiles = mdam.stack_graphs(
+        graphs,
+        win_type=win_type,
+        win_len=win_len
+        )
+    if single:
+        profiles = profiles[0]
+
+    return profile_metrics(x_values, profiles, **kwargs)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Headless rendering of graphs to image files.
+
+Figures are built the same way PlotView builds them (measured data, ensemble
+spread and smoothed overlays, labels taken from Graph.headers), but on the
+Agg backend without Tk, so plots for QA reports can be generated on machines
+without display. Batches of data files are rendered in parallel by a pool of
+worker processes, each of which reuses a single figure for all of its files.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from os.path import basename, join, splitext
+from matplotlib import style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import mda_decimation as mdad
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Figure defaults. Size is in inches.
+FIGURE_SIZE = (8.0, 6.0)
+FIGURE_DPI = 100
+LINE_WIDTH = 0.5
+PLOT_STYLE = 'bmh'
+
+# Formats rendered as vector graphics. Data of these is not decimated.
+VECTOR_FORMATS = ('svg', 'pdf', 'eps', 'ps')
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+RenderResult = namedtuple('RenderResult', 'source output error')
+
+
+def output_names(file_names, output_dir, image_format):
+    """Returns list of image file names for the data files. Images are
+    named after the data files. Data files with the same name from different
+    directories get a numeric suffix.
+    """
+
+    result = list()
+    taken = set()
+
+    for file_name in file_names:
+        stem = splitext(basename(file_name))[0]
+        name = stem
+        suffix = 1
+        while name in taken:
+            suffix += 1
+            name = '{0}_{1}'.format(stem, suffix)
+        taken.add(name)
+        result.append(join(output_dir, '{0}.{1}'.format(name, image_format)))
+
+    return result
+
+
+# =============================================================================
+# Renderer
+# =============================================================================
+
+class GraphRenderer():
+    """Renders Graph objects to image files without GUI.
+
+    A single figure is created with the renderer and reused for every graph,
+    which saves most of the figure setup cost when rendering many files.
+    """
+
+    def __init__(
+            self,
+            smoothing=(),
+            win_len=11,
+            figsize=FIGURE_SIZE,
+            dpi=FIGURE_DPI,
+            linewidth=LINE_WIDTH,
+            plot_style=PLOT_STYLE
+            ):
+        """Input:
+            smoothing:  Sequence of smoothing window types whose smoothed
+                        overlays are drawn (see Graph.smoothed()).
+
+            win_len:    The length of the smoothing window.
+
+            figsize:    Figure size in inches.
+
+            dpi:        Resolution of raster images.
+
+            linewidth:  Line width of the plotted curves.
+
+            plot_style: Matplotlib style used for the figure.
+        """
+
+        self._smoothing = tuple(smoothing)
+        self._win_len = win_len
+        self._linewidth = linewidth
+        self._style = plot_style
+
+        with style.context(self._style):
+            self._figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(self._figure)
+            self._axes = self._figure.add_subplot(111)
+
+    def _plot(self, x_values, y_values, width, *args, **kwargs):
+        """Plots a series decimated to the given width in pixels. Series
+        with unsorted abscissa or no width given are plotted as they are.
+        """
+
+        if width and mdad.is_increasing(x_values):
+            x_values, y_values = mdad.decimate(
+                x_values,
+                y_values,
+                width=width
+                )
+
+        self._axes.plot(
+            x_values,
+            y_values,
+            *args,
+            linewidth=self._linewidth,
+            **kwargs
+            )
+
+    def draw(self, graph, width=None):
+        """Draws graph on the figure replacing the previous one.
+
+        Input:
+            graph:  Graph object to draw.
+
+            width:  If given, curves are decimated for this number of pixel
+                    columns (see mda_decimation).
+        """
+
+        self._axes.clear()
+        ensemble = hasattr(graph, 'std')
+
+        self._plot(
+            graph.x,
+            graph.y,
+            width,
+            '-',
+            label='Mean' if ensemble else 'Measured Data'
+            )
+
+        # Ensemble graphs carry spread of the repeated measurements.
+        if ensemble:
+            self._axes.fill_between(
+                graph.x,
+                graph.y - graph.std,
+                graph.y + graph.std,
+                alpha=0.3,
+                linewidth=0.0,
+                label='\u00b1\u03c3'
+                )
+            self._plot(
+                graph.x,
+                graph.minimum,
+                width,
+                ':',
+                color='gray',
+                label='Min/Max'
+                )
+            self._plot(graph.x, graph.maximum, width, ':', color='gray')
+
+        for mode in self._smoothing:
+            self._plot(
+                graph.x,
+                graph.smoothed(win_type=mode, win_len=self._win_len),
+                width,
+                '-',
+                label=mode.capitalize()
+                )
+
+        self._axes.set_xlabel(graph.headers[0])
+        self._axes.set_ylabel(graph.headers[1])
+        self._axes.set_title(graph.title)
+        self._axes.legend()
+
+    def render(self, graph, file_name, image_format=None):
+        """Renders graph to the image file. Image format is taken from the
+        file name extension, unless given.
+        """
+
+        if image_format is None:
+            image_format = splitext(file_name)[1].lstrip('.').lower() \
+                or 'png'
+
+        width = None
+        if image_format not in VECTOR_FORMATS:
+            width = int(self._figure.get_figwidth() * self._figure.dpi)
+
+        with style.context(self._style):
+            self.draw(graph, width)
+            self._figure.savefig(file_name, format=image_format)
+
+    def render_file(self, data_file, file_name, delimiter=',',
+                    image_format=None):
+        """Reads data file and renders it to the image file.
+
+        It returns RenderResult named tuple, where output is None and error
+        holds the error message if the file could not be rendered.
+        """
+
+        try:
+            data_reader = mdam.CSVDataReader()
+            data = data_reader.read_data(data_file, delimiter)
+            if data is None:
+                return RenderResult(
+                    data_file,
+                    None,
+                    str(data_reader.last_error)
+                    )
+
+            graph = mdam.Graph(data, data_reader.headers, basename(data_file))
+            self.render(graph, file_name, image_format)
+
+        except (OSError, ValueError) as err:
+            return RenderResult(data_file, None, str(err))
+
+        return RenderResult(data_file, file_name, None)
+
+
+# =============================================================================
+# Batch rendering
+# =============================================================================
+
+# Renderer of the worker process (see _init_worker()).
+_worker_renderer = None
+
+
+def _init_worker(options):
+    """Creates the renderer of a worker process once, at worker start.
+    """
+
+    global _worker_renderer
+    _worker_renderer = GraphRenderer(**options)
+
+
+def _render_job(job):
+    """Renders a single file in a worker process.
+    """
+
+    data_file, file_name, delimiter, image_format = job
+
+    return _worker_renderer.render_file(
+        data_file,
+        file_name,
+        delimiter,
+        image_format
+        )
+
+
+def render_files(
+        data_files,
+        output_dir,
+        image_format='png',
+        delimiter=',',
+        processes=None,
+        **kwargs
+        ):
+    """Renders data files to image files in parallel.
+
+    Input:
+        data_files:     Sequence of CSV data file names.
+
+        output_dir:     Directory images are written to. Images are named
+                        after the data files (see output_names()).
+
+        image_format:   Image format (e.g. 'png', 'svg').
+
+        delimiter:      Field delimiter of the data files.
+
+        processes:      Number of worker processes. If None, number of CPUs
+                        is used. If 1, files are rendered in the calling
+                        process.
+
+        Remaining key-word arguments are passed to GraphRenderer.
+
+    Result:
+        List of RenderResult named tuples in order of the data files.
+    """
+
+    data_files = list(data_files)
+    jobs = [
+        (data_file, file_name, delimiter, image_format)
+        for data_file, file_name in zip(
+            data_files,
+            output_names(data_files, output_dir, image_format)
+            )
+        ]
+
+    if processes is None:
+        processes = cpu_count() or 1
+    processes = max(min(processes, len(jobs)), 1)
+
+    if processes == 1:
+        renderer = GraphRenderer(**kwargs)
+        return [renderer.render_file(*job) for job in jobs]
+
+    # Jobs are sent in chunks to keep interprocess communication overhead
+    # low when rendering thousands of small files.
+    chunksize = max(len(jobs) // (4 * processes), 1)
+
+    with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(kwargs,)
+            ) as executor:
+        return list(executor.map(_render_job, jobs, chunksize=chunksize))
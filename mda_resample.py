@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""Resampling of curves onto a common abscissa grid.
+
+Interpolation from a source grid onto a target grid is linear in the data,
+so it is precomputed once as an interpolation plan (indices of the source
+samples contributing to each target sample and their weights). Applying the
+plan to any number of curves sampled on the source grid is then a single
+gather and multiply. Plans are cached, so resampling hundreds of curves
+with the same grids builds the plan only once.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import OrderedDict
+import numpy as np
+import mda_models as mdam
+
+
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Maximum number of interpolation plans kept in the cache.
+PLAN_CACHE_SIZE = 32
+
+# Number of gathered source samples processed at once when a plan is
+# applied. Limits memory used for temporaries when resampling many curves.
+APPLY_CHUNK_SIZE = 1 << 22
+
+INTERPOLATION_METHODS = ('linear', 'cubic')
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+def _grid_key(x_values):
+    """Utility routine that returns hashable key of given grid. Different
+    grids can share the key if their hashes collide, so grids found by the
+    key must be compared with np.array_equal().
+    """
+
+    return (x_values.shape, x_values.dtype.str, hash(x_values.tobytes()))
+
+
+def _bracket(source_x, target_x):
+    """Utility routine that returns index of the source sample preceding
+    each target sample, clipped so that it always has a successor.
+    """
+
+    return np.clip(
+        np.searchsorted(source_x, target_x, side='right') - 1,
+        0,
+        source_x.size - 2
+        )
+
+
+def _linear_weights(source_x, target_x):
+    """Utility routine computing indices and weights of linear
+    interpolation.
+    """
+
+    lower = _bracket(source_x, target_x)
+    weight = (target_x - source_x[lower]) \
+        / (source_x[lower + 1] - source_x[lower])
+
+    indices = np.stack((lower, lower + 1), axis=1)
+    weights = np.stack((1.0 - weight, weight), axis=1)
+
+    return indices, weights
+
+
+def _cubic_weights(source_x, target_x):
+    """Utility routine computing indices and weights of local cubic
+    (four point Lagrange) interpolation. Works on non-uniform grids.
+    """
+
+    first = np.clip(_bracket(source_x, target_x) - 1, 0, source_x.size - 4)
+    indices = first[:, np.newaxis] + np.arange(4)
+    nodes = source_x[indices]
+    target = target_x[:, np.newaxis]
+
+    weights = np.ones(indices.shape, dtype=float)
+    for k in range(4):
+        for m in range(4):
+            if m != k:
+                weights[:, k] *= (target[:, 0] - nodes[:, m]) \
+                    / (nodes[:, k] - nodes[:, m])
+
+    return indices, weights
+
+
+def _merge_stencils(indices, weights, source_size):
+    """Utility routine that sums weights of repeated source indices within
+    each target sample's stencil and drops zero weights. Stencils are
+    padded to the length of the longest one with zero weights.
+    """
+
+    target_size = indices.shape[0]
+    rows = np.repeat(np.arange(target_size), indices.shape[1])
+    nonzero = weights.ravel() != 0.0
+    keys, inverse = np.unique(
+        rows[nonzero] * source_size + indices.ravel()[nonzero],
+        return_inverse=True
+        )
+    summed = np.bincount(inverse, weights=weights.ravel()[nonzero])
+    rows, columns = np.divmod(keys, source_size)
+
+    counts = np.bincount(rows, minlength=target_size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    width = max(int(counts.max()), 1)
+
+    merged_indices = np.zeros((target_size, width), dtype=np.intp)
+    merged_weights = np.zeros((target_size, width), dtype=float)
+    position = np.arange(keys.size) - starts[rows]
+    merged_indices[rows, position] = columns
+    merged_weights[rows, position] = summed
+
+    return merged_indices, merged_weights
+
+
+def _antialias_weights(source_x, half_width, centers):
+    """Utility routine computing indices and weights of a Hann window
+    low-pass filter with given half-width, applied on the source grid.
+    Filter rows are computed only for the source samples with given
+    indices (centers), so memory does not grow with the length of the
+    source grid. Window is truncated and renormalized at the ends of the
+    grid.
+    """
+
+    center_x = source_x[centers]
+    lower = np.searchsorted(source_x, center_x - half_width, side='left')
+    upper = np.searchsorted(source_x, center_x + half_width, side='right')
+    width = int((upper - lower).max())
+
+    indices = lower[:, np.newaxis] + np.arange(width)
+    inside = indices < upper[:, np.newaxis]
+    indices = np.minimum(indices, source_x.size - 1)
+
+    dist = np.abs(source_x[indices] - center_x[:, np.newaxis]) / half_width
+    weights = np.where(inside, 0.5 + 0.5 * np.cos(np.pi * dist), 0.0)
+    weights /= weights.sum(axis=1)[:, np.newaxis]
+
+    return indices, weights
+
+
+# =============================================================================
+# Model classes
+# =============================================================================
+
+class InterpolationPlan():
+    """Precomputed mapping of data sampled on the source grid onto the target
+    grid.
+
+    Each target sample is a weighted sum of a fixed number of source
+    samples. Indices of these samples and their weights are stored as two
+    arrays of shape (target_size, stencil_size).
+
+    When target grid is coarser than the source grid data is low-pass
+    filtered before interpolation to avoid aliasing. The filter is a Hann
+    window with half-width equal to the target sampling step, and its
+    weights are folded into the plan, so filtering costs nothing extra on
+    application.
+    """
+
+    def __init__(
+            self,
+            source_x,
+            target_x,
+            method='linear',
+            antialias=None,
+            fill_value=np.nan
+            ):
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(
+                'Interpolation method must be one of "linear", "cubic"'
+                )
+
+        source_x = np.asarray(source_x, dtype=float)
+        target_x = np.asarray(target_x, dtype=float)
+
+        if source_x.ndim != 1 or source_x.size < 2:
+            raise ValueError('Source grid must have at least two samples.')
+
+        if np.any(np.diff(source_x) <= 0.0):
+            raise ValueError('Source grid must be strictly increasing.')
+
+        if method == 'cubic' and source_x.size < 4:
+            method = 'linear'
+
+        self._source_size = source_x.size
+        self._target_x = target_x
+        self._method = method
+        self._fill_value = fill_value
+
+        if method == 'cubic':
+            indices, weights = _cubic_weights(source_x, target_x)
+        else:
+            indices, weights = _linear_weights(source_x, target_x)
+
+        source_step = np.median(np.diff(source_x))
+        target_step = np.median(np.diff(target_x)) \
+            if target_x.size > 1 else 0.0
+
+        if antialias is None:
+            antialias = target_step > source_step
+
+        if antialias and target_step > 0.0:
+            # Compose low-pass filter with interpolation. Filter is only
+            # evaluated at source samples the interpolation stencils touch.
+            centers, rows = np.unique(indices, return_inverse=True)
+            rows = rows.reshape(indices.shape)
+            filter_indices, filter_weights = _antialias_weights(
+                source_x,
+                target_step,
+                centers
+                )
+            weights = (
+                weights[:, :, np.newaxis] * filter_weights[rows]
+                ).reshape(target_x.size, -1)
+            indices = filter_indices[rows].reshape(target_x.size, -1)
+
+            # Filters of neighbouring stencil samples overlap, so most
+            # source samples appear several times in the composed stencil.
+            indices, weights = _merge_stencils(
+                indices,
+                weights,
+                source_x.size
+                )
+
+        self._indices = indices
+        self._weights = weights
+        self._outside = (target_x < source_x[0]) | (target_x > source_x[-1])
+        self._antialias = bool(antialias and target_step > 0.0)
+
+    @property
+    def target_x(self):
+        """Abscissa values of the target grid.
+        """
+
+        return self._target_x
+
+    @property
+    def method(self):
+        """Interpolation method used by the plan.
+        """
+
+        return self._method
+
+    @property
+    def antialias(self):
+        """True if the plan low-pass filters data before interpolation.
+        """
+
+        return self._antialias
+
+    def apply(self, curves):
+        """Resample curves sampled on the source grid onto the target grid.
+
+        Input:
+            curves: 1D numpy array storing a single curve or 2D numpy array
+                    storing one curve per row.
+
+        Result:
+            Numpy array of the same number of dimensions as curves, with the
+            last dimension matching the size of the target grid. Target
+            samples outside the source grid are set to fill value.
+
+        Curves are processed in chunks of at most APPLY_CHUNK_SIZE gathered
+        samples, so memory used does not grow with the number of curves.
+        """
+
+        curves = np.asarray(curves, dtype=float)
+        if curves.shape[-1] != self._source_size:
+            raise ValueError('Curves are not sampled on the source grid.')
+
+        rows = curves.reshape(-1, self._source_size)
+        result = np.empty((rows.shape[0], self._target_x.size), dtype=float)
+        chunk = max(APPLY_CHUNK_SIZE // max(self._indices.size, 1), 1)
+
+        for start in range(0, rows.shape[0], chunk):
+            stop = min(start + chunk, rows.shape[0])
+            result[start:stop] = np.einsum(
+                'ctk,tk->ct',
+                rows[start:stop][:, self._indices],
+                self._weights
+                )
+
+        result = result.reshape(curves.shape[:-1] + (self._target_x.size,))
+        result[..., self._outside] = self._fill_value
+
+        return result
+
+
+_PLAN_CACHE = OrderedDict()
+
+
+def get_plan(
+        source_x,
+        target_x,
+        method='linear',
+        antialias=None,
+        fill_value=np.nan
+        ):
+    """Return interpolation plan mapping source grid onto target grid.
+
+    Plans are kept in a least recently used cache of PLAN_CACHE_SIZE
+    entries, so repeated requests for the same pair of grids return the same
+    plan without recomputing it. Cache entries keep copies of their grids,
+    which are compared with the requested ones, so a hash collision never
+    returns a plan built for other grids. Arguments are the same as for
+    InterpolationPlan.
+    """
+
+    source_x = np.ascontiguousarray(source_x, dtype=float)
+    target_x = np.ascontiguousarray(target_x, dtype=float)
+    key = (
+        _grid_key(source_x),
+        _grid_key(target_x),
+        method,
+        antialias,
+        repr(fill_value)
+        )
+
+    if key in _PLAN_CACHE:
+        cached_source, cached_target, plan = _PLAN_CACHE[key]
+        if np.array_equal(cached_source, source_x) \
+                and np.array_equal(cached_target, target_x):
+            _PLAN_CACHE.move_to_end(key)
+            return plan
+
+    plan = InterpolationPlan(
+        source_x,
+        target_x,
+        method=method,
+        antialias=antialias,
+        fill_value=fill_value
+        )
+    _PLAN_CACHE[key] = (source_x.copy(), target_x.copy(), plan)
+    _PLAN_CACHE.move_to_end(key)
+    if len(_PLAN_CACHE) > PLAN_CACHE_SIZE:
+        _PLAN_CACHE.popitem(last=False)
+
+    return plan
+
+
+def clear_plan_cache():
+    """Remove all interpolation plans from the cache.
+    """
+
+    _PLAN_CACHE.clear()
+
+
+# =============================================================================
+# Graph resampling
+# =============================================================================
+
+def resample_graphs(graphs, target_x, **kwargs):
+    """Resample ordinate values of given Graph objects onto the target grid.
+
+    Graphs sharing the same abscissa grid share the same plan and are
+    resampled together. Key-word arguments are passed to get_plan().
+
+    Result:
+        2D numpy array storing one resampled curve per row.
+    """
+
+    target_x = np.asarray(target_x, dtype=float)
+    result = np.empty((len(graphs), target_x.size), dtype=float)
+
+    # Group graphs by their grid so each plan is applied only once. Grids
+    # sharing the key are compared, since their hashes can collide.
+    groups = OrderedDict()
+    for index, graph in enumerate(graphs):
+        x_values = np.ascontiguousarray(graph.x, dtype=float)
+        candidates = groups.setdefault(_grid_key(x_values), [])
+        for grid, members in candidates:
+            if np.array_equal(grid, x_values):
+                members.append(index)
+                break
+        else:
+            candidates.append((x_values, [index]))
+
+    for candidates in groups.values():
+        for x_values, members in candidates:
+            plan = get_plan(x_values, target_x, **kwargs)
+            result[members] = plan.apply(
+                np.vstack([graphs[index].y for index in members])
+                )
+
+    return result
+
+
+def resample_graph(graph, target_x, **kwargs):
+    """Return new Graph object holding given graph resampled onto the target
+    grid. Key-word arguments are passed to get_plan().
+    """
+
+    target_x = np.asarray(target_x, dtype=float)
+    y_values = get_plan(graph.x, target_x, **kwargs).apply(graph.y)
+
+    return mdam.Graph(
+        np.column_stack((target_x, y_values)),
+        graph.headers,
+        graph.title
+        )
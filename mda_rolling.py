@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Rolling (moving window) statistics and peak detection.
+
+Complements Graph.scaled_window_smoothed() with rolling mean, standard
+deviation, minimum and maximum, all computed in O(N) time regardless of
+the window length: mean and standard deviation from cumulative sums, and
+minimum and maximum by the van Herk/Gil-Werman block algorithm, which
+replaces the sequential monotonic deque with vectorized prefix and suffix
+scans. Peak finder locates local maxima (or minima) and filters them by
+height and topographic prominence.
+"""
+
+# =============================================================================
+# Measurement Data Anlysis - a small GUI app for analisys of measurement data.
+#
+#  Copyright (C) 2020 Ljubomir Kurij <ljubomir_kurij@protonmail.com>
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option)
+# any later version.
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# =============================================================================
+
+
+# ============================================================================
+#
+# TODO:
+#
+#
+# ============================================================================
+
+
+# ============================================================================
+#
+# References (this section should be deleted in the release version)
+#
+# [1] M. van Herk, A fast algorithm for local minimum and maximum filters
+#     on rectangular and octagonal kernels, Pattern Recogn. Lett. 13, 1992.
+# [2] J. Gil, M. Werman, Computing 2-D min, median, and max filters, IEEE
+#     Trans. PAMI 15 (5), 1993.
+#
+# ============================================================================
+
+
+# =============================================================================
+# Modules import section
+# =============================================================================
+
+from collections import namedtuple
+import numpy as np
+
+
+# =============================================================================
+# Utility classes and functions
+# =============================================================================
+
+Peaks = namedtuple('Peaks', 'indices heights prominences')
+
+
+def _check_window(values, win_len):
+    """Utility routine that validates input array and window length.
+    """
+
+    values = np.asarray(values, dtype=float)
+
+    if values.ndim != 1:
+        raise ValueError('Input must be 1D array.')
+
+    if win_len < 1:
+        raise ValueError('Window length must be positive.')
+
+    return values
+
+
+def _window_bounds(size, win_len):
+    """Utility routine that returns bounds [lower, upper) of windows
+    centered on each sample, truncated at the ends of the array.
+    """
+
+    index = np.arange(size)
+    half = win_len // 2
+
+    return (
+        np.maximum(index - half, 0),
+        np.minimum(index - half + win_len, size)
+        )
+
+
+def _sliding_extreme(values, win_len, ufunc, fill):
+    """Utility routine implementing van Herk/Gil-Werman sliding minimum or
+    maximum filter.
+
+    Signal is padded and split into blocks of the window length. Within
+    each block running extremes are computed from the left (prefix) and
+    from the right (suffix). Every window spans at most two neighbouring
+    blocks, so its extreme is the extreme of the suffix at its first sample
+    and the prefix at its last sample. That takes three comparisons per
+    sample in total, independently of the window length.
+    """
+
+    size = values.size
+    half = win_len // 2
+    block_count = -(-(size + win_len - 1) // win_len)
+
+    padded = np.full(block_count * win_len, fill)
+    padded[half:half + size] = values
+    blocks = padded.reshape(block_count, win_len)
+
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    index = np.arange(size)
+
+    return ufunc(suffix[index], prefix[index + win_len - 1])
+
+
+# =============================================================================
+# Rolling statistics
+# =============================================================================
+
+def rolling_mean(values, win_len=11):
+    """Compute mean over a window centered on each sample.
+
+    Windows are truncated at the ends of the array, so the output has the
+    same size as the input.
+    """
+
+    values = _check_window(values, win_len)
+    lower, upper = _window_bounds(values.size, win_len)
+    sums = np.r_[0.0, np.cumsum(values)]
+
+    return (sums[upper] - sums[lower]) / (upper - lower)
+
+
+def rolling_std(values, win_len=11, ddof=1):
+    """Compute standard deviation over a window centered on each sample,
+    e.g. for noise estimation.
+
+    Uses cumulative sums of values and their squares. Values are shifted by
+    their overall mean first, which limits the loss of precision when
+    subtracting the sums.
+    """
+
+    values = _check_window(values, win_len)
+    values = values - values.mean()
+    lower, upper = _window_bounds(values.size, win_len)
+    count = upper - lower
+
+    sums = np.r_[0.0, np.cumsum(values)]
+    squares = np.r_[0.0, np.cumsum(values * values)]
+    window_sum = sums[upper] - sums[lower]
+    window_squares = squares[upper] - squares[lower]
+
+    deviation = np.maximum(
+        window_squares - window_sum * window_sum / count,
+        0.0
+        )
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(
+            count > ddof,
+            np.sqrt(deviation / (count - ddof)),
+            np.nan
+            )
+
+
+def rolling_min(values, win_len=11):
+    """Compute minimum over a window centered on each sample.
+    """
+
+    values = _check_window(values, win_len)
+
+    return _sliding_extreme(values, win_len, np.minimum, np.inf)
+
+
+def rolling_max(values, win_len=11):
+    """Compute maximum over a window centered on each sample.
+    """
+
+    values = _check_window(values, win_len)
+
+    return _sliding_extreme(values, win_len, np.maximum, -np.inf)
+
+
+# =============================================================================
+# Peak detection
+# =============================================================================
+
+def local_maxima(values):
+    """Find indices of local maxima.
+
+    A sample is a local maximum if it is larger than its neighbours. For
+    flat peaks (plateaus) the middle sample is returned. Samples at the
+    ends of the array are never reported.
+    """
+
+    values = _check_window(values, 1)
+    if values.size < 3:
+        return np.zeros(0, dtype=np.intp)
+
+    # Collapse runs of equal values, so plateaus are handled as single
+    # samples.
+    change = np.r_[True, values[1:] != values[:-1]]
+    starts = np.flatnonzero(change)
+    ends = np.r_[starts[1:], values.size] - 1
+    levels = values[starts]
+
+    is_peak = np.zeros(levels.size, dtype=bool)
+    is_peak[1:-1] = (levels[1:-1] > levels[:-2]) & (levels[1:-1] > levels[2:])
+
+    return (starts[is_peak] + ends[is_peak]) // 2
+
+
+def _bases(values, peaks, heights):
+    """Utility routine that computes for each peak the lowest point between
+    it and the nearest strictly higher peak on one side (or the end of the
+    array).
+
+    Minima between neighbouring peaks are computed first in one pass over
+    the array. Then a monotonic stack of peaks is maintained; each popped
+    peak hands its accumulated minimum to the peak that popped it, so every
+    peak is pushed and popped once.
+    """
+
+    # valleys[k] is the minimum over [peaks[k - 1], peaks[k]), or over
+    # [0, peaks[0]) for the first peak.
+    valleys = np.minimum.reduceat(values, np.r_[0, peaks])[:peaks.size]
+
+    bases = np.empty(peaks.size)
+    stack_heights = list()
+    stack_minima = list()
+
+    for index in range(peaks.size):
+        current = valleys[index]
+        while stack_heights and stack_heights[-1] <= heights[index]:
+            stack_heights.pop()
+            current = min(current, stack_minima.pop())
+        bases[index] = current
+        stack_heights.append(heights[index])
+        stack_minima.append(current)
+
+    return bases
+
+
+def prominences(values, peaks):
+    """Compute topographic prominence of the given peaks.
+
+    Prominence is the height of the peak above the higher of its two bases,
+    where a base is the lowest point between the peak and the nearest
+    strictly higher peak on that side (or the end of the array).
+    """
+
+    values = _check_window(values, 1)
+    peaks = np.asarray(peaks, dtype=np.intp)
+    if peaks.size == 0:
+        return np.zeros(0)
+
+    heights = values[peaks]
+    left = _bases(values, peaks, heights)
+
+    reversed_peaks = values.size - 1 - peaks[::-1]
+    right = _bases(values[::-1], reversed_peaks, heights[::-1])[::-1]
+
+    return heights - np.maximum(left, right)
+
+
+def find_peaks(values, height=None, prominence=None, valleys=False):
+    """Find local maxima (or minima) filtered by height and prominence.
+
+    Input:
+        values:     1D numpy array.
+
+        height:     Minimum peak height (maximum valley depth if valleys is
+                    set). None disables the filter.
+
+        prominence: Minimum peak prominence. None disables the filter.
+
+        valleys:    If True local minima are searched for instead.
+
+    Result:
+        Peaks named tuple holding indices, heights and prominences of the
+        found peaks.
+    """
+
+    values = _check_window(values, 1)
+    signal = -values if valleys else values
+
+    peaks = local_maxima(signal)
+
+    if height is not None:
+        limit = -height if valleys else height
+        peaks = peaks[signal[peaks] >= limit]
+
+    peak_prominences = prominences(signal, peaks)
+
+    if prominence is not None:
+        keep = peak_prominences >= prominence
+        peaks = peaks[keep]
+        peak_prominences = peak_prominences[keep]
+
+    return Peaks(
+        indices=peaks,
+        heights=values[peaks],
+        prominences=peak_prominences
+        )
+
+
+def find_graph_peaks(graph, **kwargs):
+    """Find peaks (or valleys) of the Graph object's ordinate values.
+    Key-word arguments are passed to find_peaks().
+
+    Result:
+        Tuple of format (positions, peaks), where positions holds abscissa
+        of the found peaks and peaks is Peaks named tuple.
+    """
+
+    peaks = find_peaks(graph.y, **kwargs)
+
+    return graph.x[peaks.indices], peaks
@@ -50,20 +50,48 @@
 # Modules import section
 # =============================================================================
 
+from concurrent.futures import ThreadPoolExecutor
+from csv import Error as CSVError
 from enum import Enum  # Required by Message class.
+from os.path import basename
 from matplotlib import use  # Required by use in line 63
+from matplotlib.lines import Line2D
+from matplotlib.transforms import blended_transform_factory
 from matplotlib.backends.backend_tkagg import (
         FigureCanvasTkAgg,
         NavigationToolbar2Tk
     )
+import queue
+import threading
 import tkinter as tki
+import tkinter.filedialog as tkfd
+import tkinter.messagebox as tkmb
 import tkinter.ttk as ttk
 import matplotlib.pyplot as plt
+import numpy as np
+import mda_decimation as mdad
+import mda_models as mdam
 
 use("TkAgg")
 plt.style.use('bmh')
 
 
+# =============================================================================
+# Global constants
+# =============================================================================
+
+# Interval (in ms) at which results of background computations are checked.
+RESULT_POLL_INTERVAL = 50
+
+# Default number of samples kept by the live view and the default number of
+# its redraws per second.
+STREAM_CAPACITY = 100000
+STREAM_FRAME_RATE = 20.0
+
+# Fraction of the data range added to the axes limits on each side.
+AXES_MARGIN = 0.05
+
+
 # =============================================================================
 # Utility classes and functions
 # =============================================================================
@@ -75,6 +103,8 @@ class Message(Enum):
 
     updtview = 0  # Update view.
     smchngd = 1   # Graph smoothing options have changed.
+    openfile = 2  # User requested opening of a data file.
+    crsrchngd = 3  # Crosshair readout mode has changed.
 
 def checktype(tpe, var, vardsc):
     """Utility routine used to check if given variable (var) is of requested
@@ -91,6 +121,145 @@ def checktype(tpe, var, vardsc):
         ))
 
 
+class BlitManager():
+    """Utility class for fast redrawing of overlay artists by blitting.
+
+    Overlay (animated) artists are excluded from the regular canvas draw.
+    After each full draw the rendered background is saved, so overlays can
+    be redrawn later by restoring the background, drawing only the overlays
+    on top of it and blitting the result to the screen.
+    """
+
+    def __init__(self, canvas):
+        self._canvas = canvas
+        self._background = None
+        self._artists = list()
+
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add_artist(self, artist):
+        """Add overlay artist. Artist is marked as animated, so the regular
+        draw skips it.
+        """
+
+        artist.set_animated(True)
+        self._artists.append(artist)
+
+    def artists(self):
+        """Returns list of overlay artists.
+        """
+
+        return list(self._artists)
+
+    def remove_artist(self, artist):
+        """Remove overlay artist.
+        """
+
+        if artist in self._artists:
+            self._artists.remove(artist)
+
+    def _on_draw(self, event):
+        """Save the background after full draw and draw overlays over it.
+        """
+
+        self._background = self._canvas.copy_from_bbox(
+            self._canvas.figure.bbox
+            )
+        self._draw_artists()
+
+    def _draw_artists(self):
+        """Draw visible overlay artists.
+        """
+
+        figure = self._canvas.figure
+        for artist in self._artists:
+            if artist.get_visible() and artist.figure is figure:
+                figure.draw_artist(artist)
+
+    def draw_into_background(self, artists):
+        """Draw regular (not animated) artists over the saved background and
+        save the result as the new background. Artists newly added to the
+        axes are shown this way without redrawing the rest of the figure.
+        If there is no saved background a full draw is done.
+        """
+
+        if self._background is None:
+            self._canvas.draw_idle()
+            return
+
+        figure = self._canvas.figure
+        self._canvas.restore_region(self._background)
+        for artist in artists:
+            figure.draw_artist(artist)
+        self._background = self._canvas.copy_from_bbox(figure.bbox)
+
+        self._draw_artists()
+        self._canvas.blit(figure.bbox)
+
+    def invalidate(self):
+        """Drop the saved background, e.g. after non-overlay artists have
+        changed. Next update() then does a full draw.
+        """
+
+        self._background = None
+
+    def update(self):
+        """Redraw overlays over the saved background and blit them to the
+        screen. If there is no saved background a full draw is done.
+        """
+
+        if self._background is None:
+            self._canvas.draw_idle()
+            return
+
+        self._canvas.restore_region(self._background)
+        self._draw_artists()
+        self._canvas.blit(self._canvas.figure.bbox)
+
+
+class RedrawScheduler():
+    """Utility class that coalesces redraw requests of the views.
+
+    Views mark themselves dirty instead of redrawing immediately. All dirty
+    views are redrawn once, when the Tk event loop becomes idle, so a burst
+    of events (e.g. quick checkbox toggles) costs a single redraw. Redraws
+    never run nested inside another event handler.
+    """
+
+    def __init__(self, widget):
+        self._widget = widget  # Widget whose event loop runs the redraws.
+        self._dirty = list()  # Redraw callbacks of the dirty views.
+        self._scheduled = None  # Identifier of the scheduled flush.
+
+    def mark_dirty(self, redraw):
+        """Marks view dirty. Redraw is a callable that redraws the view.
+        """
+
+        if redraw not in self._dirty:
+            self._dirty.append(redraw)
+
+        if self._scheduled is None:
+            self._scheduled = self._widget.after_idle(self._flush)
+
+    def _flush(self):
+        """Redraws all views marked dirty since the last flush.
+        """
+
+        self._scheduled = None
+        dirty, self._dirty = self._dirty, list()
+        for redraw in dirty:
+            redraw()
+
+    def cancel(self):
+        """Drops all pending redraws.
+        """
+
+        if self._scheduled is not None:
+            self._widget.after_cancel(self._scheduled)
+            self._scheduled = None
+        self._dirty = list()
+
+
 # =============================================================================
 # View classes
 # =============================================================================
@@ -99,7 +268,11 @@ class PlotNavigationToolbar(NavigationToolbar2Tk):
     """ TODO: Put class docstring HERE.
     """
 
-    def __init__(self, canvas, window):
+    def __init__(self, canvas, window, readout=None):
+        # Readout is a callable taking mouse event and returning message to
+        # be displayed in the toolbar.
+        self._readout = readout
+
         # Pass initialization to the superclass.
         super().__init__(canvas, window)
 
@@ -107,8 +280,12 @@ class PlotNavigationToolbar(NavigationToolbar2Tk):
         """ TODO: Put method docstring HERE.
         """
 
-        # We don't want any position message in the toolbar.
-        self.set_message('')
+        # We don't want default position message in the toolbar. Readout,
+        # if set, provides values read off the curves instead.
+        message = ''
+        if self._readout is not None:
+            message = self._readout(event)
+        self.set_message(message)
 
 
 class PlotView(tki.Frame):
@@ -132,9 +309,17 @@ class PlotView(tki.Frame):
             # Set default line thickness for the plot.
             self._linewidth = 0.5
 
+        # Redraw scheduler can be shared with other views by passing it as
+        # key-word argument.
+        scheduler = kwargs.pop('scheduler', None)
+
         # Pass the rest of initialization to the superclass.
         tki.Frame.__init__(self, *args, **kwargs)
 
+        if scheduler is None:
+            scheduler = RedrawScheduler(self)
+        self._scheduler = scheduler
+
         # Initialize the figure.
         self._figure = plt.Figure()
         FigureCanvasTkAgg(self._figure, self)
@@ -148,6 +333,7 @@ class PlotView(tki.Frame):
         self._toolbar = PlotNavigationToolbar(
                 self._figure.canvas,
                 self,
+                readout=self.readout
             )
         self._toolbar.pack_propagate(0)
 
@@ -160,12 +346,175 @@ class PlotView(tki.Frame):
         for mode in smth_modes:
             self._smth_prvu[mode] = False
 
+        # Every displayed series keeps its own artist, so an update only
+        # changes data or visibility of the artists instead of replotting
+        # everything. Smoothing previews and the legend are overlays that
+        # are redrawn by blitting over the saved background.
+        self._blit = BlitManager(self._figure.canvas)
+        self._shown_model = None  # Model the artists were created for.
+        self._shown_data = dict()  # Map of shown graphs and generations.
+        self._lines = dict()  # Map of series names and their artists.
+        self._band = None  # Ensemble spread (fill_between) artist.
+        self._series = dict()  # Full resolution data of the artists.
+        self._shown_range = dict()  # View the artists' data was set for.
+        self._legend = None
+        self._legend_labels = None  # Labels the legend was built for.
+
+        self._figure.canvas.mpl_connect('resize_event', self._on_view_change)
+
+        # Crosshair readout (see readout()). Crosshair artists are blitted
+        # overlays that are created on first use.
+        self._crosshair = False
+        self._cursor = None
+
+        # Smoothing previews are computed on a worker thread. Results are
+        # passed back through the queue which is polled from the Tk event
+        # loop. Every request (model, mode) carries the generation of the
+        # model data, and its result is accepted only while the request is
+        # outstanding and the model data did not change. Failed requests
+        # are not repeated until the model data changes.
+        self._worker = ThreadPoolExecutor(max_workers=1)
+        self._results = queue.Queue()
+        self._pending = dict()  # Map of requests and data generations.
+        self._failed = dict()  # Map of failed requests and generations.
+        self._failures = list()  # Failure messages not reported yet.
+        self._reporting = False
+        self._polling = False
+        self.bind('<Destroy>', self._on_destroy)
+
     def change_smoothing_preview(self, options):
         """TODO: Put method docstring HERE.
         """
 
         self._smth_prvu = options
-        self._update()
+        self._drop_requests(lambda model, mode: bool(options.get(mode)))
+        self.update()
+
+    def _drop_requests(self, wanted=None):
+        """Drops outstanding smoothing requests (model, mode) for which
+        wanted(model, mode) is False, or all of them if wanted is None.
+        Results of the dropped requests are discarded.
+        """
+
+        if wanted is None:
+            self._pending = dict()
+        else:
+            self._pending = {
+                key: generation for key, generation in self._pending.items()
+                if wanted(*key)
+                }
+
+    def _request_smoothed(self, model, mode):
+        """Queues computation of the smoothing preview on the worker
+        thread, unless it is already outstanding for the current model
+        data.
+        """
+
+        generation = model.generation
+        if self._pending.get((model, mode)) == generation:
+            return
+
+        self._pending[(model, mode)] = generation
+        self._worker.submit(
+            self._compute_smoothed,
+            generation,
+            model,
+            mode
+            )
+
+        if not self._polling:
+            self._polling = True
+            self.after(RESULT_POLL_INTERVAL, self._poll_results)
+
+    def _compute_smoothed(self, generation, model, mode):
+        """Runs on the worker thread. Computes smoothing preview and posts
+        it to the results queue. Requests that went stale while waiting in
+        the queue are skipped.
+        """
+
+        if self._pending.get((model, mode)) != generation:
+            return
+
+        try:
+            values = model.smoothed(win_type=mode)
+        except Exception as error:
+            values = error
+        self._results.put((generation, model, mode, values))
+
+    def _poll_results(self):
+        """Runs on the Tk event loop. Takes finished smoothing previews
+        from the results queue and displays those that are not stale.
+        """
+
+        fresh = False
+        while True:
+            try:
+                generation, model, mode, values = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            # Drop results of withdrawn requests and of replaced data.
+            if self._pending.get((model, mode)) != generation \
+                    or model.generation != generation:
+                continue
+
+            del self._pending[(model, mode)]
+            if not self._displays(model):
+                continue
+
+            if isinstance(values, Exception):
+                self._failed[(model, mode)] = generation
+                self._failures.append(
+                    'Could not smooth \'{0}\' with {1} window: {2}.'.format(
+                        model.title,
+                        mode,
+                        values
+                        )
+                    )
+                continue
+
+            model.cache(('smoothed', mode), values)
+            fresh = True
+
+        if self._pending:
+            self.after(RESULT_POLL_INTERVAL, self._poll_results)
+        else:
+            self._polling = False
+
+        if fresh:
+            self.update()
+
+        # Message box runs a nested event loop, so it is shown outside of
+        # the polling callback.
+        if self._failures and not self._reporting:
+            self._reporting = True
+            self.after_idle(self._report_failures)
+
+    def _report_failures(self):
+        """Shows failures of the smoothing previews in a message box.
+        Failures reported while the message box is open are shown in the
+        next one, so only one message box is open at a time.
+        """
+
+        while self._failures:
+            messages = self._failures
+            self._failures = list()
+            tkmb.showerror(
+                'Smoothing Preview',
+                '\n'.join(messages),
+                parent=self
+                )
+
+        self._reporting = False
+
+    def _on_destroy(self, event):
+        """Stops the worker thread when the widget is destroyed.
+        """
+
+        if event.widget is self:
+            self._scheduler.cancel()
+            self._drop_requests()
+            self._worker.shutdown(wait=False)
 
     def model(self):
         """TODO: Put method docstring HERE.
@@ -176,49 +525,752 @@ class PlotView(tki.Frame):
             model = self._controller.data_model
         return model
 
+    def _displays(self, graph):
+        """Returns True if the graph is displayed by the view.
+        """
+
+        return graph is self.model()
+
+    def _smoothed(self, model, mode):
+        """Returns smoothed ordinate values of the model for the smoothing
+        preview or None if they are not computed yet, in which case the
+        computation is requested. Values are kept in the model's cache, so
+        toggling a preview on and off smooths the data only once per data
+        set.
+        """
+
+        values = model.cached(('smoothed', mode))
+        if values is None \
+                and self._failed.get((model, mode)) != model.generation:
+            self._request_smoothed(model, mode)
+
+        return values
+
+    def _reset(self):
+        """Removes all artists from the axes. Called when the displayed
+        model is replaced.
+        """
+
+        for artist in self._blit.artists():
+            self._blit.remove_artist(artist)
+
+        self._axes.clear()
+        self._axes.callbacks.connect('xlim_changed', self._on_view_change)
+        self._lines = dict()
+        self._band = None
+        self._series = dict()
+        self._shown_range = dict()
+        self._shown_data = dict()
+        self._failed = dict()
+        self._legend = None
+        self._legend_labels = None
+        self._cursor = None
+
+    def _line(self, name, style, overlay=False, **kwargs):
+        """Returns artist of the named series creating it on the first
+        call.
+        """
+
+        if name not in self._lines:
+            self._lines[name], = self._axes.plot(
+                [],
+                [],
+                style,
+                linewidth=self._linewidth,
+                **kwargs
+                )
+            if overlay:
+                self._blit.add_artist(self._lines[name])
+
+        return self._lines[name]
+
+    def _show(self, name, x_values, y_values, whole=False):
+        """Sets full resolution data of the named series and displays it.
+        Level of detail pyramid of the data is built here, once per data
+        set.
+        """
+
+        pyramid = None
+        if mdad.is_increasing(x_values):
+            pyramid = mdad.MinMaxPyramid(x_values, y_values)
+        self._series[name] = (x_values, y_values, pyramid)
+        self._shown_range.pop(name, None)
+        self._refresh(name, whole)
+
+    def _refresh(self, name, whole=False):
+        """Feeds the artist of the named series with its data decimated for
+        the visible range and the width of the axes, unless that was already
+        done for the current view. If whole is True data is decimated over
+        its whole range instead. Data is taken from the coarsest pyramid
+        level that still has a sample per pixel column.
+        """
+
+        x_values, y_values, pyramid = self._series[name]
+
+        if pyramid is None:
+            # Only sorted series can be decimated. Show the others as is.
+            if name not in self._shown_range:
+                self._lines[name].set_data(x_values, y_values)
+                self._shown_range[name] = None
+            return
+
+        low, high = sorted(self._axes.get_xlim())
+        width = int(self._axes.bbox.width) or mdad.DEFAULT_WIDTH
+        if whole:
+            low, high = None, None
+        if self._shown_range.get(name) == (low, high, width):
+            return
+
+        self._lines[name].set_data(*pyramid.decimate(low, high, width))
+        self._shown_range[name] = (low, high, width)
+
+    def _on_view_change(self, event=None):
+        """Called when the visible range (zoom, pan, autoscale) or the size
+        of the canvas changes to decimate the visible series for the new
+        view.
+        """
+
+        for name in self._series:
+            if self._lines[name].get_visible():
+                self._refresh(name)
+
+    def _set_model_data(self, model):
+        """Feeds model data to the artists of the measured data and the
+        ensemble spread.
+        """
+
+        ensemble = hasattr(model, 'std')
+
+        self._line(
+            'measured',
+            '-',
+            label='Mean' if ensemble else 'Measured Data'
+            )
+        self._show('measured', model.x, model.y, whole=True)
+
+        if ensemble:
+            # PolyCollection has no set_data(), so the spread is recreated.
+            if self._band is not None:
+                self._band.remove()
+            self._band = self._axes.fill_between(
+                model.x,
+                model.y - model.std,
+                model.y + model.std,
+                alpha=0.3,
+                linewidth=0.0,
+                label='\u00b1\u03c3',
+                )
+            self._line(
+                'minimum',
+                ':',
+                color='gray',
+                label='Min/Max'
+                )
+            self._line('maximum', ':', color='gray')
+            self._show('minimum', model.x, model.minimum, whole=True)
+            self._show('maximum', model.x, model.maximum, whole=True)
+
+        self._axes.set_xlabel(model.headers[0])
+        self._axes.set_ylabel(model.headers[1])
+        self._axes.set_title(model.title)
+        # Limits are taken from the data decimated over the whole range,
+        # which keeps all extremes. Then the data is decimated again for
+        # the actual view.
+        self._axes.relim()
+        self._axes.autoscale_view()
+        self._on_view_change()
+
+        # Remember generation of the displayed data, so the artists can be
+        # told stale once the model data changes.
+        self._shown_data[model] = model.generation
+
     def _update(self):
         """ TODO: Put method docstring HERE.
         """
 
         model = self.model()
+        full_draw = False
 
-        # First clear axes.
-        self._axes.clear()
+        if model is not self._shown_model:
+            self._drop_requests(lambda graph, mode: self._displays(graph))
+            self._reset()
+            self._shown_model = model
+            full_draw = True
 
         if model is not None:
-            self._axes.plot(
-                model.data[:, 1],
-                '-',
-                linewidth=self._linewidth,
-                label='Measured Data',
-                )
+            if self._shown_data.get(model) != model.generation:
+                self._set_model_data(model)
+                full_draw = True
 
             for mode in self._smth_prvu:
-                if self._smth_prvu[mode]:
-                    self._axes.plot(
-                        model.scaled_window_smoothed(
-                            model.data[:, 1],
-                            win_type=mode
-                            ),
-                        '-',
-                        linewidth=self._linewidth,
-                        label=mode.capitalize()
-                        )
-            self._axes.set_xlabel(model.headers[0])
-            self._axes.set_ylabel(model.headers[1])
-            self._axes.set_title(model.title)
-            self._axes.legend()
+                self._update_preview(
+                    mode,
+                    model,
+                    mode,
+                    bool(self._smth_prvu[mode]),
+                    overlay=True,
+                    label=mode.capitalize()
+                    )
 
-        self._figure.canvas.draw()
+            self._update_legend()
+
+        if full_draw:
+            self._blit.invalidate()
+        self._blit.update()
+
+    def _update_preview(self, name, model, mode, visible, style='-',
+                        **kwargs):
+        """Updates artist of the named smoothing preview series of the
+        model. Style and remaining key-word arguments are passed to _line()
+        when the artist is created.
+
+        It returns True if the preview is shown. Preview is shown once its
+        values are ready.
+        """
+
+        if not visible and name not in self._lines:
+            return False
+
+        line = self._line(name, style, **kwargs)
+        values = None
+        if visible:
+            values = self._smoothed(model, mode)
 
-        # Update superclass.
-        tki.Tk.update(self)
+        if values is not None:
+            # Cached values are replaced when the model data changes, so
+            # identity tells if the artist is stale.
+            if name not in self._series or self._series[name][1] is not values:
+                self._show(name, model.x, values)
+            else:
+                self._refresh(name)
+
+        line.set_visible(values is not None)
+
+        return values is not None
+
+    def _update_legend(self):
+        """Rebuilds the legend, but only if the set of visible series has
+        changed since it was last built.
+        """
+
+        handles, labels = self._axes.get_legend_handles_labels()
+        shown = [
+            (handle, label) for handle, label in zip(handles, labels)
+            if handle.get_visible()
+            ]
+        shown_labels = tuple(label for _, label in shown)
+
+        if shown_labels == self._legend_labels:
+            return
+
+        if self._legend is not None:
+            self._blit.remove_artist(self._legend)
+            self._legend.remove()
+
+        self._legend = self._axes.legend(
+            [handle for handle, _ in shown],
+            shown_labels
+            )
+        self._blit.add_artist(self._legend)
+        self._legend_labels = shown_labels
+
+    def set_crosshair(self, enabled):
+        """Turns crosshair readout mode on or off.
+        """
+
+        self._crosshair = bool(enabled)
+        if not self._crosshair:
+            self._hide_cursor()
+
+    def _cursor_artists(self):
+        """Returns tuple of format (vertical, horizontal, markers) of the
+        crosshair artists creating them on the first call.
+
+        Artists are not added to the axes, so they never take part in
+        autoscaling nor in full draws. They are drawn only by blitting.
+        """
+
+        if self._cursor is None:
+            style = dict(color='gray', linewidth=0.5, visible=False)
+            vertical = Line2D(
+                [0.0, 0.0],
+                [0.0, 1.0],
+                transform=blended_transform_factory(
+                    self._axes.transData,
+                    self._axes.transAxes
+                    ),
+                **style
+                )
+            horizontal = Line2D(
+                [0.0, 1.0],
+                [0.0, 0.0],
+                transform=blended_transform_factory(
+                    self._axes.transAxes,
+                    self._axes.transData
+                    ),
+                **style
+                )
+            markers = Line2D(
+                [],
+                [],
+                linestyle='none',
+                marker='o',
+                markersize=4.0,
+                color='black',
+                transform=self._axes.transData,
+                visible=False
+                )
+
+            self._cursor = (vertical, horizontal, markers)
+            for artist in self._cursor:
+                artist.set_figure(self._figure)
+                artist.set_clip_path(self._axes.patch)
+                self._blit.add_artist(artist)
+
+        return self._cursor
+
+    def _hide_cursor(self):
+        """Hides crosshair artists if they are shown.
+        """
+
+        if self._cursor is not None and self._cursor[0].get_visible():
+            for artist in self._cursor:
+                artist.set_visible(False)
+            self._blit.update()
+
+    def _readout_series(self):
+        """Returns list of tuples of format (name, label) of the displayed
+        series values are read off in crosshair mode. These are the
+        measured data and the visible smoothing previews. Previews of
+        overlaid graphs are keyed by tuples of format (graph name, mode)
+        and labeled after their key.
+        """
+
+        result = list()
+        for name in self._series:
+            if name in ('minimum', 'maximum') \
+                    or not self._lines[name].get_visible():
+                continue
+            if isinstance(name, tuple):
+                result.append((name, '{0} ({1})'.format(*name)))
+            else:
+                result.append((name, self._lines[name].get_label()))
+
+        return result
+
+    def readout(self, event):
+        """Returns message with values read off the displayed series at the
+        mouse position and moves the crosshair there. Values are linearly
+        interpolated at the mouse abscissa. For the first series the nearest
+        sample is reported too.
+
+        Samples are looked up by binary search on the full resolution data,
+        and only the crosshair is redrawn, so the readout cost does not
+        depend on the size of the data.
+        """
+
+        if not self._crosshair or event.inaxes is not self._axes \
+                or event.xdata is None or not self._series:
+            self._hide_cursor()
+            return ''
+
+        x_value = event.xdata
+        parts = ['{0} = {1:.6g}'.format(
+            self._axes.get_xlabel() or 'x',
+            x_value
+            )]
+        points_x = list()
+        points_y = list()
+
+        for number, (name, label) in enumerate(self._readout_series()):
+            x_values, y_values, pyramid = self._series[name]
+
+            if pyramid is not None:
+                index = mdad.nearest_index(x_values, x_value)
+                value = mdad.value_at(x_values, y_values, x_value)
+            else:
+                # Unsorted data can not be searched, so the nearest sample
+                # is found by a linear scan and taken as the value.
+                index = int(np.argmin(np.abs(x_values - x_value)))
+                value = float(y_values[index])
+
+            if number == 0:
+                parts.append('nearest ({0:.6g}, {1:.6g})'.format(
+                    x_values[index],
+                    y_values[index]
+                    ))
+
+            parts.append('{0} = {1:.6g}'.format(label, value))
+            if np.isfinite(value):
+                points_x.append(x_value)
+                points_y.append(value)
+
+        vertical, horizontal, markers = self._cursor_artists()
+        vertical.set_xdata([x_value, x_value])
+        vertical.set_visible(True)
+        horizontal.set_ydata([event.ydata, event.ydata])
+        horizontal.set_visible(True)
+        markers.set_data(points_x, points_y)
+        markers.set_visible(bool(points_x))
+        self._blit.update()
+
+        return '   '.join(parts)
 
     def update(self):
-        """ TODO: Put method docstring HERE.
+        """Marks the view dirty. It is redrawn once the event loop becomes
+        idle.
         """
 
-        self._update()
+        self._scheduler.mark_dirty(self._update)
+
+
+class OverlayView(PlotView):
+    """Custom widget for displaying many data sets (GraphCollection)
+    overlaid in one axes.
+
+    Every graph of the collection keeps its own artists, level of detail
+    pyramid and smoothed values, so adding, hiding or removing one graph
+    leaves the others untouched. Newly shown curves are drawn over the saved
+    background instead of redrawing the whole figure, unless they change
+    the axes limits. Clicking a legend entry toggles visibility of the
+    graph. Smoothing previews are drawn dashed in the color of their graph.
+    """
+
+    def __init__(self, *args, **kwargs):
+
+        # Pass initialization to the superclass.
+        super().__init__(*args, **kwargs)
+
+        self._graphs = dict()  # Map of names and displayed graphs.
+        self._legend_names = dict()  # Map of legend lines and graph names.
+        self._figure.canvas.mpl_connect('pick_event', self._on_pick)
+
+    def _displays(self, graph):
+        """Returns True if the graph is displayed by the view.
+        """
+
+        collection = self.model()
+        if collection is None:
+            return False
+
+        return any(graph is shown for shown in collection)
+
+    def _reset(self):
+        """Removes all artists from the axes.
+        """
+
+        super()._reset()
+        self._graphs = dict()
+        self._legend_names = dict()
+
+    def _remove_graph(self, name):
+        """Removes artists and cached display data of the named graph.
+        """
+
+        for key in list(self._lines):
+            if key == name or (isinstance(key, tuple) and key[0] == name):
+                line = self._lines.pop(key)
+                self._blit.remove_artist(line)
+                line.remove()
+                self._series.pop(key, None)
+                self._shown_range.pop(key, None)
+
+        self._shown_data.pop(self._graphs.pop(name), None)
+
+    def _set_graph_data(self, name, graph):
+        """Feeds graph data to the artist of the named graph.
+        """
+
+        if not self._graphs:
+            self._axes.set_xlabel(graph.headers[0])
+            self._axes.set_ylabel(graph.headers[1])
+
+        self._line(name, '-', label=name)
+        self._show(name, graph.x, graph.y, whole=True)
+        self._graphs[name] = graph
+
+        # See PlotView._set_model_data().
+        self._shown_data[graph] = graph.generation
+
+    def _update(self):
+        """Brings artists in line with the collection. Only artists of the
+        graphs that were added, changed, hidden or shown are touched.
+        """
+
+        collection = self.model()
+        full_draw = False
+        new_lines = list()  # Artists to be drawn over the background.
+
+        if collection is not self._shown_model:
+            self._drop_requests(lambda graph, mode: self._displays(graph))
+            self._reset()
+            self._shown_model = collection
+            full_draw = True
+
+        if collection is not None:
+            for name in list(self._graphs):
+                if name not in collection \
+                        or collection[name] is not self._graphs[name]:
+                    self._remove_graph(name)
+                    full_draw = True
+
+            limits = (self._axes.get_xlim(), self._axes.get_ylim())
+            added = False
+
+            for name in collection.names:
+                graph = collection[name]
+                new_graph = name not in self._graphs
+                if new_graph \
+                        or self._shown_data.get(graph) != graph.generation:
+                    # Replaced data of a displayed graph needs full draw.
+                    full_draw = full_draw or not new_graph
+                    self._set_graph_data(name, graph)
+                    added = True
+
+                visible = collection.is_visible(name)
+                line = self._lines[name]
+                if visible and (new_graph or not line.get_visible()):
+                    new_lines.append(line)
+                elif not visible and line.get_visible() and not new_graph:
+                    full_draw = True
+                line.set_visible(visible)
+
+                for mode in self._smth_prvu:
+                    key = (name, mode)
+                    was_shown = key in self._lines \
+                        and self._lines[key].get_visible()
+                    shown = self._update_preview(
+                        key,
+                        graph,
+                        mode,
+                        visible and bool(self._smth_prvu[mode]),
+                        style='--',
+                        color=line.get_color(),
+                        label='_{0} ({1})'.format(name, mode)
+                        )
+                    if shown and not was_shown:
+                        new_lines.append(self._lines[key])
+                    elif was_shown and not shown:
+                        full_draw = True
+
+            if added:
+                self._axes.relim(visible_only=True)
+                self._axes.autoscale_view()
+                if limits != (self._axes.get_xlim(), self._axes.get_ylim()):
+                    full_draw = True
+                self._on_view_change()
+
+            self._update_legend()
+
+        if full_draw:
+            self._blit.invalidate()
+            self._blit.update()
+        elif new_lines:
+            self._blit.draw_into_background(new_lines)
+        else:
+            self._blit.update()
+
+    def _update_legend(self):
+        """Rebuilds the legend when graphs are added or removed. Hidden
+        graphs stay in the legend, dimmed, so they can be shown again.
+        """
+
+        collection = self.model()
+        names = collection.names
+
+        if names != self._legend_labels:
+            if self._legend is not None:
+                self._blit.remove_artist(self._legend)
+                self._legend.remove()
+
+            self._legend = self._axes.legend(
+                [self._lines[name] for name in names],
+                names,
+                fontsize='small'
+                )
+            self._legend_names = dict()
+            for handle, name in zip(self._legend.get_lines(), names):
+                handle.set_picker(5)
+                self._legend_names[handle] = name
+            self._blit.add_artist(self._legend)
+            self._legend_labels = names
+
+        for handle, name in self._legend_names.items():
+            handle.set_alpha(1.0 if collection.is_visible(name) else 0.2)
+
+    def _on_pick(self, event):
+        """Toggles visibility of the graph whose legend entry was clicked.
+        """
+
+        name = self._legend_names.get(event.artist)
+        collection = self.model()
+        if name is None or collection is None or name not in collection:
+            return
+
+        collection.set_visible(name, not collection.is_visible(name))
+        self.update()
+
+
+class StreamView(PlotView):
+    """Custom widget for live display of a data stream (e.g. scan in
+    progress).
+
+    Samples are pushed to a fixed capacity ring buffer and the view shows
+    the most recent ones. Plot is redrawn at most frame_rate times per
+    second, no matter how often samples arrive. Axes limits are updated
+    incrementally: abscissa follows the buffered samples and ordinate limits
+    are extended by the samples that arrived since the previous frame. They
+    are recomputed from the whole buffer only once per buffer turnover, so
+    they can shrink again. Memory use and the cost of a frame depend only on
+    the buffer capacity.
+
+    Abscissa (first column) of the stream must be increasing (e.g. time or
+    position of the detector).
+    """
+
+    def __init__(self, *args, **kwargs):
+        capacity = kwargs.pop('capacity', STREAM_CAPACITY)
+        frame_rate = kwargs.pop('frame_rate', STREAM_FRAME_RATE)
+        headers = kwargs.pop('headers', None)
+
+        # Pass the rest of initialization to the superclass.
+        super().__init__(*args, **kwargs)
+
+        self._buffer = mdam.RingBuffer(capacity)
+        self._frame_rate = None
+        self.frame_rate = frame_rate
+        self._frame_id = None  # Identifier of the scheduled frame.
+
+        self._shown_total = 0  # Samples appended when last frame was drawn.
+        self._scaled_total = 0  # Samples appended at the last full rescale.
+        self._y_limits = None
+
+        self._stream_line, = self._axes.plot(
+            [],
+            [],
+            '-',
+            linewidth=self._linewidth,
+            label='Live Data'
+            )
+        if headers:
+            self._axes.set_xlabel(headers[0])
+            self._axes.set_ylabel(headers[1])
+
+    @property
+    def buffer(self):
+        """Ring buffer holding the displayed samples.
+        """
+
+        return self._buffer
+
+    @property
+    def frame_rate(self):
+        """Maximum number of redraws per second.
+        """
+
+        return self._frame_rate
+
+    @frame_rate.setter
+    def frame_rate(self, frame_rate):
+        if frame_rate <= 0.0:
+            raise ValueError('Frame rate must be a positive number.')
+
+        self._frame_rate = float(frame_rate)
+
+    def push(self, samples):
+        """Appends sample or block of samples (see RingBuffer.append()).
+        Can be called from any thread. Samples are displayed on the next
+        frame.
+        """
+
+        self._buffer.append(samples)
+
+    def start(self):
+        """Starts following the stream.
+        """
+
+        if self._frame_id is None:
+            self._frame()
+
+    def stop(self):
+        """Stops following the stream. Samples can still be pushed.
+        """
+
+        if self._frame_id is not None:
+            self.after_cancel(self._frame_id)
+            self._frame_id = None
+
+    def _frame(self):
+        """Draws a frame, if any samples arrived since the previous one, and
+        schedules the next frame.
+        """
+
+        self._frame_id = self.after(
+            max(int(1000.0 / self._frame_rate), 1),
+            self._frame
+            )
+
+        if self._buffer.total != self._shown_total:
+            self._update()
+
+    def _autoscale(self, data, total):
+        """Updates axes limits for the buffered data. Only samples that
+        arrived since the previous frame are examined, unless the whole
+        buffer has turned over since the last full rescale.
+        """
+
+        arrived = min(total - self._shown_total, data.shape[0])
+
+        if self._y_limits is None \
+                or total - self._scaled_total >= self._buffer.capacity:
+            values = data[:, 1]
+            self._scaled_total = total
+            self._y_limits = None
+        else:
+            values = data[data.shape[0] - arrived:, 1]
+
+        if values.size and not np.all(np.isnan(values)):
+            low = float(np.nanmin(values))
+            high = float(np.nanmax(values))
+            if self._y_limits is not None:
+                low = min(low, self._y_limits[0])
+                high = max(high, self._y_limits[1])
+
+            if (low, high) != self._y_limits:
+                self._y_limits = (low, high)
+                margin = AXES_MARGIN * (high - low) or 0.5
+                self._axes.set_ylim(low - margin, high + margin)
+
+        if data[-1, 0] > data[0, 0]:
+            self._axes.set_xlim(data[0, 0], data[-1, 0])
+
+    def _update(self):
+        """Draws the buffered samples.
+        """
+
+        total = self._buffer.total
+        data = self._buffer.data
+
+        if data.shape[0]:
+            width = int(self._axes.bbox.width) or mdad.DEFAULT_WIDTH
+            self._stream_line.set_data(
+                *mdad.decimate(data[:, 0], data[:, 1], width=width)
+                )
+            self._autoscale(data, total)
+        else:
+            self._stream_line.set_data([], [])
+
+        self._shown_total = total
+        self._blit.invalidate()
+        self._blit.update()
+
+    def _on_destroy(self, event):
+        """Stops following the stream when the widget is destroyed.
+        """
+
+        if event.widget is self:
+            self.stop()
+        super()._on_destroy(event)
 
 
 class AppControlsView(tki.Frame):
@@ -280,14 +1332,46 @@ class AppControlsView(tki.Frame):
                 ).pack(side=tki.TOP, fill=tki.X)
             self._smoothing[mode].set(0)
 
+        # Set crosshair readout control.
+        ttk.Separator(top_frame, orient=tki.HORIZONTAL)\
+            .pack(side=tki.TOP, fill=tki.X, pady=5)
+        self._crosshair = tki.BooleanVar()
+        ttk.Checkbutton(
+                top_frame,
+                text='Crosshair',
+                command=self._toggle_crosshair,
+                variable=self._crosshair
+            ).pack(side=tki.TOP, fill=tki.X)
+        self._crosshair.set(0)
+
         # Set appllication "Quit" button.
         destroycmd = None
         if self._mainwindow and hasattr(self._mainwindow, 'destroy'):
             destroycmd = self._mainwindow.destroy
 
+        ttk.Button(bottom_frame, text='Open...', command=self._open_file)\
+            .pack(side=tki.TOP, fill=tki.X)
         ttk.Button(bottom_frame, text='Quit', command=destroycmd)\
             .pack(side=tki.TOP, fill=tki.X)
 
+    def _open_file(self):
+        """Method to be called when 'Open...' button is pressed.
+        """
+
+        if self.controller:
+            self.controller.dispatch(self, Message.openfile)
+
+    def _toggle_crosshair(self):
+        """Method to be called when crosshair check button is toggled.
+        """
+
+        if self.controller:
+            self.controller.dispatch(
+                self,
+                Message.crsrchngd,
+                crosshair=self._crosshair.get()
+                )
+
     def _toggle_smth_mode(self):
         """Method to be called when one of smoothing radio buttons is
         checked. It invokes actual method that turns mode display on/off.
@@ -319,6 +1403,11 @@ class TkiAppMainWindow(tki.Tk):
             # No reference to controller object.
             self._controller = None
 
+        # If overlay key-word argument is set, data sets are displayed
+        # overlaid (see OverlayView) and opened files are added to the
+        # displayed collection instead of replacing the data model.
+        self._overlay = kwargs.get('overlay', False)
+
         self.resizable(True, True)
         # self.resizable(False, False)
 
@@ -342,9 +1431,14 @@ class TkiAppMainWindow(tki.Tk):
         # Place your widgets here.
         # ======================================================================
 
-        self._plot_view = PlotView(
+        # All views are redrawn through the same scheduler.
+        self._scheduler = RedrawScheduler(self)
+
+        view_class = OverlayView if self._overlay else PlotView
+        self._plot_view = view_class(
             main_panel_frame,
-            controller=self._controller
+            controller=self._controller,
+            scheduler=self._scheduler
             )
         self._plot_view.pack(side=tki.TOP, fill=tki.BOTH, expand=True)
 
@@ -365,6 +1459,190 @@ class TkiAppMainWindow(tki.Tk):
             )
         self._controlpanel.pack(side=tki.RIGHT, fill=tki.Y)
 
+        # Set up file loading status bar. It is shown only while a file is
+        # being loaded.
+        self._status_frame = ttk.Frame(main_panel_frame)
+        self._load_label = ttk.Label(self._status_frame)
+        self._load_label.pack(side=tki.LEFT, padx=2)
+        ttk.Button(
+                self._status_frame,
+                text='Cancel',
+                command=self.cancel_loading
+            ).pack(side=tki.RIGHT, padx=2)
+        self._progress_bar = ttk.Progressbar(
+                self._status_frame,
+                orient=tki.HORIZONTAL,
+                mode='determinate',
+                maximum=100.0
+            )
+        self._progress_bar.pack(side=tki.RIGHT, fill=tki.X, expand=True)
+
+        # Files are loaded on a worker thread. Worker stores the progress
+        # in _load_progress and posts the result to the _loaded queue. Only
+        # the result of the most recent request (_load_id) is accepted.
+        self._loader = ThreadPoolExecutor(max_workers=1)
+        self._loaded = queue.Queue()
+        self._load_id = 0
+        self._load_cancel = None
+        self._load_progress = (0, 1)
+        self._polling = False
+        self.bind('<Destroy>', self._on_destroy)
+
+    def _on_destroy(self, event):
+        """Cancels loading in progress and stops the loader thread when the
+        window is destroyed, so quitting does not wait for the file to be
+        parsed.
+        """
+
+        if event.widget is self:
+            if self._load_cancel is not None:
+                self._load_cancel.set()
+                self._load_cancel = None
+            self._loader.shutdown(wait=False, cancel_futures=True)
+
+    def open_file(self, file_name=None):
+        """Loads data file on a worker thread and displays it once it is
+        parsed. If file name is not given user is asked to select one. Any
+        loading in progress is cancelled.
+        """
+
+        if file_name is None:
+            file_name = tkfd.askopenfilename(
+                parent=self,
+                title='Open Data File',
+                filetypes=[('CSV files', '*.csv'), ('All files', '*')]
+                )
+            if not file_name:
+                return
+
+        self.cancel_loading()
+
+        self._load_id += 1
+        self._load_cancel = threading.Event()
+        self._load_progress = (0, 1)
+        delimiter = getattr(self._controller, 'delimiter', ',')
+
+        self._loader.submit(
+            self._load,
+            self._load_id,
+            file_name,
+            delimiter,
+            self._load_cancel
+            )
+
+        self._load_label.configure(
+            text='Loading \'{0}\' ...'.format(basename(file_name))
+            )
+        self._progress_bar.configure(value=0.0)
+        self._status_frame.pack(side=tki.BOTTOM, fill=tki.X, padx=2, pady=2)
+
+        if not self._polling:
+            self._polling = True
+            self.after(RESULT_POLL_INTERVAL, self._poll_loading)
+
+    def cancel_loading(self):
+        """Cancels loading of the file in progress, if any.
+        """
+
+        if self._load_cancel is not None:
+            self._load_cancel.set()
+            self._load_cancel = None
+            self._status_frame.pack_forget()
+
+    def _load(self, load_id, file_name, delimiter, cancel):
+        """Runs on the worker thread. Reads the file and posts the resulting
+        Graph object (or None) to the queue.
+        """
+
+        def progress(bytes_read, total_bytes):
+            self._load_progress = (bytes_read, total_bytes)
+
+        data_reader = mdam.CSVDataReader()
+        graph = None
+        error = None
+
+        try:
+            data = data_reader.read_data(
+                file_name,
+                delimiter,
+                progress=progress,
+                cancel=cancel
+                )
+            if data is not None:
+                graph = mdam.Graph(
+                    data,
+                    data_reader.headers,
+                    basename(file_name)
+                    )
+            else:
+                error = data_reader.last_error
+
+        except (OSError, UnicodeDecodeError, CSVError) as err:
+            error = err
+
+        self._loaded.put((load_id, graph, data_reader, error))
+
+    def _poll_loading(self):
+        """Runs on the Tk event loop. Updates progress bar and takes the
+        result of loading once it is ready.
+        """
+
+        result = None
+        while result is None:
+            try:
+                result = self._loaded.get_nowait()
+            except queue.Empty:
+                break
+
+            # Drop results of cancelled or superseded requests.
+            if result[0] != self._load_id or self._load_cancel is None:
+                result = None
+
+        if result is None:
+            if self._load_cancel is None:
+                self._polling = False
+                return
+
+            bytes_read, total_bytes = self._load_progress
+            self._progress_bar.configure(
+                value=100.0 * bytes_read / max(total_bytes, 1)
+                )
+            self.after(RESULT_POLL_INTERVAL, self._poll_loading)
+            return
+
+        load_id, graph, data_reader, error = result
+        self._polling = False
+        self._load_cancel = None
+        self._status_frame.pack_forget()
+        if not isinstance(error, Exception):
+            data_reader.print_error_report()
+
+        if graph is None:
+            if error != mdam.ReadError.CANCELLED:
+                tkmb.showerror(
+                    'Open Data File',
+                    'Could not read file \'{0}\': {1}.'.format(
+                        data_reader.file_name,
+                        error
+                        ),
+                    parent=self
+                    )
+            return
+
+        if self._controller is None:
+            return
+
+        # Model is replaced (or the graph is added to the collection) in a
+        # single step, once it is complete.
+        if self._overlay:
+            collection = getattr(self._controller, 'data_model', None)
+            if not isinstance(collection, mdam.GraphCollection):
+                collection = mdam.GraphCollection()
+            collection.add(graph)
+            graph = collection
+        self._controller.data_model = graph
+        self.update()
+
     def _update(self):
         """Method to update display of main window.
         """
@@ -388,9 +1666,15 @@ class TkiAppMainWindow(tki.Tk):
                 print('{0}: \'smoothing\' parameter is missing.'
                       .format(self._programName))
 
+        elif event == Message.openfile:
+            self.open_file()
+
+        elif event == Message.crsrchngd:
+            self._plot_view.set_crosshair(kwargs.get('crosshair', False))
+
     def update(self):
-        """TODO: Put method docstring HERE.
+        """Schedules redraw of all views of the main window (see
+        RedrawScheduler).
         """
 
         self._update()
-        tki.Tk.update(self)
@@ -0,0 +1,8 @@
+"""Test configuration. Application modules live in the repository root,
+so it is put on the module search path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,75 @@
+"""Tests of the mda_align module.
+"""
+
+import numpy as np
+import mda_align as mdaa
+import mda_fitting as mdaf
+import mda_models as mdam
+
+
+def _field(x_values, shift=0.0):
+    """Smooth field profile 20 mm wide centered at shift.
+    """
+
+    return 50.0 * (
+        mdaf.erf((x_values - shift + 10.0) / 2.0)
+        - mdaf.erf((x_values - shift - 10.0) / 2.0)
+        )
+
+
+def test_sub_sample_shifts_recovered():
+    x_values = np.arange(-50.0, 50.25, 0.5)
+    shifts = np.array([1.3, -2.7, 0.2])
+    curves = np.vstack([_field(x_values, shift) for shift in shifts])
+
+    result = mdaa.estimate_shifts(_field(x_values), curves, step=0.5)
+
+    np.testing.assert_allclose(result, shifts, atol=0.01)
+    assert abs(
+        mdaa.estimate_shifts(_field(x_values), curves[0], step=0.5) - 1.3
+        ) < 0.01
+
+
+def test_max_shift_limits_search():
+    x_values = np.arange(-50.0, 50.25, 0.5)
+    curves = np.vstack((_field(x_values, 1.3), _field(x_values, 30.0)))
+
+    result = mdaa.estimate_shifts(
+        _field(x_values), curves, step=0.5, max_shift=5.0
+        )
+
+    assert abs(result[0] - 1.3) < 0.01
+    assert abs(result[1]) <= 5.0
+
+
+def test_apply_shifts_inverts_shift():
+    x_values = np.arange(-50.0, 50.25, 0.5)
+
+    result = mdaa.apply_shifts(x_values, _field(x_values, 2.0), 2.0)
+
+    np.testing.assert_allclose(result[:-4], _field(x_values)[:-4])
+    assert np.isnan(result[-4:]).all()
+
+
+def test_align_irregular_graphs():
+    generator = np.random.default_rng(3)
+    reference_x = np.sort(generator.uniform(-40.0, 40.0, 300))
+    reference = mdam.Graph(
+        np.column_stack((reference_x, _field(reference_x))),
+        None,
+        'reference'
+        )
+    graphs = [
+        mdam.Graph(
+            np.column_stack((reference_x, _field(reference_x, shift))),
+            None,
+            'shifted'
+            )
+        for shift in (1.7, -0.6)
+        ]
+
+    shifts, aligned = mdaa.align_graphs(reference, graphs)
+
+    np.testing.assert_allclose(shifts, [1.7, -0.6], atol=0.05)
+    np.testing.assert_allclose(aligned[0].x, reference_x - shifts[0])
+    np.testing.assert_array_equal(aligned[0].y, graphs[0].y)
@@ -0,0 +1,47 @@
+"""Tests of the mda_calibration module.
+"""
+
+import numpy as np
+import mda_calibration as mdac
+
+
+def _calibration():
+    # Points lie exactly on dose = 2 + 30000 / (x - 5000).
+    gray_values = np.linspace(10000.0, 40000.0, 12)
+    doses = 2.0 + 30000.0 / (gray_values - 5000.0)
+
+    return mdac.Calibration.fit(gray_values, doses), gray_values, doses
+
+
+def test_fit_recovers_rational_model():
+    calibration, gray_values, doses = _calibration()
+
+    np.testing.assert_allclose(
+        calibration.evaluate(gray_values),
+        doses,
+        rtol=1e-6
+        )
+
+
+def test_dose_gray_dose_round_trip():
+    calibration, _, _ = _calibration()
+    offset, scale, pole = calibration.parameters
+
+    doses = np.linspace(2.9, 7.9, 50)
+    gray_values = pole + scale / (doses - offset)
+
+    np.testing.assert_allclose(calibration.apply(gray_values), doses,
+                               rtol=1e-6)
+
+
+def test_nan_gray_values():
+    calibration, _, _ = _calibration()
+    gray_values = np.array([15000.0, np.nan, 50000.0])
+
+    result = calibration.apply(gray_values)
+    assert np.isfinite(result[0])
+    assert np.isnan(result[1:]).all()
+
+    result = calibration.apply(gray_values, clip=True, chunk_size=2)
+    assert np.isnan(result[1])
+    assert np.isfinite(result[[0, 2]]).all()
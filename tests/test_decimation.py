@@ -0,0 +1,99 @@
+"""Tests of the mda_decimation module.
+"""
+
+import numpy as np
+import mda_decimation as mdad
+
+
+def _series(size=100000, seed=0):
+    generator = np.random.default_rng(seed)
+    x_values = np.sort(generator.uniform(0.0, 1000.0, size))
+
+    return x_values, generator.normal(size=size)
+
+
+def test_pyramid_keeps_extremes_of_visible_range():
+    x_values, y_values = _series()
+    pyramid = mdad.MinMaxPyramid(x_values, y_values)
+    generator = np.random.default_rng(1)
+
+    for low, high in np.sort(generator.uniform(0.0, 1000.0, (200, 2))):
+        width = int(generator.integers(1, 300))
+        indices = pyramid.indices(low, high, width)
+        start, stop = mdad.visible_range(x_values, low, high)
+        inner = np.arange(start + 1, stop - 1)
+
+        assert indices.min() >= start and indices.max() < stop
+        if inner.size:
+            assert inner[np.argmax(y_values[inner])] in indices
+            assert inner[np.argmin(y_values[inner])] in indices
+
+
+def test_pyramid_ignores_extremes_outside_partial_blocks():
+    x_values = np.arange(4096.0)
+    y_values = np.zeros(4096)
+
+    # Spikes lie in the blocks cut by the range limits, but outside it.
+    y_values[1000] = 100.0
+    y_values[3090] = -100.0
+    pyramid = mdad.MinMaxPyramid(x_values, y_values)
+
+    indices = pyramid.indices(1010.0, 3080.0, 10)
+
+    assert pyramid.level_for(1009, 3082, 10) > 0
+    assert 1000 not in indices and 3090 not in indices
+    assert indices.min() == 1009 and indices.max() == 3081
+
+
+def _brute_force_columns(x_values, y_values, low, high, width):
+    """Indices of the first minimum and maximum of every column, found by a
+    loop over columns.
+    """
+
+    start, stop = mdad.visible_range(x_values, low, high)
+    inner = np.arange(start + 1, stop - 1)
+    columns = np.clip(
+        ((x_values[inner] - low) * (width / (high - low))).astype(int),
+        0,
+        width - 1
+        )
+
+    expected = {start, stop - 1}
+    for column in range(width):
+        members = inner[columns == column]
+        if members.size:
+            expected.add(members[np.nanargmin(y_values[members])])
+            expected.add(members[np.nanargmax(y_values[members])])
+
+    return np.array(sorted(expected))
+
+
+def test_minmax_indices_match_brute_force():
+    x_values, y_values = _series(20000, seed=2)
+    y_values[::97] = np.nan
+    y_values[5000:5100] = 0.0
+    generator = np.random.default_rng(3)
+
+    for low, high in np.sort(generator.uniform(0.0, 1000.0, (50, 2))):
+        width = int(generator.integers(1, 500))
+        start, stop = mdad.visible_range(x_values, low, high)
+        indices = mdad.minmax_indices(x_values, y_values, low, high, width)
+
+        if stop - start <= 2 * width + 2:
+            np.testing.assert_array_equal(indices, np.arange(start, stop))
+        else:
+            np.testing.assert_array_equal(
+                indices,
+                _brute_force_columns(x_values, y_values, low, high, width)
+                )
+
+
+def test_lookups_by_abscissa():
+    x_values = np.array([0.0, 1.0, 1.0, 3.0, 7.0])
+    y_values = np.array([0.0, 2.0, 4.0, 8.0, 0.0])
+
+    assert [mdad.nearest_index(x_values, value)
+            for value in (-1.0, 0.4, 2.2, 5.0, 9.0)] == [0, 0, 3, 3, 4]
+    assert mdad.value_at(x_values, y_values, 2.0) == 6.0
+    assert mdad.value_at(x_values, y_values, 5.0) == 4.0
+    assert np.isnan(mdad.value_at(x_values, y_values, 7.5))
@@ -0,0 +1,68 @@
+"""Tests of the mda_dvh module.
+"""
+
+import numpy as np
+import mda_dvh as mdad
+
+
+def _dvh_set():
+    # Ten 1 Gy bins. First structure has the same volume in every bin,
+    # second has all of its volume in the 3-4 Gy bin and third is empty.
+    volumes = np.zeros((3, 10))
+    volumes[0] = 1.0
+    volumes[1, 3] = 4.0
+
+    return mdad.DVHSet(np.arange(10) + 0.5, volumes, ('a', 'b', 'c'))
+
+
+def test_dose_at_volume():
+    result = _dvh_set().dose_at_volume([2.0, 20.0, 50.0, 98.0])
+
+    np.testing.assert_allclose(result[0], [9.8, 8.0, 5.0, 0.2])
+    np.testing.assert_allclose(result[1], [3.98, 3.8, 3.5, 3.02])
+    assert np.isnan(result[2]).all()
+
+
+def test_volume_at_dose():
+    dvh_set = _dvh_set()
+
+    relative = dvh_set.volume_at_dose([0.0, 2.5, 3.5, 5.0, 12.0])
+    np.testing.assert_allclose(relative[0], [100.0, 75.0, 65.0, 50.0, 0.0])
+    np.testing.assert_allclose(relative[1], [100.0, 100.0, 50.0, 0.0, 0.0])
+
+    absolute = dvh_set.volume_at_dose(5.0, relative=False)
+    np.testing.assert_allclose(absolute[:, 0], [5.0, 0.0, 0.0])
+
+
+def test_metrics():
+    metrics = _dvh_set().metrics()
+
+    np.testing.assert_allclose(metrics.mean[:2], [5.0, 3.5])
+    np.testing.assert_allclose(metrics.min[:2], [0.5, 3.5])
+    np.testing.assert_allclose(metrics.max[:2], [9.5, 3.5])
+    np.testing.assert_allclose(metrics.d2[:2], [9.8, 3.98])
+    np.testing.assert_allclose(metrics.d98[:2], [0.2, 3.02])
+    assert all(np.isnan(field[2]) for field in metrics)
+
+
+def test_build_dvh_matches_histogram():
+    generator = np.random.default_rng(2)
+    dose = generator.uniform(0.0, 5.0, (20, 30, 40))
+    masks = generator.uniform(size=(3,) + dose.shape) < 0.4
+
+    dvh_set = mdad.build_dvh(
+        dose,
+        masks,
+        bin_width=0.1,
+        max_dose=5.0,
+        voxel_volume=0.5,
+        chunk_size=1000
+        )
+
+    edges = np.arange(51) * 0.1
+    for row, mask in enumerate(masks):
+        counts = np.histogram(np.minimum(dose[mask], 5.0), edges)[0]
+        np.testing.assert_allclose(
+            dvh_set.differential[row, :50],
+            0.5 * counts
+            )
@@ -0,0 +1,31 @@
+"""Tests of the mda_ensemble module.
+"""
+
+import numpy as np
+import mda_ensemble as mdae
+
+
+def test_repeated_abscissa_values_are_averaged():
+    ensemble = mdae.EnsembleAggregator(grid=np.linspace(0.0, 4.0, 5))
+
+    # Sample at x = 2 is measured twice.
+    ensemble.add(np.array([
+        [0.0, 0.0],
+        [1.0, 1.0],
+        [2.0, 1.0],
+        [2.0, 3.0],
+        [3.0, 3.0],
+        [4.0, 4.0]
+        ]))
+    ensemble.add(np.column_stack((np.arange(5.0), np.arange(5.0))))
+
+    np.testing.assert_allclose(ensemble.mean, [0.0, 1.0, 2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(ensemble.count, 2)
+
+
+def test_grid_taken_from_data_with_repeated_abscissa():
+    ensemble = mdae.EnsembleAggregator()
+    ensemble.add(np.array([[0.0, 1.0], [1.0, 2.0], [1.0, 4.0], [2.0, 5.0]]))
+
+    np.testing.assert_array_equal(ensemble.grid, [0.0, 1.0, 2.0])
+    np.testing.assert_allclose(ensemble.mean, [1.0, 3.0, 5.0])
@@ -0,0 +1,83 @@
+"""Tests of the mda_fitting module.
+"""
+
+import math
+import numpy as np
+import mda_fitting as mdaf
+
+
+def _gaussian(x_values, params):
+    amplitude, center, width = (params[:, k, np.newaxis] for k in range(3))
+
+    return amplitude * np.exp(-0.5 * ((x_values - center) / width) ** 2)
+
+
+def _gaussian_jacobian(x_values, params):
+    amplitude, center, width = (params[:, k, np.newaxis] for k in range(3))
+    z = (x_values - center) / width
+    peak = np.exp(-0.5 * z * z)
+
+    return np.stack(
+        (peak, amplitude * peak * z / width, amplitude * peak * z * z / width),
+        axis=-1
+        )
+
+
+GAUSSIAN = mdaf.Model(
+    name='gaussian',
+    param_names=('amplitude', 'center', 'width'),
+    function=_gaussian,
+    jacobian=_gaussian_jacobian,
+    guess=None
+    )
+
+
+def test_erf_matches_math():
+    values = np.linspace(-4.0, 4.0, 81)
+
+    np.testing.assert_allclose(
+        mdaf.erf(values),
+        [math.erf(value) for value in values],
+        atol=2.0E-7
+        )
+
+
+def test_synthetic_gaussians():
+    generator = np.random.default_rng(11)
+    x_values = np.linspace(-10.0, 10.0, 201)
+    truth = np.array([
+        [100.0, 0.5, 2.0],
+        [50.0, -3.0, 1.2],
+        [80.0, 2.5, 3.5]
+        ])
+    y_values = _gaussian(x_values, truth) \
+        + generator.normal(scale=0.1, size=(3, x_values.size))
+    y_values[1, 50:60] = np.nan
+
+    result = mdaf.levenberg_marquardt(
+        GAUSSIAN, x_values, y_values, initial=[60.0, 0.0, 2.5]
+        )
+
+    assert result.converged.all()
+    np.testing.assert_allclose(result.params, truth, rtol=0.01, atol=0.01)
+    assert np.isnan(result.residuals[1, 50:60]).all()
+    assert np.nanstd(result.residuals) < 0.15
+
+
+def test_sigmoid_and_exponential_from_guess():
+    x_values = np.linspace(-20.0, 20.0, 161)
+    sigmoid = mdaf.SIGMOID.function(
+        x_values, np.array([[2.0, 95.0, 1.5, 3.0]])
+        )
+    depth = np.linspace(50.0, 250.0, 101)
+    tail = mdaf.EXPONENTIAL.function(
+        depth, np.array([[90.0, 0.01, 5.0, 50.0]])
+        )
+
+    edge = mdaf.levenberg_marquardt('sigmoid', x_values, sigmoid)
+    decay = mdaf.levenberg_marquardt('exponential', depth, tail)
+
+    np.testing.assert_allclose(edge.params[0], [2.0, 95.0, 1.5, 3.0],
+                               rtol=1.0E-5, atol=1.0E-5)
+    np.testing.assert_allclose(decay.params[0], [90.0, 0.01, 5.0, 50.0],
+                               rtol=1.0E-5)
@@ -0,0 +1,81 @@
+"""Tests of the mda_gamma module.
+"""
+
+import numpy as np
+import mda_gamma as mdag
+
+
+def _brute_force(x_eval, d_eval, x_ref, d_ref, dta, tolerance):
+    """Gamma index found by exhaustive search over the densely sampled
+    reference curve.
+    """
+
+    x_dense = np.linspace(x_ref[0], x_ref[-1], 200001)
+    d_dense = np.interp(x_dense, x_ref, d_ref)
+
+    return np.array([
+        np.sqrt(np.min(
+            ((x_dense - x_point) / dta) ** 2
+            + ((d_dense - d_point) / d_tol) ** 2
+            ))
+        for x_point, d_point, d_tol in zip(x_eval, d_eval, tolerance)
+        ])
+
+
+def _curves():
+    generator = np.random.default_rng(4)
+    x_ref = np.linspace(-30.0, 30.0, 61)
+    d_ref = 100.0 / (1.0 + np.exp(np.abs(x_ref) - 15.0)) + 2.0
+    x_eval = np.sort(generator.uniform(-25.0, 25.0, 40))
+    d_eval = np.interp(x_eval + 1.0, x_ref, d_ref) \
+        * generator.uniform(0.97, 1.03, x_eval.size)
+
+    return x_eval, d_eval, x_ref, d_ref
+
+
+def test_global_gamma_matches_brute_force():
+    x_eval, d_eval, x_ref, d_ref = _curves()
+
+    result = mdag.gamma_index(
+        x_eval, d_eval, x_ref, d_ref,
+        dose_criterion=2.0,
+        dta=2.0,
+        search_radius=100.0
+        )
+    expected = _brute_force(
+        x_eval, d_eval, x_ref, d_ref, 2.0,
+        np.full(x_eval.size, 0.02 * d_ref.max())
+        )
+
+    np.testing.assert_allclose(result.gamma, expected, atol=1e-3)
+    assert result.pass_rate == 100.0 * np.mean(expected <= 1.0)
+
+
+def test_local_gamma_matches_brute_force():
+    x_eval, d_eval, x_ref, d_ref = _curves()
+
+    result = mdag.gamma_index(
+        x_eval, d_eval, x_ref, d_ref,
+        normalization='local',
+        search_radius=100.0
+        )
+    expected = _brute_force(
+        x_eval, d_eval, x_ref, d_ref, 3.0, 0.03 * d_eval
+        )
+
+    np.testing.assert_allclose(result.gamma, expected, rtol=1e-3, atol=1e-3)
+
+
+def test_points_without_reference_in_radius():
+    result = mdag.gamma_index(
+        [0.0, 50.0, 0.0],
+        [1.0, 1.0, 0.0],
+        [0.0, 10.0],
+        [1.0, 1.0],
+        normalization='local'
+        )
+
+    assert result.gamma[0] == 0.0
+    assert np.isinf(result.gamma[1])
+    assert np.isnan(result.gamma[2])
+    assert result.pass_rate == 50.0
@@ -0,0 +1,42 @@
+"""Tests of the mda_models module.
+"""
+
+import numpy as np
+import mda_models as mdam
+
+
+def _graph(x_values):
+    return mdam.Graph(
+        np.column_stack((x_values, np.sin(x_values))),
+        None,
+        'test'
+        )
+
+
+def test_rounded_grid_is_uniform():
+    # Step of 1/3 written with four decimal places.
+    x_values = np.round(np.arange(200) / 3.0, 4)
+
+    assert _graph(x_values).is_uniform()
+    assert not _graph(x_values).is_uniform(rtol=1.0E-6)
+
+
+def test_irregular_grid_is_not_uniform():
+    x_values = np.arange(200) / 3.0
+    x_values[100:] += 0.01
+
+    assert not _graph(x_values).is_uniform()
+    assert not _graph(np.zeros(10)).is_uniform()
+    assert not _graph(np.zeros(1)).is_uniform()
+
+
+def test_generation_changes_with_data():
+    graph = _graph(np.arange(10.0))
+    generation = graph.generation
+
+    graph.data = np.column_stack((np.arange(5.0), np.arange(5.0)))
+    assert graph.generation != generation
+
+    generation = graph.generation
+    graph.invalidate()
+    assert graph.generation != generation
@@ -0,0 +1,64 @@
+"""Tests of the mda_pdd module.
+"""
+
+import numpy as np
+import mda_pdd as mdap
+
+
+def test_photon_metrics_of_exponential_curve():
+    depth = np.arange(0.0, 300.5, 0.5)
+    attenuation = 0.005
+    doses = np.where(
+        depth < 15.0,
+        50.0 + depth * (50.0 / 15.0),
+        100.0 * np.exp(-attenuation * (depth - 15.0))
+        )
+
+    metrics = mdap.photon_metrics(depth, 2.0 * doses)
+
+    assert metrics.dmax == 15.0
+    assert metrics.dose_max == 200.0
+    np.testing.assert_allclose(
+        [metrics.d10, metrics.d20, metrics.pdd20_10],
+        [
+            100.0 * np.exp(-attenuation * 85.0),
+            100.0 * np.exp(-attenuation * 185.0),
+            np.exp(-attenuation * 100.0)
+            ],
+        rtol=1e-4
+        )
+
+
+def test_electron_metrics_of_piecewise_curve():
+    depth = np.arange(0.0, 80.05, 0.1)
+    doses = np.where(
+        depth <= 30.0,
+        100.0 - 0.02 * (depth - 20.0) ** 2,
+        np.maximum(98.0 - 5.0 * (depth - 30.0), 2.0)
+        )
+
+    metrics = mdap.electron_metrics(depth, doses)
+
+    np.testing.assert_allclose(metrics.dmax, 20.0)
+    np.testing.assert_allclose(
+        [metrics.r90, metrics.r80, metrics.r50, metrics.rp, metrics.tail],
+        [31.6, 33.6, 39.6, 49.2, 2.0],
+        atol=1e-6
+        )
+
+
+def test_stack_matches_single_curves():
+    depth = np.arange(0.0, 300.5, 0.5)
+    doses = np.vstack([
+        100.0 * np.exp(-mu * depth) * (1.0 - np.exp(-0.3 * depth))
+        for mu in (0.004, 0.005, 0.006)
+        ])
+
+    stacked = mdap.photon_metrics(depth, doses)
+
+    for row, curve in enumerate(doses):
+        single = mdap.photon_metrics(depth, curve)
+        np.testing.assert_allclose(
+            [field[row] for field in stacked],
+            list(single)
+            )
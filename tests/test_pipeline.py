@@ -0,0 +1,82 @@
+"""Tests of the mda_pipeline module.
+"""
+
+import numpy as np
+import pytest
+import mda_pipeline as mdapl
+
+
+def _counting_pipeline(calls):
+    """Pipeline of source -> scale -> offset with calls recorded per stage.
+    """
+
+    def source(size=5):
+        calls.append('source')
+        return np.arange(float(size))
+
+    def scale(values, factor=1.0):
+        calls.append('scale')
+        return values * factor
+
+    def offset(values, shift=0.0):
+        calls.append('offset')
+        return values + shift
+
+    pipeline = mdapl.Pipeline()
+    pipeline.add('source', source, size=5)
+    pipeline.add('scale', scale, inputs=['source'], factor=2.0)
+    pipeline.add('offset', offset, inputs=['scale'], shift=1.0)
+
+    return pipeline
+
+
+def test_outputs_memoized():
+    calls = list()
+    pipeline = _counting_pipeline(calls)
+
+    np.testing.assert_allclose(pipeline.output('offset'), [1, 3, 5, 7, 9])
+    assert calls == ['source', 'scale', 'offset']
+
+    pipeline.output('offset')
+    assert pipeline.evaluations == 3
+
+
+def test_parameter_change_recomputes_dependents_only():
+    calls = list()
+    pipeline = _counting_pipeline(calls)
+    pipeline.output('offset')
+    del calls[:]
+
+    pipeline.set_params('scale', factor=3.0)
+    np.testing.assert_allclose(pipeline.output('offset'), [1, 4, 7, 10, 13])
+    assert calls == ['scale', 'offset']
+
+    # Previous parameter set is still cached.
+    del calls[:]
+    pipeline.set_params('scale', factor=2.0)
+    np.testing.assert_allclose(pipeline.output('offset'), [1, 3, 5, 7, 9])
+    assert calls == []
+
+
+def test_keys_follow_inputs():
+    pipeline = _counting_pipeline(list())
+    scale_key = pipeline.key('scale')
+    offset_key = pipeline.key('offset')
+
+    pipeline.set_params('source', size=6)
+
+    assert pipeline.key('scale') != scale_key
+    assert pipeline.key('offset') != offset_key
+    assert mdapl.parameter_hash(len, {'a': np.zeros(3)}) \
+        != mdapl.parameter_hash(len, {'a': np.zeros(4)})
+
+
+def test_invalid_stages_rejected():
+    pipeline = _counting_pipeline(list())
+
+    with pytest.raises(ValueError):
+        pipeline.add('scale', len)
+    with pytest.raises(ValueError):
+        pipeline.add('other', len, inputs=['missing'])
+    with pytest.raises(KeyError):
+        pipeline.output('missing')
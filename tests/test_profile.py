@@ -0,0 +1,80 @@
+"""Tests of the mda_profile module.
+"""
+
+import numpy as np
+import mda_profile as mdap
+
+
+def _field(x_values, width=10.0, penumbra=2.0):
+    """Trapezoid field profile centered at zero.
+    """
+
+    return np.clip((0.5 * width - np.abs(x_values)) / penumbra + 0.5, 0, 1) \
+        * 100.0
+
+
+def test_dipped_plateau_with_spikes():
+    x_values = np.linspace(-20.0, 20.0, 401)
+    profile = _field(x_values) + 2.0
+
+    # Dip below 50 % inside the field, spike next to the maximum and noise
+    # spikes above 20 % in the tails.
+    profile[x_values == 2.0] = 40.0
+    profile[x_values == 1.0] = 110.0
+    profile[x_values == -15.0] = 30.0
+    profile[x_values == 17.0] = 25.0
+
+    metrics = mdap.profile_metrics(x_values, profile, baseline='min')
+
+    # Levels are relative to the 110 % spike, so edges move slightly in.
+    assert abs(metrics.center) < 0.05
+    assert 9.0 < metrics.fwhm < 10.0
+    assert 1.0 < metrics.left_penumbra < 2.0
+    assert abs(metrics.left_penumbra - metrics.right_penumbra) < 0.05
+
+
+def test_edges_of_clean_profile():
+    x_values = np.linspace(-20.0, 20.0, 401)
+    profiles = np.vstack((_field(x_values), _field(x_values, width=6.0)))
+
+    left, right = mdap.field_edges(x_values, profiles, [50.0, 80.0])
+
+    np.testing.assert_allclose(left[:, 0], [-5.0, -3.0])
+    np.testing.assert_allclose(right[:, 0], [5.0, 3.0])
+    np.testing.assert_allclose(right[:, 1] - left[:, 1], [8.8, 4.8])
+
+
+def _field_region(x_values, above):
+    """Reference implementation of field region search for a single row
+    (see mda_profile._field_regions()).
+    """
+
+    steps = np.diff(np.concatenate(([0], above.astype(np.int8), [0])))
+    starts = np.flatnonzero(steps == 1)
+    stops = np.flatnonzero(steps == -1)
+    if starts.size == 0:
+        return None
+
+    lengths = stops - starts
+    bridged = starts[1:] - stops[:-1] < np.minimum(lengths[:-1], lengths[1:])
+    first = starts[np.concatenate(([True], ~bridged))]
+    last = stops[np.concatenate((~bridged, [True]))] - 1
+    widest = np.argmax(x_values[last] - x_values[first])
+
+    return first[widest], last[widest]
+
+
+def test_field_regions_match_reference():
+    generator = np.random.default_rng(7)
+    x_values = np.cumsum(generator.uniform(0.5, 1.5, 60))
+    above = generator.uniform(size=(40, 3, 60)) < 0.6
+    above[0, 0] = False
+    above[1, 1] = True
+
+    first, last, found = mdap._field_regions(x_values, above)
+
+    for index in np.ndindex(*above.shape[:-1]):
+        region = _field_region(x_values, above[index])
+        assert found[index] == (region is not None)
+        if region is not None:
+            assert (first[index], last[index]) == region
@@ -0,0 +1,58 @@
+"""Tests of the mda_render module.
+"""
+
+from os.path import dirname, join
+import numpy as np
+import mda_models as mdam
+import mda_render as mdarn
+
+
+DATA_DIR = join(dirname(dirname(__file__)), 'data')
+
+
+def test_output_names_unique():
+    names = mdarn.output_names(
+        ['a/profile.csv', 'b/profile.csv', 'c/profile.txt', 'pdd.csv'],
+        'out',
+        'svg'
+        )
+
+    assert names == [
+        join('out', 'profile.svg'),
+        join('out', 'profile_2.svg'),
+        join('out', 'profile_3.svg'),
+        join('out', 'pdd.svg')
+        ]
+
+
+def test_raster_curves_decimated():
+    x_values = np.linspace(0.0, 1.0, 100000)
+    graph = mdam.Graph(
+        np.column_stack((x_values, np.sin(50.0 * x_values))),
+        ['x', 'y'],
+        'test'
+        )
+    renderer = mdarn.GraphRenderer(smoothing=['flat'])
+
+    renderer.draw(graph, width=800)
+
+    lines = renderer._axes.get_lines()
+    assert len(lines) == 2
+    assert all(len(line.get_xdata()) <= 2 * 800 + 2 for line in lines)
+
+
+def test_render_files_in_process(tmp_path):
+    data_files = [
+        join(DATA_DIR, 'pdd_water_cyl_phantom_6MV.csv'),
+        join(DATA_DIR, 'EmptyFile.csv'),
+        join(DATA_DIR, 'ValuesWithHeader.csv')
+        ]
+
+    results = mdarn.render_files(data_files, str(tmp_path), processes=1)
+
+    assert [result.source for result in results] == data_files
+    assert results[1].output is None and results[1].error
+    for result in (results[0], results[2]):
+        assert result.error is None
+        with open(result.output, 'rb') as image:
+            assert image.read(8) == b'\x89PNG\r\n\x1a\n'
@@ -0,0 +1,69 @@
+"""Tests of the mda_resample module.
+"""
+
+import numpy as np
+import mda_resample as mdar
+
+
+def test_large_ratio_downsample():
+    source_x = np.linspace(0.0, 1.0, 200000)
+    target_x = np.linspace(0.0, 1.0, 200)
+
+    plan = mdar.InterpolationPlan(source_x, target_x)
+
+    assert plan.antialias
+    # Plan size depends on the target grid and the filter width only.
+    assert plan._indices.size < 10 * source_x.size
+    np.testing.assert_allclose(plan.apply(np.ones_like(source_x)), 1.0)
+    # Window is symmetric, so lines are preserved away from the ends.
+    np.testing.assert_allclose(
+        plan.apply(2.0 * source_x + 1.0)[1:-1],
+        2.0 * target_x[1:-1] + 1.0,
+        atol=1e-3
+        )
+
+
+def test_plan_cache_compares_grids(monkeypatch):
+    mdar.clear_plan_cache()
+    target_x = np.linspace(0.0, 1.0, 11)
+
+    # Make every grid hash collide.
+    monkeypatch.setattr(
+        mdar,
+        '_grid_key',
+        lambda x_values: (x_values.shape, x_values.dtype.str, 0)
+        )
+
+    first = mdar.get_plan(np.linspace(0.0, 1.0, 5), target_x)
+    second = mdar.get_plan(np.linspace(0.0, 2.0, 5), target_x)
+
+    assert second is not first
+    np.testing.assert_allclose(
+        second.apply(np.linspace(0.0, 2.0, 5)),
+        target_x
+        )
+    assert mdar.get_plan(np.linspace(0.0, 2.0, 5), target_x) is second
+
+
+def test_apply_in_chunks(monkeypatch):
+    generator = np.random.default_rng(5)
+    source_x = np.sort(generator.uniform(0.0, 10.0, 3000))
+    target_x = np.linspace(-1.0, 11.0, 97)
+    curves = generator.normal(size=(2, 3, 3000))
+
+    plan = mdar.InterpolationPlan(source_x, target_x, method='cubic')
+    expected = plan.apply(curves)
+
+    # Stencils of the anti-aliased plan hold every source sample once.
+    assert plan.antialias
+    for indices, weights in zip(plan._indices, plan._weights):
+        used = indices[weights != 0.0]
+        assert np.unique(used).size == used.size
+
+    monkeypatch.setattr(mdar, 'APPLY_CHUNK_SIZE', 1)
+    result = plan.apply(curves)
+
+    assert result.shape == (2, 3, 97)
+    np.testing.assert_allclose(result, expected)
+    assert np.isnan(result[..., target_x < source_x[0]]).all()
+    np.testing.assert_allclose(result[1, 2], plan.apply(curves[1, 2]))
@@ -0,0 +1,98 @@
+"""Tests of the mda_rolling module.
+"""
+
+import numpy as np
+import pytest
+import mda_rolling as mdar
+
+
+def _naive(values, win_len, function):
+    """Apply function to the truncated window centered on each sample.
+    """
+
+    half = win_len // 2
+
+    return np.array([
+        function(values[max(index - half, 0):index - half + win_len])
+        for index in range(values.size)
+        ])
+
+
+def _naive_prominence(values, peak):
+    """Prominence found by walking from the peak to the nearest strictly
+    higher sample (or the end of the array) on each side.
+    """
+
+    bases = list()
+    for step in (-1, 1):
+        index = peak
+        lowest = values[peak]
+        while 0 <= index + step < values.size \
+                and values[index + step] <= values[peak]:
+            index += step
+            lowest = min(lowest, values[index])
+        bases.append(lowest)
+
+    return values[peak] - max(bases)
+
+
+@pytest.mark.parametrize('win_len', [1, 2, 5, 10, 11, 40])
+def test_rolling_statistics_match_naive_loop(win_len):
+    generator = np.random.default_rng(win_len)
+    values = 1.0E4 + generator.normal(size=37)
+
+    np.testing.assert_allclose(
+        mdar.rolling_mean(values, win_len),
+        _naive(values, win_len, np.mean)
+        )
+    np.testing.assert_allclose(
+        mdar.rolling_std(values, win_len),
+        _naive(
+            values,
+            win_len,
+            lambda window: np.std(window, ddof=1)
+            if window.size > 1 else np.nan
+            ),
+        rtol=1.0E-6
+        )
+    np.testing.assert_array_equal(
+        mdar.rolling_min(values, win_len),
+        _naive(values, win_len, np.min)
+        )
+    np.testing.assert_array_equal(
+        mdar.rolling_max(values, win_len),
+        _naive(values, win_len, np.max)
+        )
+
+
+def test_local_maxima_with_plateaus():
+    values = np.array([3, 1, 2, 2, 2, 1, 4, 4, 0, 5, 5], dtype=float)
+
+    np.testing.assert_array_equal(mdar.local_maxima(values), [3, 6])
+
+
+def test_prominences_match_naive_walk():
+    generator = np.random.default_rng(2)
+    values = np.round(generator.normal(size=300), 1)
+    peaks = mdar.local_maxima(values)
+
+    np.testing.assert_allclose(
+        mdar.prominences(values, peaks),
+        [_naive_prominence(values, peak) for peak in peaks]
+        )
+
+
+def test_find_peaks_filters():
+    x_values = np.linspace(0.0, 10.0, 1001)
+    values = np.exp(-(x_values - 3.0) ** 2) \
+        + 0.5 * np.exp(-(x_values - 7.0) ** 2) \
+        + 0.01 * np.sin(40.0 * x_values)
+
+    peaks = mdar.find_peaks(values, prominence=0.2)
+    np.testing.assert_allclose(x_values[peaks.indices], [3.0, 7.0], atol=0.05)
+
+    peaks = mdar.find_peaks(values, height=0.8, prominence=0.2)
+    np.testing.assert_allclose(x_values[peaks.indices], [3.0], atol=0.05)
+
+    valleys = mdar.find_peaks(values, prominence=0.2, valleys=True)
+    np.testing.assert_allclose(x_values[valleys.indices], [5.2], atol=0.2)
@@ -0,0 +1,82 @@
+"""Tests of the mda_views module that don't need a display.
+"""
+
+import importlib
+import matplotlib
+import pytest
+
+
+@pytest.fixture
+def mdav(monkeypatch):
+    """Import views module with the non-interactive backend, so it can be
+    tested without a display.
+    """
+
+    matplotlib.use('Agg')
+    monkeypatch.setattr(matplotlib, 'use', lambda *args, **kwargs: None)
+
+    return importlib.import_module('mda_views')
+
+
+class FakeWidget():
+    """Stands in for the Tk widget, collecting idle callbacks.
+    """
+
+    def __init__(self):
+        self.idle = dict()
+        self._count = 0
+
+    def after_idle(self, callback):
+        self._count += 1
+        self.idle[self._count] = callback
+        return self._count
+
+    def after_cancel(self, identifier):
+        del self.idle[identifier]
+
+    def run_idle(self):
+        idle, self.idle = self.idle, dict()
+        for callback in idle.values():
+            callback()
+
+
+def test_redraws_coalesced(mdav):
+    widget = FakeWidget()
+    scheduler = mdav.RedrawScheduler(widget)
+    calls = list()
+
+    def first():
+        calls.append('first')
+
+    def second():
+        calls.append('second')
+
+    for redraw in (first, second, first, first):
+        scheduler.mark_dirty(redraw)
+
+    assert len(widget.idle) == 1
+    widget.run_idle()
+    assert calls == ['first', 'second']
+
+    # Redraws requested while flushing go to the next flush.
+    scheduler.mark_dirty(lambda: scheduler.mark_dirty(first))
+    widget.run_idle()
+    widget.run_idle()
+    assert calls == ['first', 'second', 'first']
+
+
+def test_cancel_drops_pending_redraws(mdav):
+    widget = FakeWidget()
+    scheduler = mdav.RedrawScheduler(widget)
+    calls = list()
+
+    scheduler.mark_dirty(lambda: calls.append('redraw'))
+    scheduler.cancel()
+
+    assert widget.idle == dict()
+    widget.run_idle()
+    assert calls == list()
+
+    scheduler.mark_dirty(lambda: calls.append('redraw'))
+    widget.run_idle()
+    assert calls == ['redraw']